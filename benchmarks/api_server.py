@@ -0,0 +1,528 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+"""
+Local stand-in of the Repository Service for TUF API.
+
+It serves the API endpoints used by the CLI for the tests and the end-to-end
+benchmarks, and it can run alone to try the CLI offline:
+
+    python -m benchmarks.api_server [--port PORT] [--latency SECONDS]
+        [--error-rate RATE] [--state-interval SECONDS]
+
+Login with the user ``admin`` and the password ``secret``.
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+TASK_STATES = ("PENDING", "STARTED", "SUCCESS")
+UPLOAD_PATH = "/api/v1/bootstrap/upload/"
+UPLOAD_ID_PATH = re.compile(
+    r"/api/v1/bootstrap/upload/(?P<upload_id>\w+)(?P<complete>/complete)?$"
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and body are written apart, don't wait for the ACKs
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(
+        self,
+        status: int,
+        data: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        chunks = []
+        while size := int(self.rfile.readline().split(b";")[0], 16):
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+        # skip the trailers
+        while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+            pass
+
+        return b"".join(chunks)
+
+    def _inject(self) -> bool:
+        """Adds the latency and answers the injected errors."""
+        stand_in = self.server.stand_in
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+
+        if stand_in.inject_error():
+            self._send_json(
+                stand_in.error_status, {"detail": "Injected error"}
+            )
+            return True
+
+        return False
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        path = urlsplit(self.path)
+        stand_in.log("GET", self.path, self.headers)
+        if self._inject():
+            return
+
+        if path.path == "/api/v1/task/":
+            task_id = parse_qs(path.query).get("task_id", [""])[0]
+            self._task(task_id)
+        elif path.path == "/api/v1/bootstrap/":
+            self._send_json(200, {"bootstrap": False, "message": "ok"})
+        elif path.path == "/api/v1/token/":
+            expiration = datetime.now(timezone.utc) + timedelta(hours=1)
+            self._send_json(
+                200,
+                {
+                    "data": {
+                        "scopes": ["write:bootstrap", "read:bootstrap"],
+                        "expired": False,
+                        "expiration": expiration.isoformat(),
+                    }
+                },
+            )
+        elif upload_path := UPLOAD_ID_PATH.match(path.path):
+            upload = stand_in.uploads.get(upload_path["upload_id"])
+            if upload is None:
+                self._send_json(404, {"detail": "Upload not found"})
+            else:
+                self._send_json(200, {"data": {"offset": len(upload["data"])}})
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        body = self._read_body()
+        stand_in.log("POST", self.path, self.headers, body)
+        if self._inject():
+            return
+
+        if self.headers.get("Content-Encoding") == "gzip":
+            if stand_in.accept_gzip:
+                body = gzip.decompress(body)
+            elif stand_in.gzip_status is not None:
+                self._send_json(
+                    stand_in.gzip_status,
+                    {"detail": "Unsupported Media Type"},
+                    {"Accept-Encoding": "identity"},
+                )
+                return
+
+        path = urlsplit(self.path).path
+        if path == "/api/v1/bootstrap/":
+            self._bootstrap(body)
+        elif path == "/api/v1/token/":
+            form = parse_qs(body.decode())
+            credentials = (
+                form.get("username", [""])[0],
+                form.get("password", [""])[0],
+            )
+            if credentials != stand_in.credentials:
+                self._send_json(
+                    401, {"detail": "Incorrect username or password"}
+                )
+            else:
+                self._send_json(
+                    200,
+                    {"access_token": uuid.uuid4().hex, "token_type": "bearer"},
+                )
+        elif path == "/api/v1/token/new/":
+            if "Authorization" not in self.headers:
+                self._send_json(401, {"detail": "Not authenticated"})
+            else:
+                data = json.loads(body)
+                self._send_json(
+                    200,
+                    {
+                        "access_token": uuid.uuid4().hex,
+                        "data": {
+                            "scopes": data["scopes"],
+                            "expires": data["expires"],
+                        },
+                    },
+                )
+        elif path == UPLOAD_PATH and stand_in.resumable:
+            data = json.loads(body)
+            upload_id = uuid.uuid4().hex
+            stand_in.uploads[upload_id] = {
+                "size": data["size"],
+                "sha256": data["sha256"],
+                "data": bytearray(),
+                "response": None,
+            }
+            self._send_json(
+                201, {"data": {"upload_id": upload_id, "offset": 0}}
+            )
+        elif upload_path := UPLOAD_ID_PATH.match(path):
+            if upload_path["complete"]:
+                self._upload_complete(upload_path["upload_id"])
+            else:
+                self._upload_chunk(upload_path["upload_id"], body)
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+
+    def _bootstrap(
+        self, body: bytes, respond: bool = True
+    ) -> Tuple[int, Dict[str, Any]]:
+        stand_in = self.server.stand_in
+        try:
+            stand_in.payloads.append(json.loads(body))
+        except ValueError:
+            result = (400, {"detail": "Invalid JSON"})
+        else:
+            task_id = stand_in.new_task()
+            result = (
+                202,
+                {
+                    "message": "Bootstrap accepted.",
+                    "data": {"task_id": task_id},
+                },
+            )
+
+        if respond:
+            self._send_json(*result)
+
+        return result
+
+    def _upload_chunk(self, upload_id: str, body: bytes) -> None:
+        stand_in = self.server.stand_in
+        upload = stand_in.uploads.get(upload_id)
+        if upload is None:
+            self._send_json(404, {"detail": "Upload not found"})
+            return
+
+        stand_in.chunk_requests += 1
+        fault = stand_in.upload_faults.get(stand_in.chunk_requests)
+        if fault == "drop":
+            # the connection is closed before the chunk is stored
+            self.close_connection = True
+            return
+        elif fault == "error":
+            self._send_json(503, {"detail": "Service Unavailable"})
+            return
+
+        offset = int(self.headers["Upload-Offset"])
+        if offset != len(upload["data"]):
+            self._send_json(
+                409,
+                {
+                    "detail": "Offset mismatch",
+                    "data": {"offset": len(upload["data"])},
+                },
+            )
+            return
+
+        algorithm, checksum = self.headers["Upload-Checksum"].split(" ", 1)
+        digest = base64.b64encode(hashlib.sha256(body).digest()).decode()
+        if fault == "corrupt" or algorithm != "sha256" or checksum != digest:
+            self._send_json(460, {"detail": "Checksum Mismatch"})
+            return
+
+        upload["data"] += body
+        if fault == "lost":
+            # the chunk is stored, but the response is lost
+            self.close_connection = True
+            return
+
+        self._send_json(200, {"data": {"offset": len(upload["data"])}})
+
+    def _upload_complete(self, upload_id: str) -> None:
+        upload = self.server.stand_in.uploads.get(upload_id)
+        if upload is None:
+            self._send_json(404, {"detail": "Upload not found"})
+        elif upload["response"] is not None:
+            # completed already, i.e. the response was lost
+            self._send_json(*upload["response"])
+        elif len(upload["data"]) != upload["size"]:
+            self._send_json(400, {"detail": "Incomplete upload"})
+        elif hashlib.sha256(upload["data"]).hexdigest() != upload["sha256"]:
+            self._send_json(400, {"detail": "Checksum Mismatch"})
+        elif self.server.stand_in.complete_fault is not None:
+            # bootstrapped, but the response is lost
+            upload["response"] = self._bootstrap(bytes(upload["data"]), False)
+            if self.server.stand_in.complete_fault == "forget":
+                del self.server.stand_in.uploads[upload_id]
+
+            self.server.stand_in.complete_fault = None
+            self.close_connection = True
+        else:
+            upload["response"] = self._bootstrap(bytes(upload["data"]))
+
+    def _task(self, task_id: str) -> None:
+        stand_in = self.server.stand_in
+        if task_id not in stand_in.tasks:
+            self._send_json(404, {"detail": "Task not found"})
+            return
+
+        if stand_in.busy_responses > 0:
+            stand_in.busy_responses -= 1
+            self._send_json(
+                429,
+                {"detail": "Too many requests"},
+                {"Retry-After": str(stand_in.busy_retry_after)},
+            )
+            return
+
+        accept = self.headers.get("Accept", "")
+        if stand_in.sse and "text/event-stream" in accept:
+            self._task_events(task_id)
+            return
+
+        headers = {}
+        wait = re.search(r"wait=(\d+)", self.headers.get("Prefer", ""))
+        if stand_in.long_poll and wait:
+            state = stand_in.task_state(task_id)
+            deadline = time.monotonic() + int(wait.group(1))
+            while (
+                stand_in.task_state(task_id) == state
+                and time.monotonic() < deadline
+            ):
+                time.sleep(0.005)
+            headers["Preference-Applied"] = f"wait={wait.group(1)}"
+
+        if stand_in.retry_after is not None:
+            headers["Retry-After"] = str(stand_in.retry_after)
+
+        self._send_json(200, stand_in.task_body(task_id), headers)
+
+    def _task_events(self, task_id: str) -> None:
+        stand_in = self.server.stand_in
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        last_state = None
+        try:
+            while True:
+                state = stand_in.task_state(task_id)
+                if state != last_state:
+                    data = json.dumps(stand_in.task_body(task_id))
+                    self.wfile.write(f"data: {data}\n\n".encode())
+                    last_state = state
+                else:
+                    self.wfile.write(b": heartbeat\n\n")
+                self.wfile.flush()
+                if state == stand_in.task_states[-1]:
+                    break
+                time.sleep(0.01)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stand_in: "StandInAPIServer"
+
+
+class StandInAPIServer:
+    """Local stand-in of the token, bootstrap and task API endpoints.
+
+    Every response waits ``latency`` seconds, and ``error_rate`` of the
+    requests (0 to 1, picked with ``seed``) are answered with
+    ``error_status``. A token is given to the ``credentials`` (username,
+    password) and every token is valid.
+
+    A bootstrap POST creates a task that moves through ``task_states``, one
+    state every ``state_interval`` seconds. The task endpoint supports:
+
+    - ``long_poll``: honors ``Prefer: wait=N``, holding the response until
+      the task state changes.
+    - ``sse``: sends the task states as server-sent events when requested
+      with ``Accept: text/event-stream``.
+    - ``retry_after``: adds a ``Retry-After`` to the task responses.
+    - ``busy_responses``: the first task requests are answered with 429 and
+      a ``Retry-After`` of ``busy_retry_after`` seconds.
+
+    The bootstrap payloads received are in ``payloads``, the request bodies
+    are read with ``Content-Length`` or chunked. Request bodies with
+    ``Content-Encoding: gzip`` are decompressed with ``accept_gzip``.
+    Otherwise they are answered with ``gzip_status`` or, when it is None,
+    read as is, as the RSTUF API does (the bootstrap answers 400).
+
+    The payloads can also be uploaded in chunks (``ChunkedUpload``), the
+    uploads are in ``uploads``. ``upload_faults`` maps the number of a chunk
+    request (from 1) to a fault: ``drop`` closes the connection without
+    storing the chunk, ``lost`` stores it and closes the connection,
+    ``error`` answers 503 and ``corrupt`` answers 460 (checksum mismatch).
+    ``complete_fault`` loses the response of the first upload completion:
+    ``lost`` closes the connection after the bootstrap and ``forget`` also
+    removes the upload. With ``resumable`` False, the uploads aren't
+    implemented (404), as in the RSTUF API.
+    """
+
+    def __init__(
+        self,
+        task_states: Tuple[str, ...] = TASK_STATES,
+        state_interval: float = 0.1,
+        long_poll: bool = False,
+        sse: bool = False,
+        retry_after: Optional[float] = None,
+        busy_responses: int = 0,
+        busy_retry_after: float = 0,
+        accept_gzip: bool = True,
+        gzip_status: Optional[int] = 415,
+        upload_faults: Optional[Dict[int, str]] = None,
+        complete_fault: Optional[str] = None,
+        resumable: bool = True,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+        credentials: Tuple[str, str] = ("admin", "secret"),
+        port: int = 0,
+    ) -> None:
+        self.task_states = task_states
+        self.state_interval = state_interval
+        self.long_poll = long_poll
+        self.sse = sse
+        self.retry_after = retry_after
+        self.busy_responses = busy_responses
+        self.busy_retry_after = busy_retry_after
+        self.accept_gzip = accept_gzip
+        self.gzip_status = gzip_status
+        self.upload_faults = upload_faults or {}
+        self.complete_fault = complete_fault
+        self.resumable = resumable
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.credentials = credentials
+        self._random = random.Random(seed)
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.chunk_requests = 0
+        self.payloads: List[Any] = []
+        self.tasks: Dict[str, float] = {}
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.stand_in = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.01,), daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "StandInAPIServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInAPIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def log(
+        self, method: str, path: str, headers: Any, body: bytes = b""
+    ) -> None:
+        with self._lock:
+            self.requests.append(
+                {
+                    "method": method,
+                    "path": path,
+                    "headers": dict(headers),
+                    "body": body,
+                }
+            )
+
+    def inject_error(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def new_task(self) -> str:
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            self.tasks[task_id] = time.monotonic()
+
+        return task_id
+
+    def task_state(self, task_id: str) -> str:
+        elapsed = time.monotonic() - self.tasks[task_id]
+        index = min(
+            int(elapsed / self.state_interval), len(self.task_states) - 1
+        )
+        return self.task_states[index]
+
+    def task_body(self, task_id: str) -> Dict[str, Any]:
+        state = self.task_state(task_id)
+        data: Dict[str, Any] = {"task_id": task_id, "state": state}
+        if state == "SUCCESS":
+            data["result"] = {"details": {"bootstrap": True}}
+        elif state == "FAILURE":
+            data["result"] = "Bootstrap failed."
+
+        return {"data": data}
+
+    def task_requests(self) -> List[Dict[str, Any]]:
+        return [
+            r for r in self.requests if r["path"].startswith("/api/v1/task")
+        ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--state-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = StandInAPIServer(
+        state_interval=args.state_interval,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        port=args.port,
+    )
+    print(f"Serving the stand-in API on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server._server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark of the canonical JSON encoders used to sign the metadata.
+
+Usage: python -m benchmarks.canonical [--bins BITS] [--repeat N]
+"""
+import argparse
+import timeit
+from datetime import datetime
+
+from securesystemslib.keys import generate_ed25519_key
+from tuf.api.metadata import (
+    DelegatedRole,
+    Delegations,
+    Key,
+    MetaFile,
+    Snapshot,
+    Targets,
+)
+
+from repository_service_tuf.helpers.canonical import (
+    encode_canonical_json,
+    encode_canonical_orjson,
+    encode_canonical_reference,
+    orjson,
+)
+
+
+def _roles(bit_length: int):
+    """Role dicts similar to a ceremony with 2^bit_length hash bins"""
+    expires = datetime(2030, 1, 1)
+    snapshot = Snapshot(expires=expires)
+    for i in range(2**bit_length):
+        snapshot.meta[f"bins-{i:x}.json"] = MetaFile(version=1)
+
+    targets = Targets(expires=expires)
+    targets.delegations = Delegations(keys={}, roles={})
+    targets.delegations.roles["bin"] = DelegatedRole(
+        "bin", [], 1, False, paths=["*", "*/*"]
+    )
+    for _ in range(5):
+        key = Key.from_securesystemslib_key(generate_ed25519_key())
+        targets.add_key(key, "bin")
+
+    return {
+        "snapshot": snapshot.to_dict(),
+        "targets": targets.to_dict(),
+        "bins": Targets(expires=expires).to_dict(),
+    }
+
+
+def _time(encoder, data, repeat: int) -> float:
+    """Best time of the encoder in milliseconds"""
+    seconds = min(
+        timeit.repeat(lambda: encoder(data), number=repeat, repeat=3)
+    )
+    return seconds / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bins", type=int, default=12, help="bit length")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    encoders = {"json": encode_canonical_json}
+    if orjson:
+        encoders["orjson"] = encode_canonical_orjson
+
+    print(f"{'role':<10}{'encoder':<10}{'time (ms)':>12}{'speedup':>9}")
+    for name, data in _roles(args.bins).items():
+        expected = encode_canonical_reference(data)
+        reference = _time(encode_canonical_reference, data, args.repeat)
+        print(f"{name:<10}{'reference':<10}{reference:>12.3f}")
+        for encoder_name, encoder in encoders.items():
+            assert encoder(data) == expected
+            fast = _time(encoder, data, args.repeat)
+            print(
+                f"{name:<10}{encoder_name:<10}{fast:>12.3f}"
+                f"{reference / fast:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+"""
+End-to-end benchmark of the bootstrap against the local API stand-in.
+
+Every round runs 'rstuf admin login' and 'rstuf admin ceremony --bootstrap
+--upload' in this process, with a new config file, against the stand-in
+server (benchmarks/api_server.py). The API requests are traced with
+'--trace-http' to report the latency of every phase:
+
+    login             'rstuf admin login' command
+    ceremony          'rstuf admin ceremony --bootstrap --upload' command
+    token check       token requests of the ceremony
+    bootstrap check   bootstrap status requests of the ceremony
+    upload            bootstrap payload upload
+    task wait         from the first to the last task request
+    client            ceremony time out of the phases above
+
+Usage:
+
+    python -m benchmarks.e2e [--rounds N] [--bits BITS] [--latency SECONDS]
+        [--error-rate RATE] [--state-interval SECONDS] [--output FILE]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime
+from typing import Any, Dict, List
+
+from benchmarks.api_server import StandInAPIServer
+from benchmarks.scenarios import _roles_settings
+from repository_service_tuf.helpers.http_trace import percentile
+
+PHASES = [
+    "login",
+    "ceremony",
+    "token check",
+    "bootstrap check",
+    "upload",
+    "task wait",
+    "client",
+]
+
+
+def write_payload_file(path: str, bits: int) -> None:
+    """Writes a bootstrap payload with 2^bits hash bins."""
+    from repository_service_tuf.helpers.payload import write_payload
+    from repository_service_tuf.helpers.tuf import generate_metadata
+
+    settings = _roles_settings(1, bits)
+    payload_settings = {
+        "roles": {name: role.to_dict() for name, role in settings.items()}
+    }
+    with open(path, "w") as f:
+        write_payload(
+            f, payload_settings, generate_metadata(settings, save=False)
+        )
+
+
+def _rstuf(args: List[str]) -> float:
+    """Runs the rstuf command, returns the time in milliseconds."""
+    from repository_service_tuf.cli import rstuf
+
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        rstuf.main(args, prog_name="rstuf", standalone_mode=False)
+
+    return (time.perf_counter() - start) * 1000
+
+
+def _read_traces(path: str) -> List[Dict[str, Any]]:
+    with open(path) as trace_file:
+        return [json.loads(line) for line in trace_file]
+
+
+def _span(traces: List[Dict[str, Any]]) -> float:
+    """Milliseconds from the start of the first to the end of the last."""
+    if not traces:
+        return 0.0
+
+    starts = [datetime.fromisoformat(t["start"]).timestamp() for t in traces]
+    end = max(s * 1000 + t["total"] for s, t in zip(starts, traces))
+    return end - min(starts) * 1000
+
+
+def run_round(server: StandInAPIServer, payload: str) -> Dict[str, float]:
+    """Runs login and ceremony upload, returns the phases latency (ms)."""
+    with tempfile.TemporaryDirectory() as workdir:
+        config = os.path.join(workdir, "rstuf.ini")
+        login_trace = os.path.join(workdir, "login.jsonl")
+        ceremony_trace = os.path.join(workdir, "ceremony.jsonl")
+        phases = {}
+        phases["login"] = _rstuf(
+            ["-c", config, "--trace-http", login_trace, "admin", "login"]
+            + ["-s", server.url, "-u", "admin", "-p", "secret", "-e", "1"]
+        )
+        phases["ceremony"] = _rstuf(
+            ["-c", config, "--trace-http", ceremony_trace, "admin"]
+            + ["ceremony", "--bootstrap", "--upload", "--file", payload]
+        )
+        traces = _read_traces(ceremony_trace)
+
+    def _total(method: str, path: str) -> float:
+        return sum(
+            t["total"]
+            for t in traces
+            if t["method"] == method and path in t["url"]
+        )
+
+    phases["token check"] = _total("GET", "/api/v1/token/")
+    phases["bootstrap check"] = _total("GET", "/api/v1/bootstrap/")
+    phases["upload"] = _total("POST", "/api/v1/bootstrap/")
+    phases["task wait"] = _span(
+        [t for t in traces if "/api/v1/task/" in t["url"]]
+    )
+    phases["client"] = phases["ceremony"] - sum(
+        phases[phase] for phase in PHASES[2:6]
+    )
+    return phases
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--bits", type=int, default=8, help="hash bins bits of the payload"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="server latency (s)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="server error rate"
+    )
+    parser.add_argument(
+        "--state-interval",
+        type=float,
+        default=0.5,
+        help="seconds between the bootstrap task states",
+    )
+    parser.add_argument("--output", help="write results as JSON to OUTPUT")
+    args = parser.parse_args()
+
+    results: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        payload = os.path.join(workdir, "payload.json")
+        write_payload_file(payload, args.bits)
+        with StandInAPIServer(
+            state_interval=args.state_interval,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            seed=0,
+        ) as server:
+            for _ in range(args.rounds):
+                try:
+                    phases = run_round(server, payload)
+                except Exception as err:
+                    failures.append(str(err))
+                    continue
+
+                for phase, latency in phases.items():
+                    results[phase].append(latency)
+
+    summary = {
+        phase: {
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "mean_ms": round(sum(values) / len(values), 1),
+        }
+        for phase, values in results.items()
+        if values
+    }
+    print(f"{'phase':<18}{'p50 (ms)':>10}{'p95 (ms)':>10}{'mean (ms)':>11}")
+    for phase, metrics in summary.items():
+        print(
+            f"{phase:<18}{metrics['p50_ms']:>10.1f}"
+            f"{metrics['p95_ms']:>10.1f}{metrics['mean_ms']:>11.1f}"
+        )
+
+    for failure in failures:
+        print(f"FAILED round: {failure}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "parameters": vars(args),
+                    "rounds": args.rounds,
+                    "failures": failures,
+                    "phases": summary,
+                },
+                f,
+                indent=2,
+            )
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+"""
+Import-time benchmark of the CLI startup.
+
+Every command runs in a new interpreter with '-X importtime'. It reports
+the import time (sum of the modules import times, the best of the runs)
+and the slowest modules, and checks the budgets: the maximum import time
+and the modules that must not be imported by the command. The tests
+check the modules budget, and the time budget with
+RSTUF_IMPORT_TIME_BUDGET=1 (it depends on the machine).
+
+Usage:
+
+    python -m benchmarks.import_time [--repeat N] [--top N]
+"""
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+
+@dataclass
+class Budget:
+    """Import time (milliseconds) and modules budget of a command."""
+
+    max_ms: float
+    forbidden: Tuple[str, ...]
+
+
+# the commands import their modules only, not the other commands or the
+# metadata libraries
+BUDGETS = {
+    "--version": Budget(
+        max_ms=400,
+        forbidden=(
+            "dynaconf",
+            "repository_service_tuf.cli.admin",
+            "requests",
+            "securesystemslib",
+            "tuf",
+            "urllib3",
+        ),
+    ),
+    "admin token inspect --help": Budget(
+        max_ms=600,
+        forbidden=(
+            "repository_service_tuf.cli.admin.bench",
+            "repository_service_tuf.cli.admin.ceremony",
+            "repository_service_tuf.cli.admin.login",
+            "securesystemslib",
+            "tuf",
+        ),
+    ),
+}
+
+
+def import_times(command: str) -> Dict[str, float]:
+    """Runs the command in a new interpreter, returns the import times.
+
+    The times are the modules own import times, in milliseconds.
+    """
+    code = (
+        "from repository_service_tuf.cli import rstuf\n"
+        f"rstuf({command.split()!r}, prog_name='rstuf', "
+        "standalone_mode=False)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        _, _, fields = line.partition("import time:")
+        self_us, _, name = fields.split("|")
+        times[name.strip()] = int(self_us) / 1000
+
+    return times
+
+
+def measure(command: str, repeat: int = 3) -> Dict[str, float]:
+    """Import times of the run with the lowest total time."""
+    return min(
+        (import_times(command) for _ in range(repeat)),
+        key=lambda times: sum(times.values()),
+    )
+
+
+def check_budget(
+    command: str, times: Dict[str, float], check_time: bool = True
+) -> List[str]:
+    """Returns the budget violations of the command import times. Without
+    ``check_time`` only the modules are checked."""
+    budget = BUDGETS[command]
+    violations = []
+    total = sum(times.values())
+    if check_time and total > budget.max_ms:
+        violations.append(
+            f"imports took {total:.1f} ms, budget {budget.max_ms} ms"
+        )
+
+    for module in sorted(times):
+        if any(
+            module == forbidden or module.startswith(f"{forbidden}.")
+            for forbidden in budget.forbidden
+        ):
+            violations.append(f"imports {module}")
+
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--top", type=int, default=10, help="number of slowest modules"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    top = args.top
+    for command in BUDGETS:
+        times = measure(command, args.repeat)
+        print(
+            f"rstuf {command}: {sum(times.values()):.1f} ms, "
+            f"{len(times)} modules (budget {BUDGETS[command].max_ms} ms)"
+        )
+        slowest = sorted(times.items(), key=lambda item: -item[1])
+        for module, ms in slowest[:top]:
+            print(f"    {ms:>8.1f} ms  {module}")
+
+        for violation in check_budget(command, times):
+            failed = True
+            print(f"    BUDGET EXCEEDED: {violation}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark suite runner.
+
+Every scenario runs in a new process, offline, and records the wall time,
+the peak RSS, the peak traced memory and the allocated memory blocks. The
+results are compared with the baseline to report regressions.
+
+Usage:
+
+    python -m benchmarks.run [--full] [--filter NAME] [--output FILE]
+    python -m benchmarks.run --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.scenarios import SCENARIOS, SUITE, SUITE_FULL
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# metrics compared with the baseline and the minimum absolute increase
+# reported as regression, it avoids noise in very short benchmarks
+METRICS = {"wall_time_s": 0.005, "peak_rss_kib": 1024, "traced_peak_kib": 64}
+# number of timed runs, the best time is recorded
+REPEAT = 3
+
+
+def _benchmark_id(scenario: str, params: Dict[str, Any]) -> str:
+    return " ".join(
+        [scenario, *[f"{key}={value}" for key, value in params.items()]]
+    )
+
+
+def _peak_rss_kib() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_scenario(scenario: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs the scenario in this process and returns the metrics"""
+    with tempfile.TemporaryDirectory() as workdir:
+        run = SCENARIOS[scenario](workdir, **params)
+
+        wall_time = None
+        for _ in range(REPEAT):
+            gc.collect()
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            wall_time = (
+                elapsed if wall_time is None else min(wall_time, elapsed)
+            )
+        peak_rss = _peak_rss_kib()
+
+        # second run traced, tracemalloc slows down the execution
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated_blocks = sys.getallocatedblocks() - blocks
+
+    return {
+        "wall_time_s": round(wall_time, 4),
+        "peak_rss_kib": peak_rss,
+        "traced_peak_kib": traced_peak // 1024,
+        "allocated_blocks": allocated_blocks,
+    }
+
+
+def _run_isolated(scenario: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.run",
+            "--worker",
+            json.dumps([scenario, params]),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{scenario} {params} failed:\n{result.stderr}")
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[Tuple[str, str, float, float]]:
+    """Returns the (benchmark, metric, baseline, result) regressions"""
+    regressions = []
+    for benchmark, metrics in results.items():
+        if benchmark not in baseline:
+            continue
+
+        for metric, min_delta in METRICS.items():
+            expected = baseline[benchmark][metric]
+            if (
+                metrics[metric] > expected * (1 + tolerance)
+                and metrics[metric] - expected > min_delta
+            ):
+                regressions.append(
+                    (benchmark, metric, expected, metrics[metric])
+                )
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--full", action="store_true", help="run up to 16384")
+    parser.add_argument("--filter", help="run benchmarks containing FILTER")
+    parser.add_argument("--output", help="write results as JSON to OUTPUT")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed increase over the baseline (default: 0.25)",
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        scenario, params = json.loads(args.worker)
+        print(json.dumps(run_scenario(scenario, params)))
+        return 0
+
+    suite = SUITE + SUITE_FULL if args.full else SUITE
+    results = {}
+    print(
+        f"{'benchmark':<32}{'time (s)':>10}{'rss (KiB)':>12}"
+        f"{'traced (KiB)':>14}{'blocks':>10}"
+    )
+    for scenario, params in suite:
+        benchmark = _benchmark_id(scenario, params)
+        if args.filter and args.filter not in benchmark:
+            continue
+
+        metrics = _run_isolated(scenario, params)
+        results[benchmark] = metrics
+        print(
+            f"{benchmark:<32}{metrics['wall_time_s']:>10.3f}"
+            f"{metrics['peak_rss_kib']:>12}{metrics['traced_peak_kib']:>14}"
+            f"{metrics['allocated_blocks']:>10}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        return 0
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for benchmark, metric, expected, result in regressions:
+        print(f"REGRESSION {benchmark}: {metric} {expected} -> {result}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark scenarios of the ceremony hot paths.
+
+Every scenario receives a work directory and its parameters and returns a
+function that runs the measured code.
+"""
+import os
+import subprocess
+import sys
+from typing import Any, Callable, Dict
+
+from securesystemslib.interface import (  # type: ignore
+    generate_and_write_ed25519_keypair,
+)
+from securesystemslib.keys import generate_ed25519_key  # type: ignore
+
+ROLES = ["root", "targets", "snapshot", "timestamp", "bin", "bins"]
+PASSWORD = "strongPass"
+
+
+def _roles_settings(keys: int, bits: int) -> Dict[str, Any]:
+    from repository_service_tuf.helpers.tuf import (
+        KeyInput,
+        KeySchema,
+        RoleSettingsInput,
+    )
+
+    settings = {}
+    for role_name in ROLES:
+        settings[role_name] = RoleSettingsInput(
+            threshold=keys,
+            num_of_keys=keys,
+            keys={
+                f"{role_name}_{i}": KeyInput(
+                    filepath=f"{role_name}_{i}.key",
+                    password=PASSWORD,
+                    key=KeySchema(key=generate_ed25519_key()),
+                )
+                for i in range(keys)
+            },
+            paths=["*", "*/*"] if role_name == "targets" else None,
+            number_hash_prefixes=bits if role_name == "bins" else None,
+        )
+
+    return settings
+
+
+def metadata(workdir: str, bits: int, keys: int) -> Callable[[], Any]:
+    """Generates all metadata for 2^bits hash bins and keys per role"""
+    from repository_service_tuf.helpers.tuf import generate_metadata
+
+    settings = _roles_settings(keys, bits)
+
+    def run():
+        for _ in generate_metadata(settings, save=False):
+            pass
+
+    return run
+
+
+def payload(workdir: str, bits: int, keys: int) -> Callable[[], Any]:
+    """Generates all metadata and writes the bootstrap payload file"""
+    from repository_service_tuf.helpers.payload import write_payload
+    from repository_service_tuf.helpers.tuf import generate_metadata
+
+    settings = _roles_settings(keys, bits)
+    payload_settings = {
+        "roles": {name: role.to_dict() for name, role in settings.items()}
+    }
+
+    def run():
+        with open(os.path.join(workdir, "payload.json"), "w") as f:
+            write_payload(
+                f, payload_settings, generate_metadata(settings, save=False)
+            )
+
+    return run
+
+
+def load_key(workdir: str, keys: int) -> Callable[[], Any]:
+    """Loads (decrypts) keys from password protected key files"""
+    from repository_service_tuf.cli.admin.ceremony import _load_key
+
+    filepaths = []
+    for i in range(keys):
+        filepath = os.path.join(workdir, f"key{i}")
+        generate_and_write_ed25519_keypair(PASSWORD, filepath=filepath)
+        filepaths.append(filepath)
+
+    def run():
+        for filepath in filepaths:
+            key = _load_key(filepath, PASSWORD)
+            assert key.error is None, key.error
+
+    return run
+
+
+def cli_startup(workdir: str, command: str) -> Callable[[], Any]:
+    """Starts a new interpreter that runs an 'rstuf' command"""
+    code = (
+        "import sys\n"
+        "from repository_service_tuf.cli import rstuf\n"
+        f"rstuf({command.split()!r}, standalone_mode=False)\n"
+    )
+
+    def run():
+        subprocess.run(
+            [sys.executable, "-c", code],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            cwd=os.getcwd(),
+        )
+
+    return run
+
+
+SCENARIOS: Dict[str, Callable[..., Callable[[], Any]]] = {
+    "metadata": metadata,
+    "payload": payload,
+    "load_key": load_key,
+    "cli_startup": cli_startup,
+}
+
+# (scenario, parameters) of the default suite
+SUITE = [
+    *[("metadata", {"bits": bits, "keys": 1}) for bits in [3, 8, 10, 12]],
+    *[("metadata", {"bits": 8, "keys": keys}) for keys in [3, 5]],
+    *[("payload", {"bits": bits, "keys": 1}) for bits in [3, 8, 10, 12]],
+    ("load_key", {"keys": 1}),
+    ("load_key", {"keys": 4}),
+    ("cli_startup", {"command": "--version"}),
+    ("cli_startup", {"command": "admin --help"}),
+]
+
+# additional (scenario, parameters) of the full suite
+SUITE_FULL = [
+    ("metadata", {"bits": 14, "keys": 1}),
+    ("metadata", {"bits": 14, "keys": 3}),
+    ("payload", {"bits": 14, "keys": 1}),
+]
@@ -2,4 +2,12 @@
 #
 # SPDX-License-Identifier: MIT
 
-from dynaconf import Dynaconf  # noqa F401
+
+def __getattr__(name):
+    # Dynaconf is slow to import, it is imported when used
+    if name == "Dynaconf":
+        from dynaconf import Dynaconf
+
+        return Dynaconf
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
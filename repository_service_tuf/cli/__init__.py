@@ -4,33 +4,65 @@
 
 import importlib
 import os
-import pkgutil
-import re
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 import rich_click as click  # type: ignore
+from rich.console import Console  # type: ignore
 
-from repository_service_tuf import Dynaconf
 from repository_service_tuf.__version__ import version
 
+if TYPE_CHECKING:
+    from repository_service_tuf.helpers.http_trace import HTTPTracer
+
 HOME = str(Path.home())
 
-# attempt to find the program name from pyproject.toml or give a default
-prog_name = "rstuf"
-try:
-    with open("pyproject.toml") as file:
-        for line in file:
-            match = re.search("repository_service_tuf.cli:rstuf", line)
 
-            if match:
-                prog_name = line.split("=")[0].strip()
-                break
+class LazyGroup(click.RichGroup):
+    """Command group that imports the module of a command when it is used.
+
+    ``lazy_commands`` maps the command names to the ``module:attribute``
+    of the commands. Only the modules of the commands invoked (or listed,
+    i.e. in the help) are imported, keeping the startup fast.
+    """
+
+    def __init__(
+        self,
+        *args,
+        lazy_commands: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def add_lazy_command(self, name: str, import_path: str) -> None:
+        self.lazy_commands[name] = import_path
 
-except FileNotFoundError:
-    pass
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(
+            set(super().list_commands(ctx)) | set(self.lazy_commands)
+        )
 
+    def get_command(
+        self, ctx: click.Context, cmd_name: str
+    ) -> Optional[click.Command]:
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_commands[cmd_name].split(":")
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
 
-@click.group(context_settings={"help_option_names": ["-h", "--help"]})
+        return super().get_command(ctx, cmd_name)
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_commands={
+        "admin": "repository_service_tuf.cli.admin:admin",
+        "key-agent": "repository_service_tuf.cli.key_agent:key_agent",
+        "shell": "repository_service_tuf.cli.shell:shell",
+    },
+    context_settings={"help_option_names": ["-h", "--help"]},
+)
 @click.option(
     "-c",
     "--config",
@@ -39,21 +71,72 @@ except FileNotFoundError:
     help="Repository Service for TUF config file",
     required=False,
 )
+@click.option(
+    "--no-token-cache",
+    "no_token_cache",
+    help=(
+        "Check the token with the server, instead of the cache of tokens"
+        " validated before (config file + '.token-cache')"
+    ),
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--trace-http",
+    "trace_http",
+    help=(
+        "Append a JSON line with the timings (DNS, connect, TLS, TTFB and "
+        "total), bytes, status and retries of every API request to the file"
+        ", and show a summary at exit"
+    ),
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    required=False,
+)
 # adds the --version parameter
-@click.version_option(prog_name=prog_name, version=version)
+@click.version_option(version=version)
 @click.pass_context
-def rstuf(context, config):
+def rstuf(context, config, no_token_cache, trace_http):
     """
     Repository Service for TUF Command Line Interface (CLI).
     """
+    # the shell runs the commands with its obj: the settings, HTTP session,
+    # token cache and tracer are the shell ones
+    if context.obj is not None and context.obj.get("config") == config:
+        return
+
+    # imported here, --help and --version don't need them (i.e. requests)
+    from repository_service_tuf import Dynaconf
+    from repository_service_tuf.helpers import api_client
+    from repository_service_tuf.helpers.http_trace import HTTPTracer
+
+    settings = Dynaconf(settings_files=[config])
+    api_client.configure_session(
+        api_client.SessionSettings.from_settings(settings)
+    )
+    api_client.configure_token_cache(
+        None
+        if no_token_cache
+        else api_client.TokenCache(f"{config}.token-cache")
+    )
+    tracer = None
+    if trace_http:
+        tracer = HTTPTracer(trace_http)
+        api_client.configure_tracer(tracer)
+        context.call_on_close(lambda: _trace_summary(tracer))
+
     context.obj = {
-        "settings": Dynaconf(settings_files=[config]),
+        "settings": settings,
         "config": config,
+        "no_token_cache": no_token_cache,
+        "tracer": tracer,
     }
 
 
-# Register all command groups
-for _, name, _ in pkgutil.walk_packages(  # type: ignore
-    __path__, prefix=__name__ + "."
-):
-    importlib.import_module(name)
+def _trace_summary(tracer: "HTTPTracer") -> None:
+    from repository_service_tuf.helpers import api_client
+
+    api_client.configure_tracer(None)
+    tracer.close()
+    if tracer.traces:
+        Console(stderr=True).print(tracer.summary())
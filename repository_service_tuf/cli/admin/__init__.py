@@ -2,9 +2,15 @@
 #
 # SPDX-License-Identifier: MIT
 
-from repository_service_tuf.cli import rstuf
+from repository_service_tuf.cli import LazyGroup, rstuf
 
 
-@rstuf.group()
+@rstuf.group(
+    cls=LazyGroup,
+    lazy_commands={
+        name: f"repository_service_tuf.cli.admin.{name}:{name}"
+        for name in ("bench", "ceremony", "login", "token")
+    },
+)
 def admin():
     """Administrative Commands"""
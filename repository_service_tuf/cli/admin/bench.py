@@ -0,0 +1,311 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich import table  # type: ignore
+from rich.console import Console  # type: ignore
+
+from repository_service_tuf.cli import click
+from repository_service_tuf.cli.admin import admin
+from repository_service_tuf.helpers.api_client import URL, Methods, is_logged
+from repository_service_tuf.helpers.async_api_client import AsyncAPIClient
+from repository_service_tuf.helpers.http_trace import percentile
+
+console = Console()
+
+ENDPOINTS = ("token-check", "token-new", "task")
+
+
+@dataclass
+class EndpointStats:
+    """Latencies (milliseconds) and statuses of the requests to an endpoint.
+
+    The status is the HTTP status code or the error message of the request
+    that failed without a response. Requests without a 2xx status are
+    errors.
+    """
+
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def add(self, latency: float, status: str, ok: bool) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "throughput_rps": round(len(self.latencies) / elapsed, 2),
+        }
+        if self.latencies:
+            data["latency_ms"] = {
+                "p50": round(percentile(self.latencies, 50), 3),
+                "p95": round(percentile(self.latencies, 95), 3),
+                "p99": round(percentile(self.latencies, 99), 3),
+                "mean": round(sum(self.latencies) / len(self.latencies), 3),
+                "max": round(max(self.latencies), 3),
+            }
+
+        return data
+
+
+def _endpoint_requests(
+    token: str, task_id: str, scopes: Tuple[str, ...]
+) -> Dict[str, Tuple[str, Methods, Dict[str, Any]]]:
+    """The url, method and arguments of the request of each endpoint."""
+    return {
+        "token-check": (f"{URL.token.value}?token={token}", Methods.get, {}),
+        "token-new": (
+            f"{URL.token.value}new/",
+            Methods.post,
+            {"payload": {"scopes": list(scopes), "expires": 1}},
+        ),
+        "task": (f"{URL.task.value}{task_id}", Methods.get, {}),
+    }
+
+
+async def _run_bench(
+    server: str,
+    token: str,
+    endpoints: Tuple[str, ...],
+    requests: int,
+    concurrency: int,
+    duration: Optional[float] = None,
+    task_id: Optional[str] = None,
+    scopes: Tuple[str, ...] = ("read:bootstrap",),
+) -> Tuple[Dict[str, EndpointStats], float]:
+    """Requests the endpoints, in turns, from ``concurrency`` workers.
+
+    It sends ``requests`` requests, or as many as possible in ``duration``
+    seconds. Returns the stats by endpoint and the elapsed seconds.
+    """
+    endpoint_requests = _endpoint_requests(
+        token, task_id or uuid.uuid4().hex, scopes
+    )
+    stats = {endpoint: EndpointStats() for endpoint in endpoints}
+    counter = itertools.count()
+    client = AsyncAPIClient(
+        server,
+        headers={"Authorization": f"Bearer {token}"},
+        max_connections=concurrency,
+    )
+    start = time.perf_counter()
+    deadline = None if duration is None else start + duration
+
+    async def worker() -> None:
+        for number in counter:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            elif number >= requests:
+                return
+
+            endpoint = endpoints[number % len(endpoints)]
+            url, method, kwargs = endpoint_requests[endpoint]
+            sent = time.perf_counter()
+            try:
+                response = await client.request(url, method, **kwargs)
+                status = str(response.status_code)
+                ok = 200 <= response.status_code < 300
+            except click.ClickException as err:
+                status = err.message
+                ok = False
+
+            stats[endpoint].add(
+                (time.perf_counter() - sent) * 1000, status, ok
+            )
+
+    async with client:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return stats, time.perf_counter() - start
+
+
+def _results(
+    server: str,
+    concurrency: int,
+    stats: Dict[str, EndpointStats],
+    elapsed: float,
+) -> Dict[str, Any]:
+    total = EndpointStats()
+    for endpoint_stats in stats.values():
+        total.latencies += endpoint_stats.latencies
+        total.errors += endpoint_stats.errors
+        for status, count in endpoint_stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "server": server,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "total": total.to_dict(elapsed),
+        "endpoints": {
+            endpoint: endpoint_stats.to_dict(elapsed)
+            for endpoint, endpoint_stats in stats.items()
+        },
+    }
+
+
+def _results_table(results: Dict[str, Any]) -> table.Table:
+    results_table = table.Table(
+        title=(
+            f"{results['server']} (concurrency {results['concurrency']}, "
+            f"{results['elapsed_s']}s)"
+        )
+    )
+    for column in (
+        "Endpoint",
+        "Requests",
+        "Errors",
+        "Status",
+        "Throughput (req/s)",
+        "p50 (ms)",
+        "p95 (ms)",
+        "p99 (ms)",
+        "Max (ms)",
+    ):
+        results_table.add_column(
+            column, justify="left" if column == "Endpoint" else "right"
+        )
+
+    rows = list(results["endpoints"].items())
+    if len(rows) > 1:
+        rows.append(("total", results["total"]))
+
+    for endpoint, data in rows:
+        latency = data.get("latency_ms", {})
+        results_table.add_row(
+            endpoint,
+            str(data["requests"]),
+            str(data["errors"]),
+            " ".join(f"{s}×{n}" for s, n in sorted(data["statuses"].items())),
+            f"{data['throughput_rps']:.1f}",
+            *(
+                f"{latency[name]:.1f}" if latency else "-"
+                for name in ("p50", "p95", "p99", "max")
+            ),
+        )
+
+    return results_table
+
+
+@admin.command()
+@click.option(
+    "-e",
+    "--endpoint",
+    "endpoints",
+    help=(
+        "Endpoint to request, in turns when multiple. 'token-check' "
+        "validates the token, 'token-new' creates tokens and 'task' gets "
+        "a task state"
+    ),
+    type=click.Choice(ENDPOINTS),
+    multiple=True,
+    default=("token-check",),
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--requests",
+    "requests",
+    help="Number of requests",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    "concurrency",
+    help="Number of concurrent requests (and connections)",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+)
+@click.option(
+    "-d",
+    "--duration",
+    "duration",
+    help="Send requests for the seconds given, instead of -n/--requests",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+)
+@click.option(
+    "--task-id",
+    "task_id",
+    help="Task id of the 'task' endpoint. Default: a random id",
+    default=None,
+)
+@click.option(
+    "-s",
+    "--scope",
+    "scopes",
+    help="Scope of the tokens of the 'token-new' endpoint",
+    multiple=True,
+    default=("read:bootstrap",),
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    help="Write the results as JSON to the file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
+@click.pass_context
+def bench(
+    context,
+    endpoints,
+    requests,
+    concurrency,
+    duration,
+    task_id,
+    scopes,
+    output,
+):
+    """
+    Load test the Repository Service for TUF API.
+    """
+    settings = context.obj.get("settings")
+    server = settings.get("SERVER")
+    token = settings.get("TOKEN")
+    if server is None or token is None:
+        raise click.ClickException("Not logged. Use 'rstuf-cli admin login'")
+
+    login = is_logged(server, token)
+    if login is None or login.state is False:
+        raise click.ClickException("Not logged. Use 'rstuf-cli admin login'")
+
+    stats, elapsed = asyncio.run(
+        _run_bench(
+            server,
+            token,
+            endpoints,
+            requests,
+            concurrency,
+            duration=duration,
+            task_id=task_id,
+            scopes=scopes,
+        )
+    )
+    results = _results(server, concurrency, stats, elapsed)
+    console.print(_results_table(results))
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
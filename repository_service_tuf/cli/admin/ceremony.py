@@ -5,12 +5,18 @@
 #
 # Ceremony
 #
+import hashlib
 import json
 import os
-import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from dataclasses import asdict, dataclass
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 from rich import box, markdown, prompt, table  # type: ignore
 from rich.console import Console  # type: ignore
@@ -23,20 +29,34 @@ from securesystemslib.exceptions import (  # type: ignore
 from securesystemslib.interface import (  # type: ignore
     import_ed25519_privatekey_from_file,
 )
+from tuf.api.exceptions import UnsignedMetadataError
 
 from repository_service_tuf.cli import click
 from repository_service_tuf.cli.admin import admin
 from repository_service_tuf.helpers.api_client import (
     URL,
+    ChunkedUpload,
     Methods,
+    SessionSettings,
+    TaskWaiter,
     is_logged,
     request_server,
+    upload_payload,
+    upload_payload_file,
+)
+from repository_service_tuf.helpers.key_agent import (
+    KeyAgentError,
+    configured_agent,
+)
+from repository_service_tuf.helpers.payload import (
+    validate_payload,
+    write_payload_file,
 )
 from repository_service_tuf.helpers.tuf import (
     KeyInput,
     KeySchema,
     RoleSettingsInput,
-    initialize_metadata,
+    generate_metadata,
 )
 
 CEREMONY_INTRO = """
@@ -278,12 +298,16 @@ class PayloadSettings:
 
 
 OFFLINE_KEYS = {Roles.ROOT.value, Roles.TARGETS.value, Roles.BIN.value}
+# default seconds to wait for the bootstrap task to finish
+TASK_TIMEOUT = 3600
 
-# generate the basic data structure
-SETTINGS = PayloadSettings(
-    roles={role.value: RoleSettingsInput() for role in Roles},
-    service=ServiceSettings(targets_base_url=""),
-)
+
+def _new_payload_settings() -> PayloadSettings:
+    """Generates the basic data structure, new for every ceremony."""
+    return PayloadSettings(
+        roles={role.value: RoleSettingsInput() for role in Roles},
+        service=ServiceSettings(targets_base_url=""),
+    )
 
 
 def _key_is_duplicated(
@@ -301,9 +325,60 @@ def _key_is_duplicated(
     return False
 
 
-def _load_key(filepath: str, password: str) -> KeySchema:
+# keys decrypted before by (path, modification time, password digest),
+# kept between the ceremonies of the shell, disabled when None
+_key_cache: Optional[Dict[Tuple[str, int, str], Dict[str, Any]]] = None
+
+
+def configure_key_cache(
+    key_cache: Optional[Dict[Tuple[str, int, str], Dict[str, Any]]]
+) -> None:
+    """Configures the cache of decrypted keys, None disables it."""
+    global _key_cache
+    _key_cache = key_cache
+
+
+def _key_cache_key(
+    filepath: str, password: str
+) -> Optional[Tuple[str, int, str]]:
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except OSError:
+        return None
+
+    return (
+        os.path.abspath(filepath),
+        mtime,
+        hashlib.sha256(password.encode()).hexdigest(),
+    )
+
+
+def _load_key(filepath: str, password: str, online: bool = False) -> KeySchema:
+    """Loads the key file, with the key agent when it is running.
+
+    The key agent (``RSTUF_KEY_AGENT_SOCK``) decrypts and holds the key, and
+    gives only the public key, the private key stays in the agent to sign.
+    The ``online`` keys are sent to the service, their private key is
+    exported from the agent.
+    """
+    agent = configured_agent()
+    if agent is not None:
+        try:
+            return KeySchema(key=agent.add(filepath, password, export=online))
+        except KeyAgentError as err:
+            return KeySchema(error=f":cross_mark: [red]Failed[/]: {str(err)}")
+
+    cache_key = None
+    if _key_cache is not None:
+        cache_key = _key_cache_key(filepath, password)
+        if cache_key in _key_cache:
+            return KeySchema(key=_key_cache[cache_key])
+
     try:
         key = import_ed25519_privatekey_from_file(filepath, password)
+        if _key_cache is not None and cache_key is not None:
+            _key_cache[cache_key] = key
+
         return KeySchema(key=key)
     except CryptoError as err:
         return KeySchema(
@@ -317,7 +392,9 @@ def _load_key(filepath: str, password: str) -> KeySchema:
         return KeySchema(error=f":cross_mark: [red]Failed[/]: {str(err)}")
 
 
-def _configure_role(rolename: str, role: RoleSettingsInput) -> None:
+def _configure_role(
+    rolename: str, role: RoleSettingsInput, payload: PayloadSettings
+) -> None:
     # default reset when start configuration
     role.keys = dict()
 
@@ -370,7 +447,7 @@ def _configure_role(rolename: str, role: RoleSettingsInput) -> None:
         if targets_base_url.endswith("/") is False:
             targets_base_url = targets_base_url + "/"
 
-        SETTINGS.service.targets_base_url = targets_base_url
+        payload.service.targets_base_url = targets_base_url
 
         input_paths = prompt.Prompt.ask(
             f"\nWhat [green]paths[/] [cyan]{rolename}[/] delegates?",
@@ -388,44 +465,360 @@ def _configure_role(rolename: str, role: RoleSettingsInput) -> None:
         )
 
 
-def _configure_keys(rolename: str, role: RoleSettingsInput) -> None:
-    key_count = 1
-    while len(role.keys) < role.num_of_keys:
+@dataclass
+class _KeyVerification:
+    rolename: str
+    role: RoleSettingsInput
+    number: int
+    filepath: str
+    password: str
+    result: "Future[KeySchema]"
+
+
+class _KeyVerifier:
+    """Verifies the keys entered by the operator in background threads.
+
+    Decrypting a key file runs a deliberately slow key derivation, the
+    operator enters the next key meanwhile. The operator enters again the
+    keys failed (or duplicated). Once all the keys are verified, they are
+    kept in their role by number, as in the serial ceremony, also when a
+    key entered again is verified after the next ones.
+    """
+
+    def __init__(self, payload: PayloadSettings, executor: Executor):
+        self.payload = payload
+        self.executor = executor
+        self.pending: List[_KeyVerification] = []
+        self.verified: List[_KeyVerification] = []
+
+    def entered(self, role: RoleSettingsInput) -> int:
+        """Number of keys of the role verified or being verified."""
+        pending = [v for v in self.pending if v.role is role]
+        return len(role.keys) + len(pending)
+
+    def prompt_key(
+        self, rolename: str, role: RoleSettingsInput, number: int
+    ) -> None:
+        """Prompts the key number of the role, and starts verifying it."""
         filepath = prompt.Prompt.ask(
-            f"\nEnter {key_count}/{role.num_of_keys} the "
+            f"\nEnter {number}/{role.num_of_keys} the "
             f"[cyan]{rolename}[/]`s Key [green]path[/]"
         )
 
         password = click.prompt(
-            f"Enter {key_count}/{role.num_of_keys} the "
+            f"Enter {number}/{role.num_of_keys} the "
             f"{rolename}`s Key password",
             hide_input=True,
         )
-        key: KeySchema = _load_key(filepath, password)
+        result = self.executor.submit(
+            _load_key, filepath, password, online=not role.offline_keys
+        )
+        self.pending.append(
+            _KeyVerification(
+                rolename=rolename,
+                role=role,
+                number=number,
+                filepath=filepath,
+                password=password,
+                result=result,
+            )
+        )
 
-        if key.error:
-            console.print(key.error)
-            try_again = prompt.Confirm.ask("Try again?", default="y")
-            if try_again:
+    def check(self, wait: bool = False) -> None:
+        """Adds the verified keys and prompts again the failed keys.
+
+        Only the keys already verified, in the order they were entered, or
+        all the keys with ``wait``.
+        """
+        while self.pending and (wait or self.pending[0].result.done()):
+            verification = self.pending.pop(0)
+            rolename = verification.rolename
+            role = verification.role
+            number = verification.number
+            key: KeySchema = verification.result.result()
+            key_name = f"{rolename} key {number}/{role.num_of_keys}"
+            if key.error:
+                console.print(f"{key_name} ({verification.filepath}):")
+                console.print(key.error)
+                try_again = prompt.Confirm.ask("Try again?", default="y")
+                if not try_again:
+                    raise click.ClickException("Required key not validated.")
+
+                self.prompt_key(rolename, role, number)
                 continue
-            else:
-                raise click.ClickException("Required key not validated.")
 
-        roles_settings = list(SETTINGS.roles.values())
-        if key.key is not None and (
-            _key_is_duplicated(roles_settings, key.key, filepath) is True
-        ):
-            console.print(":cross_mark: [red]Failed[/]: Key is duplicated.")
+            roles_settings = list(self.payload.roles.values())
+            if key.key is not None and (
+                _key_is_duplicated(
+                    roles_settings, key.key, verification.filepath
+                )
+                is True
+            ):
+                console.print(
+                    f"{key_name} ({verification.filepath}): "
+                    ":cross_mark: [red]Failed[/]: Key is duplicated."
+                )
+                self.prompt_key(rolename, role, number)
+                continue
+
+            role.keys[f"{rolename}_{number}"] = KeyInput(
+                filepath=verification.filepath,
+                password=verification.password,
+                key=key,
+            )
+            self.verified.append(verification)
+            console.print(
+                f":white_check_mark: {rolename} Key "
+                f"{number}/{role.num_of_keys} [green]Verified[/]"
+            )
+
+        if not self.pending:
+            self._sort_keys()
+
+    def _sort_keys(self) -> None:
+        """Sorts the verified keys of their roles by number."""
+        verified = sorted(self.verified, key=lambda v: v.number)
+        for role in {id(v.role): v.role for v in verified}.values():
+            names = [
+                f"{v.rolename}_{v.number}" for v in verified if v.role is role
+            ]
+            keys = {n: k for n, k in role.keys.items() if n not in names}
+            keys.update((name, role.keys[name]) for name in names)
+            role.keys.clear()
+            role.keys.update(keys)
+
+        self.verified = []
+
+
+def _configure_keys(
+    rolename: str,
+    role: RoleSettingsInput,
+    payload: PayloadSettings,
+    verifier: Optional[_KeyVerifier] = None,
+) -> None:
+    """Prompts the keys of the role, verified in background threads.
+
+    With a ``verifier``, the last keys may still be verified on return, the
+    caller waits for them with ``verifier.check(wait=True)``.
+    """
+    if verifier is None:
+        with ThreadPoolExecutor() as executor:
+            verifier = _KeyVerifier(payload, executor)
+            _configure_keys(rolename, role, payload, verifier)
+            verifier.check(wait=True)
+
+        return
+
+    while verifier.entered(role) < role.num_of_keys:
+        # reports the keys verified while the operator typed
+        verifier.check()
+        verifier.prompt_key(rolename, role, verifier.entered(role) + 1)
+
+
+def _spec_password(source: Any) -> str:
+    """Reads a key password from the spec password source.
+
+    The source is ``{"env": NAME}`` (environment variable), ``{"file":
+    PATH}`` (first line of the file) or ``{"value": PASSWORD}``.
+    """
+    if not isinstance(source, dict) or len(source) != 1:
+        raise ValueError("password must be one of 'env', 'file' or 'value'")
+
+    ((kind, value),) = source.items()
+    if kind == "env":
+        if value not in os.environ:
+            raise ValueError(f"environment variable {value} is not set")
+
+        return os.environ[value]
+
+    elif kind == "file":
+        try:
+            with open(value) as password_file:
+                return password_file.readline().rstrip("\r\n")
+        except OSError as err:
+            raise ValueError(f"cannot read {value}: {err.strerror}")
+
+    elif kind == "value":
+        return str(value)
+
+    raise ValueError(f"invalid password source '{kind}'")
+
+
+def _read_spec(
+    spec: str, ceremony_settings: PayloadSettings
+) -> List[Tuple[str, str, str]]:
+    """Configures the roles from the spec file.
+
+    Returns the (role name, key path, password) of the keys to load, in the
+    order of the roles. Raises ``ValueError`` for an invalid spec.
+    """
+    with open(spec) as spec_file:
+        try:
+            data = json.load(spec_file)
+        except ValueError as err:
+            raise ValueError(f"invalid JSON: {err}")
+
+    if not isinstance(data, dict) or not isinstance(data.get("roles"), dict):
+        raise ValueError("missing 'roles'")
+
+    unknown = set(data["roles"]) - set(ceremony_settings.roles)
+    if unknown:
+        raise ValueError(f"unknown roles {', '.join(sorted(unknown))}")
+
+    targets_base_url = data.get("service", {}).get("targets_base_url")
+    if not targets_base_url:
+        raise ValueError("missing 'service.targets_base_url'")
+
+    if targets_base_url.endswith("/") is False:
+        targets_base_url = targets_base_url + "/"
+
+    ceremony_settings.service.targets_base_url = targets_base_url
+    keys = []
+    for rolename, role in ceremony_settings.roles.items():
+        role_spec = data["roles"].get(rolename)
+        if role_spec is None:
+            raise ValueError(f"missing role {rolename}")
+
+        role_keys = role_spec.get("keys")
+        if not isinstance(role_keys, list) or not role_keys:
+            raise ValueError(f"missing keys of {rolename}")
+
+        role.keys = dict()
+        role.offline_keys = default_settings[rolename].offline_keys
+        role.expiration = int(
+            role_spec.get("expiration", default_settings[rolename].expiration)
+        )
+        role.num_of_keys = len(role_keys)
+        role.threshold = int(
+            role_spec.get("threshold", default_settings[rolename].threshold)
+        )
+        if not 1 <= role.threshold <= role.num_of_keys:
+            raise ValueError(
+                f"threshold of {rolename} must be from 1 to the number of "
+                "keys"
+            )
+
+        if rolename == Roles.TARGETS.value:
+            role.paths = list(role_spec.get("paths", ["*", "*/*"]))
+        elif rolename == Roles.BINS.value:
+            role.number_hash_prefixes = int(
+                role_spec.get("number_hash_prefixes", 8)
+            )
+
+        for key_spec in role_keys:
+            if not isinstance(key_spec, dict) or "path" not in key_spec:
+                raise ValueError(f"missing key path of {rolename}")
+
+            try:
+                password = _spec_password(key_spec.get("password"))
+            except ValueError as err:
+                raise ValueError(f"{rolename} key {key_spec['path']} {err}")
+
+            keys.append((rolename, key_spec["path"], password))
+
+    return keys
+
+
+def _load_keys(
+    keys: List[Tuple[str, str, bool]], max_workers: Optional[int] = None
+) -> List[KeySchema]:
+    """Loads the (path, password, online) keys, in worker processes.
+
+    Every key file is decrypted by a key derivation bound by the CPU, the
+    keys are decrypted concurrently. The keys in the cache of decrypted keys
+    are not decrypted again, and the keys decrypted by the workers are added
+    to it (the workers caches are lost).
+    """
+    cache_keys: List[Optional[Tuple[str, int, str]]] = [None] * len(keys)
+    if _key_cache is not None and configured_agent() is None:
+        cache_keys = [
+            _key_cache_key(filepath, password)
+            for filepath, password, _ in keys
+        ]
+
+    loaded: Dict[int, KeySchema] = {}
+    pending = []
+    for index, cache_key in enumerate(cache_keys):
+        if _key_cache is not None and cache_key in _key_cache:
+            loaded[index] = KeySchema(key=_key_cache[cache_key])
+        else:
+            pending.append(index)
+
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        results = [_load_key(*keys[index]) for index in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _load_key, *zip(*(keys[index] for index in pending))
+                )
+            )
+
+    for index, key in zip(pending, results):
+        loaded[index] = key
+        cache_key = cache_keys[index]
+        if _key_cache is not None and cache_key and key.key is not None:
+            _key_cache[cache_key] = key.key
+
+    return [loaded[index] for index in range(len(keys))]
+
+
+def _configure_spec(
+    ceremony_settings: PayloadSettings,
+    spec: str,
+    jobs: Optional[int] = None,
+) -> None:
+    """Configures the roles and loads the keys from the spec file, by
+    ``jobs`` worker processes."""
+    try:
+        spec_keys = _read_spec(spec, ceremony_settings)
+    except OSError as err:
+        raise click.ClickException(f"Invalid spec file {spec}: {err}")
+    except (ValueError, TypeError, AttributeError) as err:
+        raise click.ClickException(f"Invalid spec file {spec}: {err}")
+
+    console.print(f"Loading {len(spec_keys)} keys from the spec {spec}")
+    loaded_keys = _load_keys(
+        [
+            (
+                filepath,
+                password,
+                not ceremony_settings.roles[rolename].offline_keys,
+            )
+            for rolename, filepath, password in spec_keys
+        ],
+        jobs,
+    )
+
+    failed = False
+    for (rolename, filepath, password), key in zip(spec_keys, loaded_keys):
+        role = ceremony_settings.roles[rolename]
+        if key.error:
+            console.print(f"{rolename} key {filepath}: {key.error}")
+            failed = True
             continue
 
+        roles_settings = list(ceremony_settings.roles.values())
+        if _key_is_duplicated(roles_settings, key.key, filepath) is True:
+            console.print(
+                f"{rolename} key {filepath}: :cross_mark: [red]Failed[/]: "
+                "Key is duplicated."
+            )
+            failed = True
+            continue
+
+        key_count = len(role.keys) + 1
         role.keys[f"{rolename}_{key_count}"] = KeyInput(
             filepath=filepath, password=password, key=key
         )
         console.print(
-            ":white_check_mark: Key "
-            f"{key_count}/{role.num_of_keys} [green]Verified[/]"
+            f":white_check_mark: {rolename} key {key_count}/"
+            f"{role.num_of_keys} [green]Verified[/]"
         )
-        key_count += 1
+
+    if failed:
+        raise click.ClickException("Required key not validated.")
 
 
 def _check_server(settings):
@@ -459,15 +852,52 @@ def _check_server(settings):
     return headers
 
 
-def _bootstrap(server, headers, json_payload):
-    task_id = None
-    response = request_server(
+def _bootstrap(server, headers, json_payload, compress=False):
+    body = json.dumps(json_payload, separators=(",", ":")).encode()
+    response, upload_stats = upload_payload(
         server,
         URL.bootstrap.value,
-        Methods.post,
-        json_payload,
+        body,
         headers=headers,
+        compress=compress,
+        request=request_server,
     )
+    return _bootstrap_response(response, upload_stats)
+
+
+def _bootstrap_file(server, headers, file, resumable=False, compress=False):
+    if resumable:
+        response, upload_stats = ChunkedUpload(
+            server,
+            file,
+            headers=headers,
+            state_path=f"{file}.upload",
+            request=request_server,
+            compress=compress,
+        ).upload()
+    else:
+        response, upload_stats = upload_payload_file(
+            server,
+            URL.bootstrap.value,
+            file,
+            headers=headers,
+            compress=compress,
+            request=request_server,
+        )
+
+    return _bootstrap_response(response, upload_stats)
+
+
+def _bootstrap_response(response, upload_stats):
+    task_id = None
+    if upload_stats.saved_bytes > 0:
+        console.print(
+            f"Bootstrap payload: {upload_stats.payload_bytes} bytes, sent "
+            f"{upload_stats.sent_bytes} bytes with "
+            f"{upload_stats.content_encoding} ({upload_stats.saved_bytes} "
+            "bytes saved)"
+        )
+
     response_json = response.json()
     if response.status_code != 202:
         raise click.ClickException(
@@ -488,19 +918,23 @@ def _bootstrap(server, headers, json_payload):
     return task_id
 
 
-def _bootstrap_state(task_id, server, headers):
+def _bootstrap_state(task_id, server, headers, timeout=TASK_TIMEOUT):
     received_state = []
-    while True:
-        state_response = request_server(
-            server, f"{URL.task.value}{task_id}", Methods.get, headers=headers
-        )
-
+    waiter = TaskWaiter(
+        server, headers=headers, timeout=timeout, request=request_server
+    )
+    for state_response in waiter.wait(task_id):
         if state_response.status_code != 200:
             raise click.ClickException(
                 f"Unexpected response {state_response.text}"
             )
 
-        data = state_response.json().get("data")
+        if not isinstance(state_response.body, dict):
+            raise click.ClickException(
+                f"Invalid response {state_response.text}"
+            )
+
+        data = state_response.body.get("data")
 
         if data:
             if state := data.get("state"):
@@ -537,7 +971,124 @@ def _bootstrap_state(task_id, server, headers):
             raise click.ClickException(
                 f"No data received {state_response.text}"
             )
-        time.sleep(2)
+
+
+def _configure_ceremony(ceremony_settings: PayloadSettings) -> None:
+    """Configures the roles and loads the keys with the operator prompts."""
+    console.print(markdown.Markdown(CEREMONY_INTRO), width=100)
+
+    ceremony_detailed = prompt.Confirm.ask(
+        "\nDo you want more information about Roles and Responsibilities?"
+    )
+    if ceremony_detailed is True:
+        with console.pager():
+            console.print(
+                markdown.Markdown(CEREMONY_INTRO_ROLES_RESPONSIBILITIES),
+                width=100,
+            )
+
+    start_ceremony = prompt.Confirm.ask("\nDo you want start the ceremony?")
+
+    if start_ceremony is False:
+        raise click.ClickException("Ceremony aborted.")
+
+    console.print(markdown.Markdown(STEP_1), width=80)
+    for rolename, role in ceremony_settings.roles.items():
+        _configure_role(rolename, role, ceremony_settings)
+
+    console.print(markdown.Markdown(STEP_2), width=100)
+    start_ceremony = prompt.Confirm.ask(
+        "\nReady to start loading the keys? Passwords will be "
+        "required for keys"
+    )
+    if start_ceremony is False:
+        raise click.ClickException("Ceremony aborted.")
+
+    with ThreadPoolExecutor() as executor:
+        verifier = _KeyVerifier(ceremony_settings, executor)
+        for rolename, role in ceremony_settings.roles.items():
+            _configure_keys(rolename, role, ceremony_settings, verifier)
+
+        verifier.check(wait=True)
+
+    console.print(markdown.Markdown(STEP_3), width=100)
+
+    for rolename, role in ceremony_settings.roles.items():
+        while True:
+            role_table = table.Table()
+            role_table.add_column(
+                "ROLE SUMMARY",
+                style="yellow",
+                justify="center",
+                vertical="middle",
+            )
+            role_table.add_column("KEYS", justify="center", vertical="middle")
+            keys_table = table.Table(box=box.MINIMAL)
+            keys_table.add_column(
+                "path", justify="right", style="cyan", no_wrap=True
+            )
+            keys_table.add_column("id", justify="center")
+            keys_table.add_column("verified", justify="center")
+            for key_input in role.keys.values():
+                keys_table.add_row(
+                    key_input.filepath.split("/")[-1],
+                    key_input.key.key.get("keyid"),
+                    ":white_heavy_check_mark:",
+                )
+
+            if role.offline_keys is True:
+                key_type = "[red]offline[/red]"
+            else:
+                key_type = "[green]online[/]"
+
+            role_table.add_row(
+                (
+                    f"Role: [cyan]{rolename}[/]"
+                    f"\nNumber of Keys: {len(role.keys)}"
+                    f"\nThreshold: {role.threshold}"
+                    f"\nKeys Type: {key_type}"
+                    f"\nRole Expiration: {role.expiration} days"
+                ),
+                keys_table,
+            )
+
+            if rolename == Roles.TARGETS.value:
+                delegations_row = (
+                    f"\n{ceremony_settings.service.targets_base_url}".join(
+                        ["", *role.paths]
+                    )
+                )
+                role_table.add_row(
+                    (
+                        "\n"
+                        "\n[orange1]DELEGATIONS[/]"
+                        f"\n[aquamarine3]{rolename} -> bin[/]"
+                        f"{delegations_row}"
+                    ),
+                    "",
+                )
+
+            if rolename == Roles.BINS.value:
+                role_table.add_row(
+                    (
+                        "\n"
+                        "\n[orange1]DELEGATIONS[/]"
+                        f"\n[aquamarine3]{rolename} -> bins[/]"
+                        f"\nNumber bins: {role.number_hash_prefixes}"
+                    ),
+                    "",
+                )
+
+            console.print(role_table)
+            confirm_config = prompt.Confirm.ask(
+                f"Configuration correct for {rolename}?"
+            )
+            if not confirm_config:
+                # reconfigure role and keys
+                _configure_role(rolename, role, ceremony_settings)
+                _configure_keys(rolename, role, ceremony_settings)
+            else:
+                break
 
 
 @admin.command()
@@ -574,6 +1125,16 @@ def _bootstrap_state(task_id, server, headers):
     required=False,
     is_flag=True,
 )
+@click.option(
+    "--resumable",
+    help=(
+        "Upload the payload 'file' in chunks, resuming an interrupted "
+        "upload. Without resumable uploads in the server, it is uploaded at "
+        "once. Requires '-u/--upload'."
+    ),
+    required=False,
+    is_flag=True,
+)
 @click.option(
     "-s",
     "--save",
@@ -584,8 +1145,63 @@ def _bootstrap_state(task_id, server, headers):
     show_default=True,
     is_flag=True,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    "jobs",
+    default=None,
+    type=click.IntRange(min=1),
+    help=(
+        "Number of worker processes used to decrypt the '--spec' keys, with "
+        "multiple keys and CPUs (the key derivation is CPU bound). Default: "
+        "the number of CPUs."
+    ),
+    required=False,
+)
+@click.option(
+    "-t",
+    "--timeout",
+    "timeout",
+    default=TASK_TIMEOUT,
+    type=click.IntRange(min=1),
+    help="Seconds to wait for the bootstrap to finish in the server.",
+    show_default=True,
+    required=False,
+)
+@click.option(
+    "--compress/--no-compress",
+    "compress",
+    default=None,
+    help=(
+        "Send the bootstrap payload compressed with gzip, the server must "
+        "decode it. Default: the HTTP_COMPRESS setting (off)."
+    ),
+    required=False,
+)
+@click.option(
+    "--spec",
+    "spec",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help=(
+        "Run the ceremony without prompts, with the roles settings, key "
+        "paths and password sources of the JSON spec file."
+    ),
+    required=False,
+)
 @click.pass_context
-def ceremony(context, bootstrap, file, upload, save):
+def ceremony(
+    context,
+    bootstrap,
+    file,
+    upload,
+    resumable,
+    save,
+    jobs,
+    timeout,
+    compress,
+    spec,
+):
     """
     Start a new Metadata Ceremony.
     """
@@ -599,7 +1215,19 @@ def ceremony(context, bootstrap, file, upload, save):
     if upload is True and bootstrap is False:
         raise click.ClickException("Requires '-b/--bootstrap' option.")
 
+    if resumable is True and upload is False:
+        raise click.ClickException("Requires '-u/--upload' option.")
+
+    if spec is not None and upload is True:
+        raise click.ClickException(
+            "The '--spec' option doesn't work with '-u/--upload'."
+        )
+
     settings = context.obj["settings"]
+    if compress is None:
+        compress = SessionSettings.from_settings(settings).compress
+
+    ceremony_settings = _new_payload_settings()
     if bootstrap:
         headers = _check_server(settings)
         bs_response = request_server(
@@ -619,159 +1247,71 @@ def ceremony(context, bootstrap, file, upload, save):
             raise click.ClickException(f"{bs_data.get('message')}")
 
     if upload is False:
-        console.print(markdown.Markdown(CEREMONY_INTRO), width=100)
-
-        ceremony_detailed = prompt.Confirm.ask(
-            "\nDo you want more information about Roles and Responsibilities?"
-        )
-        if ceremony_detailed is True:
-            with console.pager():
-                console.print(
-                    markdown.Markdown(CEREMONY_INTRO_ROLES_RESPONSIBILITIES),
-                    width=100,
-                )
-
-        start_ceremony = prompt.Confirm.ask(
-            "\nDo you want start the ceremony?"
-        )
-
-        if start_ceremony is False:
-            raise click.ClickException("Ceremony aborted.")
-
-        console.print(markdown.Markdown(STEP_1), width=80)
-        for rolename, role in SETTINGS.roles.items():
-            _configure_role(rolename, role)
-
-        console.print(markdown.Markdown(STEP_2), width=100)
-        start_ceremony = prompt.Confirm.ask(
-            "\nReady to start loading the keys? Passwords will be "
-            "required for keys"
-        )
-        if start_ceremony is False:
-            raise click.ClickException("Ceremony aborted.")
-
-        for rolename, role in SETTINGS.roles.items():
-            _configure_keys(rolename, role)
-
-        console.print(markdown.Markdown(STEP_3), width=100)
-
-        for rolename, role in SETTINGS.roles.items():
-            while True:
-                role_table = table.Table()
-                role_table.add_column(
-                    "ROLE SUMMARY",
-                    style="yellow",
-                    justify="center",
-                    vertical="middle",
-                )
-                role_table.add_column(
-                    "KEYS", justify="center", vertical="middle"
-                )
-                keys_table = table.Table(box=box.MINIMAL)
-                keys_table.add_column(
-                    "path", justify="right", style="cyan", no_wrap=True
-                )
-                keys_table.add_column("id", justify="center")
-                keys_table.add_column("verified", justify="center")
-                for key_input in role.keys.values():
-                    keys_table.add_row(
-                        key_input.filepath.split("/")[-1],
-                        key_input.key.key.get("keyid"),
-                        ":white_heavy_check_mark:",
-                    )
-
-                if role.offline_keys is True:
-                    key_type = "[red]offline[/red]"
-                else:
-                    key_type = "[green]online[/]"
-
-                role_table.add_row(
-                    (
-                        f"Role: [cyan]{rolename}[/]"
-                        f"\nNumber of Keys: {len(role.keys)}"
-                        f"\nThreshold: {role.threshold}"
-                        f"\nKeys Type: {key_type}"
-                        f"\nRole Expiration: {role.expiration} days"
-                    ),
-                    keys_table,
-                )
-
-                if rolename == Roles.TARGETS.value:
-                    delegations_row = (
-                        f"\n{SETTINGS.service.targets_base_url}".join(
-                            ["", *role.paths]
-                        )
-                    )
-                    role_table.add_row(
-                        (
-                            "\n"
-                            "\n[orange1]DELEGATIONS[/]"
-                            f"\n[aquamarine3]{rolename} -> bin[/]"
-                            f"{delegations_row}"
-                        ),
-                        "",
-                    )
-
-                if rolename == Roles.BINS.value:
-                    role_table.add_row(
-                        (
-                            "\n"
-                            "\n[orange1]DELEGATIONS[/]"
-                            f"\n[aquamarine3]{rolename} -> bins[/]"
-                            f"\nNumber bins: {role.number_hash_prefixes}"
-                        ),
-                        "",
-                    )
-
-                console.print(role_table)
-                confirm_config = prompt.Confirm.ask(
-                    f"Configuration correct for {rolename}?"
-                )
-                if not confirm_config:
-                    # reconfigure role and keys
-                    _configure_role(rolename, role)
-                    _configure_keys(rolename, role)
-                else:
-                    break
-
-        metadata = initialize_metadata(SETTINGS.roles, save=save)
-
-        json_payload: Dict[str, Any] = dict()
+        if spec is None:
+            _configure_ceremony(ceremony_settings)
+        else:
+            _configure_spec(ceremony_settings, spec, jobs)
 
-        json_payload["settings"] = {"service": SETTINGS.service.to_dict()}
-        for role, data in SETTINGS.roles.items():
+        payload_settings: Dict[str, Any] = {
+            "service": ceremony_settings.service.to_dict(),
+            "roles": {},
+        }
+        for role, data in ceremony_settings.roles.items():
+            payload_settings["roles"][role] = data.to_dict()
             if data.offline_keys is True:
-                data.keys = dict()
+                payload_settings["roles"][role]["keys"] = dict()
 
-            if "roles" not in json_payload["settings"]:
-                json_payload["settings"]["roles"] = {role: data.to_dict()}
+        metadata = generate_metadata(ceremony_settings.roles, save=save)
+        json_payload: Optional[Dict[str, Any]] = None
+        try:
+            if file:
+                write_payload_file(file, payload_settings, metadata)
             else:
-                json_payload["settings"]["roles"][role] = data.to_dict()
-
-        json_payload["metadata"] = {
-            key: data.to_dict() for key, data in metadata.items()
-        }
+                json_payload = {
+                    "settings": payload_settings,
+                    "metadata": {
+                        key: data.to_dict() for key, data in metadata
+                    },
+                }
+        except UnsignedMetadataError as err:
+            # i.e. the key agent was locked or stopped
+            raise click.ClickException(
+                f"Failed to sign the metadata: {err.__cause__ or err}. If the "
+                "keys are in the key agent, check it is running and add them "
+                "again ('rstuf key-agent add')."
+            )
 
-        if file:
-            with open(file, "w") as f:
-                f.write(json.dumps(json_payload, indent=2))
+        for data in ceremony_settings.roles.values():
+            if data.offline_keys is True:
+                data.keys = dict()
 
         if bootstrap is True:
-            _bootstrap(settings.SERVER, headers, json_payload)
+            if json_payload is None:
+                _bootstrap_file(
+                    settings.SERVER, headers, file, compress=compress
+                )
+            else:
+                _bootstrap(
+                    settings.SERVER, headers, json_payload, compress=compress
+                )
 
     elif bootstrap is True and upload is True:
         try:
-            with open(file) as payload_file:
-                json_payload = json.load(payload_file)
+            with open(file, "rb") as payload_file:
+                validate_payload(payload_file)
         except OSError:
             raise click.ClickException(f"Invalid file {file}")
+        except ValueError as err:
+            raise click.ClickException(f"Invalid payload file {file}: {err}")
 
         console.print("Starting online bootstrap")
-        task_id = _bootstrap(settings.SERVER, headers, json_payload)
+        task_id = _bootstrap_file(
+            settings.SERVER, headers, file, resumable, compress=compress
+        )
 
         if task_id is None:
             raise click.ClickException("task id wasn't received")
 
-        _bootstrap_state(task_id, settings.SERVER, headers)
+        _bootstrap_state(task_id, settings.SERVER, headers, timeout)
 
     console.print("\nCeremony done. 🔐 🎉")
@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import signal
+
+from rich import table  # type: ignore
+from rich.console import Console  # type: ignore
+
+from repository_service_tuf.cli import click, rstuf
+from repository_service_tuf.helpers.key_agent import (
+    KEY_AGENT_SOCK_ENV,
+    KEY_TTL,
+    KeyAgent,
+    KeyAgentClient,
+    KeyAgentError,
+    default_socket_path,
+)
+
+console = Console()
+
+
+def _socket_option(function):
+    return click.option(
+        "-s",
+        "--socket",
+        "socket_path",
+        help=(
+            f"Key agent socket. Default: {KEY_AGENT_SOCK_ENV} or "
+            f"{default_socket_path()}"
+        ),
+        default=None,
+        required=False,
+    )(function)
+
+
+def _client(socket_path) -> KeyAgentClient:
+    return KeyAgentClient(
+        socket_path
+        or os.environ.get(KEY_AGENT_SOCK_ENV)
+        or default_socket_path()
+    )
+
+
+@rstuf.group(name="key-agent")
+def key_agent():
+    """
+    Key agent holding the decrypted keys, to sign without decrypting again.
+    """
+
+
+@key_agent.command()
+@_socket_option
+@click.option(
+    "--ttl",
+    "ttl",
+    help="Seconds a key is held",
+    type=click.IntRange(min=1),
+    default=KEY_TTL,
+    show_default=True,
+)
+def start(socket_path, ttl):
+    """
+    Start the key agent, until interrupted.
+
+    The ceremony uses the agent with the socket in RSTUF_KEY_AGENT_SOCK.
+    """
+    socket_path = socket_path or default_socket_path()
+    if os.path.exists(socket_path):
+        try:
+            KeyAgentClient(socket_path).list()
+        except KeyAgentError:
+            # a socket left by an agent not running
+            os.unlink(socket_path)
+        else:
+            raise click.ClickException(
+                f"Key agent already running in {socket_path}"
+            )
+
+    agent = KeyAgent(socket_path, ttl=ttl).start()
+    # stops on SIGTERM as on Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # not wrapped, it can be pasted in the shell
+    click.echo(
+        f"{KEY_AGENT_SOCK_ENV}={socket_path}; export {KEY_AGENT_SOCK_ENV}"
+    )
+    try:
+        agent.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+        console.print("Key agent stopped.")
+
+
+@key_agent.command()
+@_socket_option
+@click.argument("key_file")
+@click.option(
+    "--ttl",
+    "ttl",
+    help="Seconds the key is held. Default: the agent TTL",
+    type=click.IntRange(min=1),
+    default=None,
+)
+def add(socket_path, key_file, ttl):
+    """
+    Add a key to the key agent.
+    """
+    password = click.prompt(f"Enter the {key_file} password", hide_input=True)
+    try:
+        key = _client(socket_path).add(key_file, password, ttl=ttl)
+    except KeyAgentError as err:
+        raise click.ClickException(str(err))
+
+    console.print(f"Key {key['keyid']} added.")
+
+
+@key_agent.command(name="list")
+@_socket_option
+def list_keys(socket_path):
+    """
+    List the keys held by the key agent.
+    """
+    try:
+        keys = _client(socket_path).list()
+    except KeyAgentError as err:
+        raise click.ClickException(str(err))
+
+    keys_table = table.Table()
+    keys_table.add_column("id", no_wrap=True)
+    keys_table.add_column("path", style="cyan")
+    keys_table.add_column("expires in (s)", justify="right")
+    for key in keys:
+        keys_table.add_row(key["keyid"], key["path"], str(key["expires_in"]))
+
+    console.print(keys_table)
+
+
+@key_agent.command()
+@_socket_option
+def lock(socket_path):
+    """
+    Remove all the keys from the key agent.
+    """
+    try:
+        _client(socket_path).lock()
+    except KeyAgentError as err:
+        raise click.ClickException(str(err))
+
+    console.print("Key agent locked, all keys removed.")
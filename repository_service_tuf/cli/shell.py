@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import shlex
+from typing import Any, Dict, List
+
+from rich.console import Console  # type: ignore
+
+from repository_service_tuf.cli import click, rstuf
+
+try:
+    # line editing and history of the input, when available
+    import readline  # noqa F401
+except ImportError:  # pragma: no cover
+    pass
+
+console = Console()
+
+SHELL_INTRO = (
+    "Repository Service for TUF shell. Type the 'rstuf' commands without "
+    "'rstuf' (i.e. 'admin token inspect TOKEN'), 'help' for the commands "
+    "and 'exit' to quit."
+)
+EXIT_COMMANDS = {"exit", "quit"}
+# the 'rstuf' options allowed in the shell, the others are the shell settings
+SHELL_OPTIONS = {"-h", "--help", "--version"}
+
+
+def _preload(group: click.Group, context: click.Context) -> None:
+    """Imports the modules of all the commands of the group."""
+    for name in group.list_commands(context):
+        command = group.get_command(context, name)
+        if isinstance(command, click.Group):
+            _preload(command, context)
+
+
+def _run_command(args: List[str], obj: Dict[str, Any]) -> None:
+    """Runs an 'rstuf' command with the shell settings."""
+    if args[0] == "rstuf":
+        args = args[1:]
+
+    if args and args[0] == "help":
+        args = [*args[1:], "--help"]
+
+    if args and args[0] == "shell":
+        console.print("Already in the shell.")
+        return
+
+    # i.e. '-c other.ini' would change the HTTP session and token cache of
+    # the next commands too
+    if args and args[0].startswith("-") and args[0] not in SHELL_OPTIONS:
+        console.print(
+            f"The option '{args[0]}' can't be changed in the shell, start "
+            "a new shell with it."
+        )
+        return
+
+    try:
+        rstuf.main(
+            ["-c", obj["config"], *args],
+            prog_name="rstuf",
+            standalone_mode=False,
+            obj=obj,
+        )
+    except click.ClickException as err:
+        err.show()
+    except click.Abort:
+        console.print("Aborted!")
+
+
+@rstuf.command()
+@click.option(
+    "--keep-keys",
+    "keep_keys",
+    help=(
+        "Keep the keys decrypted by the ceremony in memory, the next "
+        "ceremonies reuse them without the key derivation"
+    ),
+    is_flag=True,
+    default=False,
+)
+@click.pass_context
+def shell(context, keep_keys):
+    """
+    Interactive shell to run commands, with warm settings and connections.
+    """
+    # the first commands don't wait for the imports
+    _preload(rstuf, context)
+    if keep_keys:
+        from repository_service_tuf.cli.admin import ceremony
+
+        ceremony.configure_key_cache({})
+
+    console.print(SHELL_INTRO)
+    try:
+        while True:
+            try:
+                line = console.input("[bold cyan]rstuf>[/] ")
+            except EOFError:
+                console.print()
+                break
+            except KeyboardInterrupt:
+                console.print()
+                continue
+
+            try:
+                args = shlex.split(line)
+            except ValueError as err:
+                console.print(f"Invalid command: {err}")
+                continue
+
+            if not args:
+                continue
+
+            if args[0] in EXIT_COMMANDS:
+                break
+
+            _run_command(args, context.obj)
+
+    finally:
+        if keep_keys:
+            ceremony.configure_key_cache(None)
@@ -2,19 +2,37 @@
 #
 # SPDX-License-Identifier: MIT
 
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Set, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from repository_service_tuf.cli import click
+from repository_service_tuf.helpers.http_trace import (
+    HTTPTracer,
+    TracedHTTPAdapter,
+)
 
 
 class URL(Enum):
     token = "api/v1/token/"
     bootstrap = "api/v1/bootstrap/"
     task = "api/v1/task/?task_id="
+    bootstrap_upload = "api/v1/bootstrap/upload/"
 
 
 class Methods(Enum):
@@ -28,6 +46,128 @@ class Login:
     data: Optional[Dict[str, Any]] = None
 
 
+def _bool_setting(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    return bool(value)
+
+
+@dataclass
+class SessionSettings:
+    """HTTP session settings, shared by every request to the API.
+
+    The retries, with exponential backoff, are done on connection errors and
+    on the ``retry_status`` responses only for the idempotent methods (i.e.
+    GET), never for POST.
+
+    The bootstrap payload is sent compressed with gzip only with
+    ``compress`` (``HTTP_COMPRESS``), the server must decode it.
+    """
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    retries: int = 3
+    backoff_factor: float = 0.5
+    pool_maxsize: int = 10
+    retry_status: Tuple[int, ...] = (502, 503, 504)
+    compress: bool = False
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "SessionSettings":
+        """Creates the session settings from the CLI settings (config file).
+
+        Every ``HTTP_*`` setting is optional, i.e. ``HTTP_READ_TIMEOUT``.
+        """
+        defaults = cls()
+        return cls(
+            connect_timeout=float(
+                settings.get("HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)
+            ),
+            read_timeout=float(
+                settings.get("HTTP_READ_TIMEOUT", defaults.read_timeout)
+            ),
+            retries=int(settings.get("HTTP_RETRIES", defaults.retries)),
+            backoff_factor=float(
+                settings.get("HTTP_BACKOFF_FACTOR", defaults.backoff_factor)
+            ),
+            pool_maxsize=int(
+                settings.get("HTTP_POOL_MAXSIZE", defaults.pool_maxsize)
+            ),
+            compress=_bool_setting(
+                settings.get("HTTP_COMPRESS", defaults.compress)
+            ),
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """The (connect, read) timeout of the requests."""
+        return (self.connect_timeout, self.read_timeout)
+
+
+_session_settings = SessionSettings()
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_tracer: Optional[HTTPTracer] = None
+
+
+def _new_session(settings: SessionSettings) -> requests.Session:
+    retry = Retry(
+        total=settings.retries,
+        backoff_factor=settings.backoff_factor,
+        status_forcelist=settings.retry_status,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter_class = HTTPAdapter if _tracer is None else TracedHTTPAdapter
+    adapter = adapter_class(
+        pool_connections=1,
+        pool_maxsize=settings.pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def configure_session(settings: SessionSettings) -> None:
+    """Configures the shared HTTP session.
+
+    An existing session is closed, the next request uses a new session with
+    the settings.
+    """
+    global _session, _session_settings
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+
+        _session = None
+        _session_settings = settings
+
+
+def get_session() -> requests.Session:
+    """Returns the shared HTTP session, keeping the connections alive."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _new_session(_session_settings)
+
+        return _session
+
+
+def configure_tracer(tracer: Optional[HTTPTracer]) -> None:
+    """Configures the tracer of the API requests, None to disable it.
+
+    The tracing connections are only used by the requests traced.
+    """
+    global _tracer
+    _tracer = tracer
+    configure_session(_session_settings)
+
+
 def request_server(
     server: str,
     url: str,
@@ -35,16 +175,58 @@ def request_server(
     payload: Optional[Dict[str, Any]] = None,
     data: Optional[Dict[str, Any]] = None,
     headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
 ) -> requests.Response:
+    tracer = _tracer
+    if tracer is None or not isinstance(method, Methods):
+        return _request(server, url, method, payload, data, headers, stream)
+
+    trace = tracer.start(method.value, f"{server}/{url}")
+    response = None
+    try:
+        response = _request(
+            server, url, method, payload, data, headers, stream
+        )
+        return response
+
+    except click.ClickException as err:
+        trace.error = err.message
+        raise
+
+    finally:
+        tracer.finish(trace, response)
+
+
+def _request(
+    server: str,
+    url: str,
+    method: Methods,
+    payload: Optional[Dict[str, Any]],
+    data: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    stream: bool,
+) -> requests.Response:
+    session = get_session()
+    timeout = _session_settings.timeout
     try:
         if method == Methods.get:
-            response = requests.get(
-                f"{server}/{url}", json=payload, data=data, headers=headers
+            response = session.get(
+                f"{server}/{url}",
+                json=payload,
+                data=data,
+                headers=headers,
+                timeout=timeout,
+                stream=stream,
             )
 
         elif method == Methods.post:
-            response = requests.post(
-                f"{server}/{url}", json=payload, data=data, headers=headers
+            response = session.post(
+                f"{server}/{url}",
+                json=payload,
+                data=data,
+                headers=headers,
+                timeout=timeout,
+                stream=stream,
             )
 
         else:
@@ -53,22 +235,778 @@ def request_server(
     except requests.exceptions.ConnectionError:
         raise click.ClickException(f"Failed to connect to {server}")
 
+    except requests.exceptions.Timeout:
+        raise click.ClickException(f"Timeout connecting to {server}")
+
     return response
 
 
+@dataclass
+class UploadStats:
+    """Sizes of an uploaded payload, as is and as sent."""
+
+    payload_bytes: int
+    sent_bytes: int
+    content_encoding: str = "identity"
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.payload_bytes - self.sent_bytes
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# responses of the servers that don't decode a compressed request body: 415
+# Unsupported Media Type, or the body is read as is (invalid JSON)
+COMPRESSION_REJECTED = (400, 415, 422)
+# servers that rejected a compressed request body
+_identity_servers: Set[str] = set()
+
+
+def _compression_rejected(server: str, response: Any) -> bool:
+    """Returns if the compressed body was rejected, to send it uncompressed.
+
+    The next uploads to the server are not compressed.
+    """
+    if response.status_code not in COMPRESSION_REJECTED:
+        return False
+
+    _identity_servers.add(server)
+    return True
+
+
+def upload_payload(
+    server: str,
+    url: str,
+    body: bytes,
+    headers: Optional[Dict[str, str]] = None,
+    compress: bool = False,
+    request: Callable[..., Any] = request_server,
+) -> Tuple[requests.Response, UploadStats]:
+    """Posts a JSON body, compressed with gzip with ``compress``.
+
+    A server that doesn't decode the compressed body answers with ``415
+    Unsupported Media Type``, or ``400``/``422`` as the body isn't JSON. The
+    body is sent again uncompressed, and the next uploads to that server
+    are not compressed.
+    """
+    json_headers = {**(headers or {}), "Content-Type": "application/json"}
+    if compress and server not in _identity_servers:
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+        if len(compressed) < len(body):
+            response = request(
+                server,
+                url,
+                Methods.post,
+                data=compressed,
+                headers={**json_headers, "Content-Encoding": "gzip"},
+            )
+            if not _compression_rejected(server, response):
+                return response, UploadStats(
+                    len(body), len(compressed), "gzip"
+                )
+
+    response = request(
+        server, url, Methods.post, data=body, headers=json_headers
+    )
+    return response, UploadStats(len(body), len(body))
+
+
+def _gzip_chunks(
+    file: IO[bytes], stats: UploadStats, chunk_size: int
+) -> Iterator[bytes]:
+    """Reads and compresses the file with gzip, one chunk at a time."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    while chunk := file.read(chunk_size):
+        if compressed := compressor.compress(chunk):
+            stats.sent_bytes += len(compressed)
+            yield compressed
+
+    compressed = compressor.flush()
+    stats.sent_bytes += len(compressed)
+    yield compressed
+
+
+def upload_payload_file(
+    server: str,
+    url: str,
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    compress: bool = False,
+    request: Callable[..., Any] = request_server,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Tuple[requests.Response, UploadStats]:
+    """Posts a JSON file as is, streamed from the disk.
+
+    Same as ``upload_payload``, but the file is never loaded in memory: it
+    is read in chunks of ``chunk_size`` bytes. The file is sent with its
+    ``Content-Length``. With ``compress``, the gzip compressed body is sent
+    with ``Transfer-Encoding: chunked``, as its size is only known after
+    sending it.
+    """
+    json_headers = {**(headers or {}), "Content-Type": "application/json"}
+    payload_bytes = os.path.getsize(path)
+    with open(path, "rb") as file:
+        if compress and server not in _identity_servers:
+            stats = UploadStats(payload_bytes, 0, "gzip")
+            response = request(
+                server,
+                url,
+                Methods.post,
+                data=_gzip_chunks(file, stats, chunk_size),
+                headers={**json_headers, "Content-Encoding": "gzip"},
+            )
+            if not _compression_rejected(server, response):
+                return response, stats
+
+            file.seek(0)
+
+        response = request(
+            server,
+            url,
+            Methods.post,
+            data=file,
+            headers={**json_headers, "Content-Length": str(payload_bytes)},
+        )
+
+    return response, UploadStats(payload_bytes, payload_bytes)
+
+
+class _UploadError(Exception):
+    """Chunked upload failure, the upload is resumed."""
+
+
+class _UploadNotSupported(Exception):
+    """The server doesn't implement the chunked uploads."""
+
+
+class ChunkedUpload:
+    """Resumable upload of a bootstrap payload file, in chunks.
+
+    The upload is created with the payload size and SHA-256, then every
+    chunk of ``chunk_size`` bytes is posted with its ``Upload-Offset`` and
+    ``Upload-Checksum`` (``sha256 <base64 digest>``). The server answers
+    with the next offset. Completing the upload starts the bootstrap, the
+    response is the same as posting the payload.
+
+    On connection errors, server errors (5xx) and checksum mismatches
+    (460) the acknowledged offset is requested and the upload continues
+    from there, up to ``retries`` failures in a row, with an exponential
+    backoff.
+
+    The upload id is stored in the ``state_path`` file until the upload is
+    complete, so the next run resumes an interrupted upload of the same
+    payload.
+
+    Completing is idempotent: the server answers the same response to the
+    same upload completed again. When the completion response is lost, the
+    upload is completed again with the same upload id, it is never created
+    again (that would bootstrap twice).
+
+    The server must implement the uploads (``URL.bootstrap_upload``), the
+    Repository Service for TUF API doesn't yet. When the upload creation is
+    answered with ``404``/``405``, or with something else than an upload
+    (i.e. a proxy page), the payload is posted at once with
+    ``upload_payload_file``. Other invalid responses raise a
+    ``ClickException`` with the response.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        retries: int = 5,
+        backoff_factor: float = 0.5,
+        state_path: Optional[str] = None,
+        request: Callable[..., Any] = request_server,
+        sleep: Callable[[float], None] = time.sleep,
+        compress: bool = False,
+    ) -> None:
+        self.server = server
+        self.path = path
+        self.headers = headers or {}
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.state_path = state_path
+        self.sent_bytes = 0
+        self.compress = compress
+        self._request = request
+        self._sleep = sleep
+
+    def _digest(self) -> str:
+        digest = hashlib.sha256()
+        with open(self.path, "rb") as file:
+            while chunk := file.read(self.chunk_size):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _load_state(
+        self, size: int, digest: str
+    ) -> Tuple[Optional[str], bool]:
+        """Returns the upload id of an interrupted upload of the payload,
+        and if it was being completed."""
+        if self.state_path is None:
+            return None, False
+
+        try:
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None, False
+
+        if not isinstance(state, dict) or state.get("upload") != {
+            "server": self.server,
+            "size": size,
+            "sha256": digest,
+        }:
+            return None, False
+
+        return state.get("upload_id"), state.get("completing") is True
+
+    def _save_state(
+        self, upload_id: str, size: int, digest: str, completing: bool = False
+    ) -> None:
+        if self.state_path is None:
+            return
+
+        state = {
+            "upload_id": upload_id,
+            "upload": {"server": self.server, "size": size, "sha256": digest},
+            "completing": completing,
+        }
+        try:
+            with open(self.state_path, "w") as state_file:
+                json.dump(state, state_file)
+        except OSError:
+            pass
+
+    def _clear_state(self) -> None:
+        if self.state_path is not None and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def _send(
+        self,
+        url: str,
+        method: Methods,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> Any:
+        try:
+            response = self._request(
+                self.server,
+                url,
+                method,
+                headers={**self.headers, **(headers or {})},
+                **kwargs,
+            )
+        except click.ClickException as err:
+            raise _UploadError(err.message)
+
+        if response.status_code >= 500 or response.status_code == 460:
+            raise _UploadError(f"Error {response.status_code}")
+
+        return response
+
+    @staticmethod
+    def _response_error(response: Any) -> click.ClickException:
+        try:
+            detail = response.json().get("detail")
+        except ValueError:
+            detail = response.text
+
+        return click.ClickException(f"Error {response.status_code} {detail}")
+
+    @staticmethod
+    def _response_data(
+        response: Any, upload_id: bool = False
+    ) -> Dict[str, Any]:
+        """Returns the response ``data``, with an ``offset`` and (with
+        ``upload_id``) an ``upload_id``."""
+        try:
+            data = response.json().get("data")
+        except (ValueError, AttributeError):
+            data = None
+
+        if (
+            not isinstance(data, dict)
+            or type(data.get("offset")) is not int
+            or (upload_id and not isinstance(data.get("upload_id"), str))
+        ):
+            raise click.ClickException(
+                f"Invalid response {response.status_code} {response.text}"
+            )
+
+        return data
+
+    def _create(self, size: int, digest: str) -> Tuple[str, int]:
+        response = self._send(
+            URL.bootstrap_upload.value,
+            Methods.post,
+            payload={"size": size, "sha256": digest},
+        )
+        if response.status_code in (404, 405):
+            raise _UploadNotSupported()
+        elif response.status_code != 201:
+            raise self._response_error(response)
+
+        try:
+            data = self._response_data(response, upload_id=True)
+        except click.ClickException:
+            raise _UploadNotSupported()
+
+        return data["upload_id"], data["offset"]
+
+    def _offset(self, upload_id: str) -> Optional[int]:
+        """Returns the acknowledged offset, None for an unknown upload."""
+        response = self._send(
+            f"{URL.bootstrap_upload.value}{upload_id}", Methods.get
+        )
+        if response.status_code == 404:
+            return None
+        elif response.status_code != 200:
+            raise self._response_error(response)
+
+        return self._response_data(response)["offset"]
+
+    def _send_chunk(self, file: IO[bytes], upload_id: str, offset: int) -> int:
+        """Sends the chunk at the offset, returns the next offset."""
+        file.seek(offset)
+        chunk = file.read(self.chunk_size)
+        checksum = base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+        self.sent_bytes += len(chunk)
+        response = self._send(
+            f"{URL.bootstrap_upload.value}{upload_id}",
+            Methods.post,
+            data=chunk,
+            headers={
+                "Content-Type": "application/offset+octet-stream",
+                "Upload-Offset": str(offset),
+                "Upload-Checksum": f"sha256 {checksum}",
+            },
+        )
+        # 409 Conflict: the offset isn't the acknowledged one
+        if response.status_code not in (200, 409):
+            raise self._response_error(response)
+
+        return self._response_data(response)["offset"]
+
+    def upload(self) -> Tuple[requests.Response, UploadStats]:
+        """Uploads the payload and completes the upload."""
+        size = os.path.getsize(self.path)
+        digest = self._digest()
+        upload_id, completing = self._load_state(size, digest)
+        offset: Optional[int] = None
+        failures = 0
+        with open(self.path, "rb") as file:
+            while True:
+                try:
+                    if offset is None and upload_id is not None:
+                        offset = self._offset(upload_id)
+                        if offset is None and completing:
+                            # it may be bootstrapped, it isn't created again
+                            raise click.ClickException(
+                                f"Upload {upload_id} was completed but the "
+                                "response was lost, and the server doesn't "
+                                "have it anymore. Check the bootstrap state "
+                                f"before removing {self.state_path} to "
+                                "upload again"
+                            )
+
+                    if upload_id is None or offset is None:
+                        upload_id, offset = self._create(size, digest)
+                        self._save_state(upload_id, size, digest)
+
+                    if offset < size:
+                        offset = self._send_chunk(file, upload_id, offset)
+                        failures = 0
+                        continue
+
+                    if not completing:
+                        completing = True
+                        self._save_state(upload_id, size, digest, True)
+
+                    response = self._send(
+                        f"{URL.bootstrap_upload.value}{upload_id}/complete",
+                        Methods.post,
+                    )
+                    break
+
+                except _UploadError as err:
+                    failures += 1
+                    if failures > self.retries:
+                        raise click.ClickException(
+                            f"Upload failed after {self.retries} retries: "
+                            f"{err}"
+                        )
+
+                    self._sleep(self.backoff_factor * 2 ** (failures - 1))
+                    # resumed from the acknowledged offset
+                    offset = None
+
+                except _UploadNotSupported:
+                    self._clear_state()
+                    return upload_payload_file(
+                        self.server,
+                        URL.bootstrap.value,
+                        self.path,
+                        headers=self.headers,
+                        compress=self.compress,
+                        request=self._request,
+                        chunk_size=self.chunk_size,
+                    )
+
+        self._clear_state()
+        return response, UploadStats(size, self.sent_bytes)
+
+
+class TokenCache:
+    """Cache of the tokens validated by the server, stored in a JSON file.
+
+    A token is cached until its ``expiration`` (minus ``margin`` seconds) or
+    for ``max_age`` seconds, what comes first. The file stores only a digest
+    of the server and token, never the token.
+    """
+
+    def __init__(
+        self, path: str, max_age: int = 3600, margin: int = 60
+    ) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.margin = margin
+
+    @staticmethod
+    def _key(server: str, token: str) -> str:
+        return hashlib.sha256(f"{server}\n{token}".encode()).hexdigest()
+
+    @staticmethod
+    def _expiration(data: Dict[str, Any]) -> Optional[float]:
+        """Returns the token expiration timestamp, UTC when naive."""
+        try:
+            expiration = datetime.fromisoformat(data["expiration"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        if expiration.tzinfo is None:
+            expiration = expiration.replace(tzinfo=timezone.utc)
+
+        return expiration.timestamp()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries: Dict[str, Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(entries, tmp_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the cache is optional, the server is checked next time
+            pass
+
+    def get(self, server: str, token: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached token data, if the token is still valid."""
+        entry = self._read().get(self._key(server, token))
+        if entry is None or entry.get("valid_until", 0) <= time.time():
+            return None
+
+        return entry.get("data")
+
+    def set(self, server: str, token: str, data: Dict[str, Any]) -> None:
+        """Caches the token data, only if it has a valid expiration."""
+        expiration = self._expiration(data)
+        now = time.time()
+        if expiration is None or expiration - self.margin <= now:
+            return
+
+        entries = {
+            key: entry
+            for key, entry in self._read().items()
+            if isinstance(entry, dict) and entry.get("valid_until", 0) > now
+        }
+        entries[self._key(server, token)] = {
+            "valid_until": min(expiration - self.margin, now + self.max_age),
+            "data": data,
+        }
+        self._write(entries)
+
+    def invalidate(self, server: str, token: str) -> None:
+        """Removes the token from the cache."""
+        entries = self._read()
+        if entries.pop(self._key(server, token), None) is not None:
+            self._write(entries)
+
+
+_token_cache: Optional[TokenCache] = None
+
+
+def configure_token_cache(token_cache: Optional[TokenCache]) -> None:
+    """Configures the token cache used by ``is_logged``, None disables it."""
+    global _token_cache
+    _token_cache = token_cache
+
+
 def is_logged(server: str, token: str):
+    if _token_cache is not None:
+        cached_data = _token_cache.get(server, token)
+        if cached_data is not None:
+            return Login(state=True, data=cached_data)
+
     headers = {"Authorization": f"Bearer {token}"}
     url = f"{URL.token.value}?token={token}"
     response = request_server(server, url, Methods.get, headers=headers)
     if response.status_code == 401 or response.status_code == 403:
+        if _token_cache is not None:
+            _token_cache.invalidate(server, token)
+
         return Login(state=False)
 
     elif response.status_code == 200:
         data = response.json().get("data")
         if data.get("expired") is False:
+            if _token_cache is not None:
+                _token_cache.set(server, token, data)
+
             return Login(state=True, data=data)
 
     else:
         click.ClickException(
             f"Error {response.status_code} {response.json()['detail']}"
         )
+
+
+class TaskResponse:
+    """A task state response, from a task request or a server-sent event.
+
+    The ``body`` is the JSON body, parsed only for the 200 responses (None
+    when it isn't JSON).
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        body: Optional[Dict[str, Any]] = None,
+        text: Optional[str] = None,
+        response: Optional[requests.Response] = None,
+    ) -> None:
+        self.status_code = status_code
+        self.body = body
+        self._text = text
+        self._response = response
+
+    @property
+    def text(self) -> str:
+        if self._text is None and self._response is not None:
+            return self._response.text
+
+        return self._text or ""
+
+    @property
+    def state(self) -> Optional[str]:
+        if isinstance(self.body, dict) and isinstance(
+            self.body.get("data"), dict
+        ):
+            return self.body["data"].get("state")
+
+        return None
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Returns the Retry-After header delay in seconds, if any."""
+    value = headers.get("Retry-After") if headers else None
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            retry_date = datetime.strptime(value, "%a, %d %b %Y %H:%M:%S GMT")
+        except ValueError:
+            return None
+
+        return max(
+            retry_date.replace(tzinfo=timezone.utc).timestamp() - time.time(),
+            0.0,
+        )
+
+
+class TaskWaiter:
+    """Waits for an API task, yielding every task state received.
+
+    The task is polled with an adaptive backoff: the delay starts at
+    ``initial_delay`` and grows by ``multiplier`` up to ``max_delay``, with
+    random ``jitter``, and it starts over when the task state changes. A
+    ``Retry-After`` from the server replaces the delay.
+
+    The requests ask for a server-sent events stream (``Accept:
+    text/event-stream``) and for a long-poll (``Prefer: wait=N``). Servers
+    that support them send the states as events, or hold the response up to
+    ``long_poll`` seconds until the state changes, and no delay is needed.
+    Other servers answer as a plain poll. The long-poll is capped under the
+    ``read_timeout`` (default the session ``HTTP_READ_TIMEOUT``), or the
+    held responses would time out.
+
+    A ``click.ClickException`` is raised when the task isn't done after
+    ``timeout`` seconds. The consumer stops the waiter with ``break`` once
+    the task is done.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 3600.0,
+        initial_delay: float = 0.25,
+        max_delay: float = 5.0,
+        multiplier: float = 1.5,
+        jitter: float = 0.5,
+        long_poll: int = 20,
+        read_timeout: Optional[float] = None,
+        request: Callable[..., Any] = request_server,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.server = server
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.long_poll = long_poll
+        self.read_timeout = read_timeout
+        self._request = request
+        self._sleep = sleep
+        self._clock = clock
+
+    def _jittered(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def _events(
+        self, response: requests.Response, deadline: float
+    ) -> Iterator[TaskResponse]:
+        """Parses the server-sent events stream, one TaskResponse by event.
+        The stream is left at the deadline."""
+        data_lines = []
+        for line in response.iter_lines(decode_unicode=True):
+            if self._clock() >= deadline:
+                return
+
+            if line:
+                field, _, value = line.partition(":")
+                if field == "data":
+                    data_lines.append(value[1:] if value[:1] == " " else value)
+                continue
+
+            if data_lines:
+                text = "\n".join(data_lines)
+                data_lines = []
+                try:
+                    body = json.loads(text)
+                except ValueError:
+                    body = None
+
+                yield TaskResponse(200, body, text=text)
+
+    def _responses(
+        self, response: requests.Response, deadline: float
+    ) -> Tuple[Iterator[TaskResponse], bool]:
+        """Returns the task responses in the response and if the server
+        waits for the state changes (events stream or long-poll)."""
+        if response.status_code != 200:
+            return (
+                iter([TaskResponse(response.status_code, response=response)]),
+                False,
+            )
+
+        content_type = response.headers.get("Content-Type", "")
+        if content_type.startswith("text/event-stream"):
+            return self._events(response, deadline), True
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+
+        preference_applied = response.headers.get("Preference-Applied", "")
+        return (
+            iter([TaskResponse(200, body, response=response)]),
+            "wait=" in preference_applied,
+        )
+
+    def wait(self, task_id: str) -> Iterator[TaskResponse]:
+        """Yields the task state responses until the consumer stops."""
+        deadline = self._clock() + self.timeout
+        delay = self.initial_delay
+        last_state = None
+        url = f"{URL.task.value}{task_id}"
+        read_timeout = self.read_timeout
+        if read_timeout is None:
+            read_timeout = _session_settings.read_timeout
+
+        # the server answers a long-poll before the read timeout
+        max_long_poll = min(self.long_poll, read_timeout - 1)
+        while True:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                raise click.ClickException(
+                    f"Timeout waiting for the task {task_id} "
+                    f"after {self.timeout} seconds"
+                )
+
+            headers = {
+                **self.headers,
+                "Accept": "text/event-stream, application/json",
+            }
+            # the long-poll wait is in whole seconds, up to the deadline
+            long_poll = int(min(max_long_poll, remaining))
+            if long_poll > 0:
+                headers["Prefer"] = f"wait={long_poll}"
+
+            response = self._request(
+                self.server, url, Methods.get, headers=headers, stream=True
+            )
+            retry_after = _retry_after(response.headers)
+            waited = False
+            if response.status_code in (429, 503) and retry_after is not None:
+                # the server is busy, request the task again later
+                response.close()
+            else:
+                task_responses, waits = self._responses(response, deadline)
+                try:
+                    for task_response in task_responses:
+                        waited = waits
+                        if task_response.state != last_state:
+                            last_state = task_response.state
+                            delay = self.initial_delay
+
+                        yield task_response
+
+                except requests.exceptions.RequestException:
+                    # the events stream is broken, request the task again
+                    pass
+
+                finally:
+                    if waits:
+                        response.close()
+
+            if retry_after is not None:
+                next_delay = retry_after
+            elif waited:
+                continue
+            else:
+                next_delay = self._jittered(delay)
+                delay = min(delay * self.multiplier, self.max_delay)
+
+            self._sleep(max(min(next_delay, deadline - self._clock()), 0))
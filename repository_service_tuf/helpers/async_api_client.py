@@ -0,0 +1,488 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import base64
+import json
+import os
+import ssl
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import SplitResult, unquote, urlencode, urlsplit
+
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+from repository_service_tuf.cli import click
+from repository_service_tuf.helpers import api_client
+from repository_service_tuf.helpers.api_client import URL, Login, Methods
+
+USER_AGENT = "repository-service-tuf"
+# statuses without a response body
+NO_BODY_STATUS = {204, 304}
+# methods retried in a new connection when a reused one is closed
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class InvalidResponseError(Exception):
+    """Malformed HTTP response from the server."""
+
+
+def _host_header(split_url: SplitResult) -> str:
+    """The Host header of the URL, without the user info."""
+    host = split_url.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"
+
+    return f"{host}:{split_url.port}" if split_url.port else host
+
+
+def _ssl_context(trust_env: bool = True) -> ssl.SSLContext:
+    """The SSL context with the CA bundle of the ``requests`` session:
+    ``REQUESTS_CA_BUNDLE`` or ``CURL_CA_BUNDLE`` with ``trust_env``, or
+    the ``certifi`` bundle.
+    """
+    ca_bundle = None
+    if trust_env:
+        ca_bundle = os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get(
+            "CURL_CA_BUNDLE"
+        )
+
+    ca_bundle = ca_bundle or DEFAULT_CA_BUNDLE_PATH
+    if os.path.isdir(ca_bundle):
+        return ssl.create_default_context(capath=ca_bundle)
+
+    return ssl.create_default_context(cafile=ca_bundle)
+
+
+@dataclass
+class AsyncResponse:
+    """HTTP response of the ``AsyncAPIClient``.
+
+    The header names are lowercase.
+    """
+
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class _Connection:
+    """HTTP/1.1 connection to a server, reused while kept alive."""
+
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    @property
+    def closed(self) -> bool:
+        return self.reader.at_eof() or self.writer.is_closing()
+
+    def close(self) -> None:
+        self.writer.close()
+
+    @staticmethod
+    def _status(status_line: str) -> int:
+        """The status code, the reason phrase is optional."""
+        version, _, rest = status_line.rstrip("\r\n").partition(" ")
+        status = rest.strip().partition(" ")[0]
+        if not version.startswith("HTTP/") or not (
+            len(status) == 3 and status.isdigit()
+        ):
+            raise InvalidResponseError(
+                f"Invalid status line {status_line.strip()!r}"
+            )
+
+        return int(status)
+
+    @staticmethod
+    def _keep_alive(status_line: str, headers: Dict[str, str]) -> bool:
+        """If the connection is kept alive after the response. HTTP/1.0
+        connections are closed, unless ``Connection: keep-alive``."""
+        tokens = {
+            token.strip().lower()
+            for token in headers.get("connection", "").split(",")
+        }
+        if status_line.startswith("HTTP/1.0"):
+            return "keep-alive" in tokens
+
+        return "close" not in tokens
+
+    async def read_headers(self) -> Tuple[str, int, Dict[str, str]]:
+        """Reads the status line, the status and the headers."""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionResetError("Connection closed by server")
+
+            status_line = line.decode("latin-1")
+            status = self._status(status_line)
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+                name, colon, value = line.decode("latin-1").partition(":")
+                if not colon or not name.strip():
+                    raise InvalidResponseError(
+                        f"Invalid header line {line.strip()!r}"
+                    )
+
+                headers[name.strip().lower()] = value.strip()
+
+            # skip informational responses (i.e. 100 Continue)
+            if not 100 <= status < 200:
+                return status_line, status, headers
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size_line = await self.reader.readline()
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise InvalidResponseError(
+                    f"Invalid chunk size {size_line.strip()!r}"
+                )
+
+            if size == 0:
+                # skip the trailers
+                while await self.reader.readline() not in (
+                    b"\r\n",
+                    b"\n",
+                    b"",
+                ):
+                    pass
+                break
+
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+        return b"".join(chunks)
+
+    async def request(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[AsyncResponse, bool]:
+        """Sends the request and reads the response.
+
+        Returns the response and if the connection can be reused.
+        """
+        request_lines = [f"{method} {target} HTTP/1.1"]
+        request_lines += [
+            f"{name}: {value}" for name, value in headers.items()
+        ]
+        self.writer.write(
+            ("\r\n".join(request_lines) + "\r\n\r\n").encode("latin-1") + body
+        )
+        await self.writer.drain()
+
+        status_line, status_code, response_headers = await self.read_headers()
+        keep_alive = self._keep_alive(status_line, response_headers)
+        if method == "HEAD" or status_code in NO_BODY_STATUS:
+            content = b""
+        elif response_headers.get("transfer-encoding", "").lower() == (
+            "chunked"
+        ):
+            content = await self._read_chunked()
+        elif "content-length" in response_headers:
+            try:
+                length = int(response_headers["content-length"])
+            except ValueError:
+                raise InvalidResponseError(
+                    "Invalid Content-Length "
+                    f"{response_headers['content-length']!r}"
+                )
+
+            content = await self.reader.readexactly(length)
+        else:
+            # the body ends when the server closes the connection
+            content = await self.reader.read()
+            keep_alive = False
+
+        return (
+            AsyncResponse(status_code, response_headers, content),
+            keep_alive,
+        )
+
+
+class AsyncAPIClient:
+    """Asyncio client for the Repository Service for TUF API.
+
+    It has the ``request_server`` surface (``URL`` and ``Methods``) as
+    coroutines, so the API endpoints can be requested concurrently from one
+    event loop, i.e. with ``asyncio.gather``.
+
+    At most ``max_connections`` requests run at once, each with its own
+    connection. The connections are kept alive and reused by the next
+    requests, only the idempotent requests are sent again when a reused
+    connection was closed by the server. The ``timeout`` is the (connect,
+    read) timeout of every request, the defaults are from the session
+    settings (``HTTP_*``) of the ``request_server`` session.
+
+    As ``requests``, the proxy (``HTTP_PROXY``, ``HTTPS_PROXY``,
+    ``ALL_PROXY`` and ``NO_PROXY``) and the CA bundle
+    (``REQUESTS_CA_BUNDLE``) of the environment are used with
+    ``trust_env``. The HTTPS requests go through a ``CONNECT`` tunnel
+    (Python 3.11 or later).
+
+    Use it as an async context manager, or ``close`` it, to close the
+    connections.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        headers: Optional[Dict[str, str]] = None,
+        max_connections: Optional[int] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        trust_env: bool = True,
+    ) -> None:
+        defaults = api_client._session_settings
+        self.server = server.rstrip("/")
+        self.headers = headers or {}
+        self.timeout = timeout or defaults.timeout
+        self.max_connections = max_connections or defaults.pool_maxsize
+
+        split_server = urlsplit(self.server)
+        if split_server.scheme not in ("http", "https"):
+            raise ValueError(f"Invalid server {server}")
+
+        self._tls = split_server.scheme == "https"
+        self._host = split_server.hostname
+        self._port = split_server.port or (443 if self._tls else 80)
+        self._host_header = _host_header(split_server)
+        self._base_path = split_server.path
+        self._proxy: Optional[SplitResult] = None
+        if trust_env and not urllib.request.proxy_bypass(self._host_header):
+            proxies = urllib.request.getproxies()
+            proxy = proxies.get(split_server.scheme) or proxies.get("all")
+            if proxy:
+                if "://" not in proxy:
+                    proxy = f"http://{proxy}"
+
+                self._proxy = urlsplit(proxy)
+        self._ssl_context = ssl_context
+        self._trust_env = trust_env
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: List[_Connection] = []
+
+    async def __aenter__(self) -> "AsyncAPIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the idle connections."""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+        for connection in idle:
+            try:
+                await connection.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    async def _connect(self) -> _Connection:
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.closed:
+                connection.reused = True
+                return connection
+
+            connection.close()
+
+        ssl_context: Any = None
+        if self._tls:
+            if self._ssl_context is None:
+                self._ssl_context = _ssl_context(self._trust_env)
+
+            ssl_context = self._ssl_context
+
+        if self._proxy is not None:
+            return await asyncio.wait_for(
+                self._connect_proxy(ssl_context), self.timeout[0]
+            )
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port, ssl=ssl_context),
+            self.timeout[0],
+        )
+        return _Connection(reader, writer)
+
+    def _proxy_headers(self) -> Dict[str, str]:
+        if self._proxy is None or self._proxy.username is None:
+            return {}
+
+        credentials = (
+            f"{unquote(self._proxy.username)}:"
+            f"{unquote(self._proxy.password or '')}"
+        )
+        return {
+            "Proxy-Authorization": "Basic "
+            + base64.b64encode(credentials.encode()).decode()
+        }
+
+    async def _connect_proxy(self, ssl_context: Any) -> _Connection:
+        """Connects through the proxy, with a tunnel for HTTPS."""
+        proxy: Any = self._proxy
+        reader, writer = await asyncio.open_connection(
+            proxy.hostname, proxy.port or 80
+        )
+        connection = _Connection(reader, writer)
+        if ssl_context is None:
+            return connection
+
+        if not hasattr(writer, "start_tls"):
+            connection.close()
+            raise ConnectionError("HTTPS proxy requires Python 3.11")
+
+        authority = f"{self._host}:{self._port}"
+        connect_headers = {"Host": authority, **self._proxy_headers()}
+        writer.write(
+            (
+                f"CONNECT {authority} HTTP/1.1\r\n"
+                + "".join(f"{k}: {v}\r\n" for k, v in connect_headers.items())
+                + "\r\n"
+            ).encode("latin-1")
+        )
+        await writer.drain()
+        _, status, _ = await connection.read_headers()
+        if status != 200:
+            connection.close()
+            raise ConnectionError(f"Proxy CONNECT failed with {status}")
+
+        await writer.start_tls(ssl_context, server_hostname=self._host)
+        return connection
+
+    async def _send(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> AsyncResponse:
+        connection = await self._connect()
+        try:
+            response, keep_alive = await asyncio.wait_for(
+                connection.request(method, target, headers, body),
+                self.timeout[1],
+            )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            connection.close()
+            if not connection.reused or method not in IDEMPOTENT_METHODS:
+                raise
+
+            # the server closed the idle connection, retry in a new one
+            return await self._send(method, target, headers, body)
+
+        except BaseException:
+            connection.close()
+            raise
+
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+        return response
+
+    async def request(
+        self,
+        url: str,
+        method: Methods,
+        payload: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncResponse:
+        """Requests the API url, same arguments as ``request_server``."""
+        if not isinstance(method, Methods):
+            raise ValueError("Internal Error. Invalid HTTP/S Method.")
+
+        request_headers = {
+            "Host": self._host_header,
+            "User-Agent": USER_AGENT,
+            "Accept": "*/*",
+            "Connection": "keep-alive",
+        }
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            request_headers["Content-Type"] = "application/json"
+        elif data is not None:
+            body = urlencode(data).encode("utf-8")
+            request_headers[
+                "Content-Type"
+            ] = "application/x-www-form-urlencoded"
+
+        if body or method == Methods.post:
+            request_headers["Content-Length"] = str(len(body))
+
+        request_headers.update(self.headers)
+        request_headers.update(headers or {})
+
+        # created in the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+
+        target = f"{self._base_path}/{url}"
+        if self._proxy is not None and not self._tls:
+            # the proxy requests have the absolute URL
+            target = f"http://{self._host_header}{target}"
+            request_headers.update(self._proxy_headers())
+
+        try:
+            async with self._semaphore:
+                return await self._send(
+                    method.value.upper(), target, request_headers, body
+                )
+
+        except asyncio.TimeoutError:
+            raise click.ClickException(f"Timeout connecting to {self.server}")
+
+        except InvalidResponseError as err:
+            raise click.ClickException(
+                f"Invalid response from {self.server}: {err}"
+            )
+
+        except (OSError, asyncio.IncompleteReadError):
+            raise click.ClickException(f"Failed to connect to {self.server}")
+
+    async def is_logged(self, token: str) -> Optional[Login]:
+        """Same as ``api_client.is_logged``, for the client server."""
+        headers = {"Authorization": f"Bearer {token}"}
+        url = f"{URL.token.value}?token={token}"
+        response = await self.request(url, Methods.get, headers=headers)
+        if response.status_code == 401 or response.status_code == 403:
+            return Login(state=False)
+
+        elif response.status_code == 200:
+            data = response.json().get("data")
+            if data.get("expired") is False:
+                return Login(state=True, data=data)
+
+        return None
+
+    async def bootstrap_status(self) -> AsyncResponse:
+        """Gets the bootstrap status (``URL.bootstrap``)."""
+        return await self.request(URL.bootstrap.value, Methods.get)
+
+    async def bootstrap(self, json_payload: Dict[str, Any]) -> AsyncResponse:
+        """Posts the bootstrap payload (``URL.bootstrap``)."""
+        return await self.request(
+            URL.bootstrap.value, Methods.post, payload=json_payload
+        )
+
+    async def task(self, task_id: str) -> AsyncResponse:
+        """Gets the task state (``URL.task``)."""
+        return await self.request(f"{URL.task.value}{task_id}", Methods.get)
@@ -0,0 +1,104 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import re
+from typing import Any, Callable
+
+from securesystemslib.formats import encode_canonical  # type: ignore
+from tuf.api.metadata import Signed
+from tuf.api.serialization import SerializationError, SignedSerializer
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# a digit followed by '.' or exponent is a float (i.e. 1.5, 1e+20)
+_JSON_FLOAT = re.compile(rb"\d[.eE]")
+
+
+def encode_canonical_reference(data: Any) -> bytes:
+    """Canonical JSON bytes using the securesystemslib (reference) encoder"""
+    return encode_canonical(data).encode("utf-8")
+
+
+def _dumps_json(data: Any) -> bytes:
+    return json.dumps(
+        data,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        allow_nan=False,
+    ).encode("utf-8")
+
+
+def _dumps_orjson(data: Any) -> bytes:
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+
+
+def _is_canonical(encoded: bytes) -> bool:
+    """
+    Checks that the compact JSON has no escapes and no floats.
+
+    The canonical JSON only escapes '"' and '\\' in strings and has no floats.
+    Without escapes, every '"' starts or ends a string, so the floats are
+    searched only outside of the strings.
+    """
+    if b"\\" in encoded:
+        return False
+
+    structure = b"".join(encoded.split(b'"')[0::2])
+    return _JSON_FLOAT.search(structure) is None
+
+
+def _encode_canonical(dumps: Callable[[Any], bytes], data: Any) -> bytes:
+    """
+    The data is encoded by dumps as compact JSON with sorted keys, that is the
+    canonical JSON unless it has any string escape or a float. In this case,
+    or if dumps fails, it falls back to the reference encoder.
+    """
+    try:
+        encoded = dumps(data)
+    except (TypeError, ValueError):
+        return encode_canonical_reference(data)
+
+    if not _is_canonical(encoded):
+        return encode_canonical_reference(data)
+
+    return encoded
+
+
+def encode_canonical_json(data: Any) -> bytes:
+    """Canonical JSON bytes using the C accelerated ``json`` encoder"""
+    return _encode_canonical(_dumps_json, data)
+
+
+def encode_canonical_orjson(data: Any) -> bytes:
+    """Canonical JSON bytes using the ``orjson`` encoder (optional)"""
+    return _encode_canonical(_dumps_orjson, data)
+
+
+# fastest encoder available
+encode_canonical_fast = (
+    encode_canonical_orjson if orjson else encode_canonical_json
+)
+
+
+class CanonicalSerializer(SignedSerializer):
+    """Signed serializer to canonical JSON bytes with a pluggable encoder.
+
+    The default encoder is ``encode_canonical_fast``.
+    """
+
+    def __init__(
+        self, encoder: Callable[[Any], bytes] = encode_canonical_fast
+    ) -> None:
+        self.encoder = encoder
+
+    def serialize(self, signed_obj: Signed) -> bytes:
+        try:
+            return self.encoder(signed_obj.to_dict())
+        except Exception as e:
+            raise SerializationError from e
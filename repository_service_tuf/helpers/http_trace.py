@@ -0,0 +1,320 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import math
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import urllib3
+from requests.adapters import HTTPAdapter
+from rich.table import Table  # type: ignore
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+# the trace of the request running in the thread
+_local = threading.local()
+# the connection phases and bytes are traced with urllib3 1.x internals
+# (i.e. ``_new_conn``), with other versions only the requests are traced
+TRACE_CONNECTIONS = urllib3.__version__.startswith("1.") and all(
+    hasattr(HTTPConnection, name)
+    for name in ("_new_conn", "request_chunked", "getresponse")
+)
+
+
+@dataclass
+class RequestTrace:
+    """Timings and sizes of one API request, the times in milliseconds.
+
+    ``dns``, ``connect`` and ``tls`` are None when the request reused a
+    kept alive connection. ``ttfb`` (time to first byte) goes from the
+    request sent to the response headers received. ``request_bytes`` are
+    the bytes sent (headers and body) and ``response_bytes`` the response
+    body size. The times and bytes of the retries are added up.
+    """
+
+    method: str
+    url: str
+    start: str = ""
+    status: Optional[int] = None
+    error: Optional[str] = None
+    dns: Optional[float] = None
+    connect: Optional[float] = None
+    tls: Optional[float] = None
+    ttfb: Optional[float] = None
+    total: float = 0.0
+    request_bytes: int = 0
+    response_bytes: Optional[int] = None
+    retries: int = 0
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+    _sent_at: float = field(default=0.0, repr=False)
+    _attempts: int = field(default=0, repr=False)
+
+    def add(self, phase: str, seconds: float) -> None:
+        value = getattr(self, phase) or 0.0
+        setattr(self, phase, value + seconds * 1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        for phase in ("dns", "connect", "tls", "ttfb", "total"):
+            if data[phase] is not None:
+                data[phase] = round(data[phase], 3)
+
+        return data
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return getattr(_local, "trace", None)
+
+
+class _CountingReader:
+    """File body wrapper, counting the bytes read to be sent."""
+
+    def __init__(self, file: IO[bytes], trace: RequestTrace) -> None:
+        self._file = file
+        self._trace = trace
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._trace.request_bytes += len(data)
+        return data
+
+
+class _TracedConnectionMixin:
+    """Records the connection phases in the trace of the running request."""
+
+    _dns_host: str
+    _connect_seconds: float = 0.0
+    port: int
+
+    def _new_conn(self):
+        trace = current_trace()
+        if trace is None:
+            return super()._new_conn()  # type: ignore
+
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(
+                self._dns_host, self.port, 0, socket.SOCK_STREAM
+            )
+        except OSError:
+            # fails again and raises the urllib3 error
+            addresses = []
+
+        resolved = time.perf_counter()
+        trace.add("dns", resolved - start)
+        dns_host = self._dns_host
+        try:
+            # connects to the addresses resolved, in order
+            for *_, sockaddr in addresses[:-1]:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()  # type: ignore
+                except NewConnectionError:
+                    pass
+
+            if addresses:
+                self._dns_host = addresses[-1][4][0]
+
+            return super()._new_conn()  # type: ignore
+
+        except Exception:
+            # a failed attempt, retried by urllib3 or not
+            trace._attempts += 1
+            raise
+
+        finally:
+            self._dns_host = dns_host
+            self._connect_seconds = time.perf_counter() - start
+            trace.add("connect", time.perf_counter() - resolved)
+
+    def send(self, data):
+        trace = current_trace()
+        if trace is not None:
+            if hasattr(data, "read"):
+                data = _CountingReader(data, trace)
+            else:
+                trace.request_bytes += len(data)
+
+        super().send(data)  # type: ignore
+
+    def _sent(self) -> None:
+        trace = current_trace()
+        if trace is not None:
+            trace._attempts += 1
+            trace._sent_at = time.perf_counter()
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)  # type: ignore
+        self._sent()
+
+    def request_chunked(self, *args, **kwargs):
+        super().request_chunked(*args, **kwargs)  # type: ignore
+        self._sent()
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)  # type: ignore
+        trace = current_trace()
+        if trace is not None:
+            trace.add("ttfb", time.perf_counter() - trace._sent_at)
+
+        return response
+
+
+class _TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        trace = current_trace()
+        start = time.perf_counter()
+        super().connect()
+        if trace is not None:
+            # the TLS handshake is the connect time after the TCP connection
+            trace.add(
+                "tls", time.perf_counter() - start - self._connect_seconds
+            )
+
+
+class _TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+class TracedHTTPAdapter(HTTPAdapter):
+    """HTTP adapter with connections that record the request traces.
+
+    Without ``TRACE_CONNECTIONS`` it is a plain adapter, the requests have
+    only the total time, the status and the response bytes.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        if not TRACE_CONNECTIONS:
+            return
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TracedHTTPConnectionPool,
+            "https": _TracedHTTPSConnectionPool,
+        }
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class HTTPTracer:
+    """Writes the traces of the API requests to a file, as JSON lines.
+
+    A request is traced from ``start`` to ``finish``, in the same thread.
+    The lines are appended to the file, and the traces are kept for the
+    ``summary`` table.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.traces: List[RequestTrace] = []
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    def start(self, method: str, url: str) -> RequestTrace:
+        """Starts the trace of a request in this thread."""
+        trace = RequestTrace(
+            method.upper(), url, start=datetime.now(timezone.utc).isoformat()
+        )
+        _local.trace = trace
+        return trace
+
+    def finish(self, trace: RequestTrace, response: Any = None) -> None:
+        """Finishes the trace of the request and writes it."""
+        trace.total = (time.perf_counter() - trace._started) * 1000
+        _local.trace = None
+        trace.retries = max(trace._attempts - 1, 0)
+        if response is not None:
+            trace.status = response.status_code
+            if response.raw is None or not response.raw.isclosed():
+                # streamed, not read yet
+                length = response.headers.get("Content-Length")
+                trace.response_bytes = int(length) if length else None
+            else:
+                trace.response_bytes = len(response.content)
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+
+            self.traces.append(trace)
+            self._file.write(json.dumps(trace.to_dict()) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def summary(self) -> Table:
+        """Summary table of the requests, by method and URL path."""
+        groups: Dict[str, List[RequestTrace]] = {}
+        for trace in self.traces:
+            key = f"{trace.method} {urlsplit(trace.url).path}"
+            groups.setdefault(key, []).append(trace)
+
+        table = Table(title=f"HTTP requests (trace: {self.path})")
+        for column in (
+            "Request",
+            "Count",
+            "Status",
+            "Retries",
+            "Connect avg (ms)",
+            "TTFB avg (ms)",
+            "Total avg (ms)",
+            "Total p95 (ms)",
+            "Sent (B)",
+            "Received (B)",
+        ):
+            table.add_column(
+                column, justify="left" if column == "Request" else "right"
+            )
+
+        for key, traces in groups.items():
+            totals = [t.total for t in traces]
+            ttfbs = [t.ttfb for t in traces if t.ttfb is not None]
+            connects = [
+                sum(filter(None, (t.dns, t.connect, t.tls)))
+                for t in traces
+                if t.connect is not None
+            ]
+            statuses: Dict[str, int] = {}
+            for t in traces:
+                status = t.error or str(t.status)
+                statuses[status] = statuses.get(status, 0) + 1
+
+            table.add_row(
+                key,
+                str(len(traces)),
+                " ".join(f"{s}×{n}" for s, n in sorted(statuses.items())),
+                str(sum(t.retries for t in traces)),
+                f"{sum(connects) / len(connects):.1f}" if connects else "-",
+                f"{sum(ttfbs) / len(ttfbs):.1f}" if ttfbs else "-",
+                f"{sum(totals) / len(totals):.1f}",
+                f"{percentile(totals, 95):.1f}",
+                str(sum(t.request_bytes for t in traces)),
+                str(sum(t.response_bytes or 0 for t in traces)),
+            )
+
+        return table
@@ -0,0 +1,359 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from securesystemslib.exceptions import (  # type: ignore
+    CryptoError,
+    Error,
+    FormatError,
+    StorageError,
+)
+from securesystemslib.interface import (  # type: ignore
+    import_ed25519_privatekey_from_file,
+)
+from securesystemslib.keys import create_signature  # type: ignore
+from securesystemslib.signer import (  # type: ignore
+    Signature,
+    Signer,
+    SSlibSigner,
+)
+
+# socket of the running key agent, used by the ceremony and the signing
+KEY_AGENT_SOCK_ENV = "RSTUF_KEY_AGENT_SOCK"
+# default seconds a key is held by the agent
+KEY_TTL = 3600
+
+
+class KeyAgentError(Exception):
+    """Error answered by the key agent, or failure to reach it."""
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "rstuf-key-agent.sock")
+
+    return os.path.join(os.path.expanduser("~"), ".rstuf-key-agent.sock")
+
+
+def _public_key(key: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **key,
+        "keyval": {"public": key["keyval"]["public"], "private": ""},
+    }
+
+
+@dataclass
+class _HeldKey:
+    key: Dict[str, Any]
+    path: str
+    expires: float
+
+
+class KeyAgent:
+    """Holds decrypted keys in memory and signs with them on request.
+
+    The requests and responses are JSON lines over a Unix socket, only
+    accessible by the user. A request is an object with a ``command``:
+
+    - ``add``: decrypts the key file ``path`` with ``password`` and holds it
+      for ``ttl`` seconds (default the agent ``ttl``). It answers the public
+      key, and the private key only with ``export`` (the online keys are sent
+      to the service). A key file already added with the same password isn't
+      decrypted again.
+    - ``sign``: signs the base64 ``payload`` with the key ``keyid``.
+    - ``list``: the keys held, with the seconds until they expire.
+    - ``lock``: removes all the keys.
+
+    The response has the ``data``, or the error ``detail``.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        ttl: float = KEY_TTL,
+        load_key: Callable[..., Dict[str, Any]] = (
+            import_ed25519_privatekey_from_file
+        ),
+        clock: Callable[[], float] = time.monotonic,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.socket_path = socket_path
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._load_key = load_key
+        self._clock = clock
+        self._keys: Dict[str, _HeldKey] = {}
+        # (path, modification time, password digest) of the added keys
+        self._added: Dict[Tuple[str, int, str], str] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _expire(self) -> None:
+        now = self._clock()
+        with self._lock:
+            for keyid, held in list(self._keys.items()):
+                if held.expires <= now:
+                    del self._keys[keyid]
+
+            self._added = {
+                added: keyid
+                for added, keyid in self._added.items()
+                if keyid in self._keys
+            }
+
+    def _add(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        path = os.path.abspath(request["path"])
+        password = request["password"]
+        ttl = float(request.get("ttl") or self.ttl)
+        try:
+            added = (
+                path,
+                os.stat(path).st_mtime_ns,
+                hashlib.sha256(password.encode()).hexdigest(),
+            )
+        except OSError as err:
+            raise KeyAgentError(f"Cannot read {path}: {err.strerror}")
+
+        with self._lock:
+            keyid = self._added.get(added)
+            held = self._keys.get(keyid) if keyid else None
+
+        if held is None:
+            try:
+                key = self._load_key(path, password)
+            except CryptoError as err:
+                raise KeyAgentError(f"{str(err)} Check the password.")
+            except (StorageError, FormatError, Error) as err:
+                raise KeyAgentError(str(err))
+
+            held = _HeldKey(key=key, path=path, expires=0)
+
+        with self._lock:
+            held.expires = max(held.expires, self._clock() + ttl)
+            self._keys[held.key["keyid"]] = held
+            self._added[added] = held.key["keyid"]
+
+        if request.get("export"):
+            return held.key
+
+        return _public_key(held.key)
+
+    def _sign(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            held = self._keys.get(request["keyid"])
+
+        if held is None:
+            raise KeyAgentError(f"Key {request['keyid']} not in the agent")
+
+        payload = base64.b64decode(request["payload"])
+        return create_signature(held.key, payload)
+
+    def _list(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            return [
+                {
+                    "keyid": keyid,
+                    "path": held.path,
+                    "expires_in": round(held.expires - now),
+                }
+                for keyid, held in self._keys.items()
+            ]
+
+    def _lock_keys(self, request: Dict[str, Any]) -> None:
+        with self._lock:
+            self._keys.clear()
+            self._added.clear()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answers a request."""
+        commands = {
+            "add": self._add,
+            "sign": self._sign,
+            "list": self._list,
+            "lock": self._lock_keys,
+        }
+        self._expire()
+        command = commands.get(request.get("command"))  # type: ignore
+        if command is None:
+            return {"detail": f"Invalid command {request.get('command')}"}
+
+        try:
+            return {"data": command(request)}
+        except KeyAgentError as err:
+            return {"detail": str(err)}
+        except (KeyError, TypeError, ValueError) as err:
+            return {"detail": f"Invalid request: {err}"}
+
+    def start(self) -> "KeyAgent":
+        """Listens on the socket and answers the requests in a thread."""
+        agent = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        request = None
+
+                    if isinstance(request, dict):
+                        response = agent.handle(request)
+                    else:
+                        response = {"detail": "Invalid JSON request"}
+
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        class _Server(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+            def service_actions(self):
+                # the expired keys don't stay in memory without requests
+                agent._expire()
+
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.socket_path, _Handler)
+        finally:
+            os.umask(umask)
+
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            args=(self.poll_interval,),
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def wait(self) -> None:
+        """Waits until the agent is stopped."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def stop(self) -> None:
+        """Stops listening, removes the socket and the keys."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+        self._lock_keys({})
+
+
+class KeyAgentClient:
+    """Client of the ``KeyAgent`` listening on ``socket_path``."""
+
+    def __init__(self, socket_path: str, timeout: float = 30) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, command: str, **params) -> Any:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(
+                    json.dumps({"command": command, **params}).encode() + b"\n"
+                )
+                with sock.makefile("rb") as sock_file:
+                    line = sock_file.readline()
+        except OSError as err:
+            raise KeyAgentError(
+                f"Failed to connect to the key agent {self.socket_path}: "
+                f"{err.strerror or err}"
+            )
+
+        try:
+            response = json.loads(line)
+        except ValueError:
+            raise KeyAgentError("Invalid response from the key agent")
+
+        if "detail" in response:
+            raise KeyAgentError(response["detail"])
+
+        return response.get("data")
+
+    def add(
+        self,
+        path: str,
+        password: str,
+        ttl: Optional[float] = None,
+        export: bool = False,
+    ) -> Dict[str, Any]:
+        """Adds the key file to the agent, returns the key.
+
+        The private key is returned only with ``export``.
+        """
+        return self._request(
+            "add",
+            path=os.path.abspath(path),
+            password=password,
+            ttl=ttl,
+            export=export,
+        )
+
+    def sign(self, keyid: str, payload: bytes) -> Signature:
+        data = self._request(
+            "sign",
+            keyid=keyid,
+            payload=base64.b64encode(payload).decode(),
+        )
+        return Signature.from_dict(data)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return self._request("list")
+
+    def lock(self) -> None:
+        self._request("lock")
+
+
+def configured_agent() -> Optional[KeyAgentClient]:
+    """The client of the agent in ``RSTUF_KEY_AGENT_SOCK``, if it is set."""
+    socket_path = os.environ.get(KEY_AGENT_SOCK_ENV)
+    return KeyAgentClient(socket_path) if socket_path else None
+
+
+class AgentSigner(Signer):
+    """Signer of a key held by the key agent.
+
+    ``key_dict`` is the public key, the agent signs with the private key.
+    """
+
+    def __init__(self, key_dict: Dict[str, Any], agent: KeyAgentClient):
+        self.key_dict = key_dict
+        self.agent = agent
+
+    def sign(self, payload: bytes) -> Signature:
+        return self.agent.sign(self.key_dict["keyid"], payload)
+
+
+def new_signer(key: Dict[str, Any]) -> Signer:
+    """Signer of the key: local with the private key, else the agent's."""
+    if key["keyval"].get("private"):
+        return SSlibSigner(key)
+
+    agent = configured_agent()
+    if agent is None:
+        raise KeyAgentError(
+            f"Key {key['keyid']} without private key and no key agent "
+            f"({KEY_AGENT_SOCK_ENV})"
+        )
+
+    return AgentSigner(key, agent)
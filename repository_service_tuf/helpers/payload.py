@@ -0,0 +1,140 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import re
+import tempfile
+from typing import IO, Any, Dict, Iterable, List, Set, Tuple
+
+from tuf.api.metadata import Metadata
+
+PAYLOAD_KEYS = ("settings", "metadata")
+# a JSON string, matched whole so the brackets in it are skipped, or an
+# object/array bracket or a colon. ``end`` is empty for a string cut by the
+# end of the buffer.
+_TOKENS = re.compile(
+    rb'"[^"\\]*(?:\\.[^"\\]*)*(?P<end>"?)|[{}\[\]:]', re.DOTALL
+)
+_OPENING = {b"}": b"{", b"]": b"["}
+
+
+def _indent(text: str, indent: int) -> str:
+    """Indents all lines but the first. JSON strings have no raw new lines."""
+    return text.replace("\n", "\n" + " " * indent)
+
+
+def write_payload(
+    file: IO[str],
+    settings: Dict[str, Any],
+    metadata: Iterable[Tuple[str, Metadata]],
+) -> None:
+    """
+    Writes the bootstrap payload JSON incrementally.
+
+    Every metadata is serialized and written as soon as it is consumed from
+    ``metadata``, so only one metadata is in memory at a time. The output is
+    the same as ``json.dumps(payload, indent=2)``.
+    """
+    file.write('{\n  "settings": ')
+    file.write(_indent(json.dumps(settings, indent=2), 2))
+    file.write(',\n  "metadata": {')
+    empty = True
+    for filename, role in metadata:
+        file.write("\n    " if empty else ",\n    ")
+        file.write(f"{json.dumps(filename)}: ")
+        file.write(_indent(json.dumps(role.to_dict(), indent=2), 4))
+        empty = False
+
+    file.write("}\n}" if empty else "\n  }\n}")
+
+
+def write_payload_file(
+    path: str,
+    settings: Dict[str, Any],
+    metadata: Iterable[Tuple[str, Metadata]],
+) -> None:
+    """
+    Writes the bootstrap payload (``write_payload``) to the ``path`` file.
+
+    It is written to a temporary file, renamed to ``path`` when complete. If
+    the metadata generation fails, there is no partial payload file and an
+    existing ``path`` file is kept.
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{filename}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as tmp_file:
+            write_payload(tmp_file, settings, metadata)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def validate_payload(file: IO[bytes], chunk_size: int = 1024 * 1024) -> None:
+    """
+    Checks the bootstrap payload JSON structure without loading it.
+
+    The file is scanned in chunks of ``chunk_size`` bytes, so the memory used
+    doesn't depend on the payload size. The payload must be one JSON object
+    with the ``settings`` and ``metadata`` keys, and its objects and arrays
+    must be balanced. The values are not parsed, the server validates them.
+
+    Raises ``ValueError`` with the reason of an invalid payload.
+    """
+    stack: List[bytes] = []
+    keys: Set[bytes] = set()
+    previous = b""
+    done = False
+    buffer = b""
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        position = 0
+        end = len(buffer)
+        for match in _TOKENS.finditer(buffer):
+            if match.group("end") == b"":
+                if not chunk:
+                    raise ValueError("unterminated string")
+
+                # scanned again with the next chunk
+                end = match.start()
+                break
+
+            token = match.group()
+            start = match.start()
+            if not stack and (
+                done or token != b"{" or buffer[position:start].strip()
+            ):
+                raise ValueError("the payload must be one JSON object")
+
+            position = match.end()
+            if token in (b"{", b"["):
+                stack.append(token)
+            elif token in _OPENING:
+                if stack.pop() != _OPENING[token]:
+                    raise ValueError(f"unexpected {token.decode()}")
+
+                done = not stack
+            elif token == b":" and len(stack) == 1:
+                keys.add(previous)
+
+            previous = token
+
+        if not stack and buffer[position:end].strip():
+            raise ValueError("the payload must be one JSON object")
+
+        buffer = buffer[end:]
+        if not chunk:
+            break
+
+    if not done:
+        raise ValueError("incomplete JSON object")
+
+    missing = [k for k in PAYLOAD_KEYS if json.dumps(k).encode() not in keys]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
@@ -2,11 +2,18 @@
 #
 # SPDX-License-Identifier: MIT
 
+import copy
+import os
+import queue
+import tempfile
+import threading
+from collections.abc import Mapping
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from securesystemslib.signer import Signer, SSlibSigner  # type: ignore
+from securesystemslib.signer import Signature, Signer  # type: ignore
+from tuf.api.exceptions import UnsignedMetadataError
 from tuf.api.metadata import (
     SPECIFICATION_VERSION,
     TOP_LEVEL_ROLE_NAMES,
@@ -17,19 +24,101 @@ from tuf.api.metadata import (
     MetaFile,
     Role,
     Root,
+    Signed,
     Snapshot,
     SuccinctRoles,
     Targets,
     Timestamp,
 )
+from tuf.api.serialization import SignedSerializer
 from tuf.api.serialization.json import JSONSerializer
 
+from repository_service_tuf.helpers.canonical import CanonicalSerializer
+from repository_service_tuf.helpers.key_agent import new_signer
+
 SPEC_VERSION: str = ".".join(SPECIFICATION_VERSION)
 BIN: str = "bin"
 BINS: str = "bins"
 
 
-repository_metadata: Dict[str, Metadata] = {}
+class MetadataStore(Mapping):
+    """Metadata store indexed by role name and version.
+
+    The store is a read-only mapping of the metadata file names (i.e.
+    ``1.root``, ``timestamp``) to the metadata, in the order they were added.
+    Use ``add_role`` to add metadata and ``get_role`` to load a role by its
+    exact name, the latest version by default.
+    """
+
+    def __init__(self) -> None:
+        self._filenames: Dict[str, Metadata] = {}
+        self._roles: Dict[str, Dict[int, Metadata]] = {}
+        self._latest: Dict[str, int] = {}
+
+    @staticmethod
+    def role_name(filename: str) -> str:
+        """Returns the role name from a metadata file name."""
+        if filename == Timestamp.type:
+            return filename
+
+        return filename.split(".", 1)[1]
+
+    @staticmethod
+    def filename(role_name: str, version: int) -> str:
+        """Returns the metadata file name (without extension) for a role.
+        All names but 'timestamp' are prefixed with the version number.
+        """
+        if role_name == Timestamp.type:
+            return role_name
+
+        return f"{version}.{role_name}"
+
+    def add_role(self, role_name: str, role: Metadata) -> str:
+        """Adds the role metadata and returns its file name."""
+        version = role.signed.version
+        filename = self.filename(role_name, version)
+        self._filenames[filename] = role
+        self._roles.setdefault(role_name, {})[version] = role
+        if version >= self._latest.get(role_name, version):
+            self._latest[role_name] = version
+
+        return filename
+
+    def latest_version(self, role_name: str) -> int:
+        """Returns the latest version of the role. Raises KeyError if the role
+        is not in the store.
+        """
+        return self._latest[role_name]
+
+    def versions(self, role_name: str) -> List[int]:
+        """Returns all versions of the role, sorted."""
+        return sorted(self._roles.get(role_name, {}))
+
+    def get_role(
+        self, role_name: str, version: Optional[int] = None
+    ) -> Metadata:
+        """Returns the role metadata for the version, default is the latest.
+        Raises KeyError if the role or the version is not in the store.
+        """
+        if version is None:
+            version = self.latest_version(role_name)
+
+        return self._roles[role_name][version]
+
+    def clear(self) -> None:
+        """Removes all metadata from the store."""
+        self._filenames.clear()
+        self._roles.clear()
+        self._latest.clear()
+
+    def __getitem__(self, filename: str) -> Metadata:
+        return self._filenames[filename]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._filenames)
+
+    def __len__(self) -> int:
+        return len(self._filenames)
 
 
 @dataclass
@@ -63,72 +152,320 @@ class RoleSettingsInput:
         return asdict(self)
 
 
-def initialize_metadata(
-    settings: Dict[str, RoleSettingsInput], save=True
-) -> Dict[str, Metadata]:
+def sign_metadata(
+    role: Metadata,
+    signers: List[Signer],
+    signed_serializer: Optional[SignedSerializer] = None,
+) -> None:
+    """Replaces the role signatures with the signatures of all signers.
+
+    Unlike ``Metadata.sign`` per signer, the signed role is serialized once
+    and every signer signs the same canonical bytes.
     """
-    Creates development TUF top-level role metadata (root, targets, snapshot,
-    timestamp).
+    if signed_serializer is None:
+        signed_serializer = CanonicalSerializer()
+
+    data = signed_serializer.serialize(role.signed)
+    role.signatures.clear()
+    for signer in signers:
+        try:
+            signature = signer.sign(data)
+        except Exception as e:
+            raise UnsignedMetadataError("Problem signing the metadata") from e
+
+        role.signatures[signature.keyid] = signature
+
+
+class SignatureCache:
+    """Content-addressed cache of signatures.
+
+    Signatures are cached by the canonical bytes of the signed role and the
+    key id. Roles with identical signed bodies are encoded and signed only
+    once, and the cached signatures are attached to every matching role.
     """
 
-    def _load(role_name: str) -> Metadata:
+    def __init__(
+        self, signed_serializer: Optional[SignedSerializer] = None
+    ) -> None:
+        self._serializer = signed_serializer or CanonicalSerializer()
+        self._signatures: Dict[Tuple[bytes, str], Signature] = {}
+        # last signed body and its canonical bytes, it skips the encoding of
+        # consecutive identical bodies (i.e. the hash bins roles)
+        self._last_signed: Optional[Signed] = None
+        self._last_bytes: Optional[bytes] = None
+
+    def _canonical_bytes(self, signed: Signed) -> bytes:
+        if self._last_signed is None or signed != self._last_signed:
+            self._last_bytes = self._serializer.serialize(signed)
+            self._last_signed = copy.deepcopy(signed)
+
+        return self._last_bytes
+
+    def sign(self, role: Metadata, signers: List[Signer]) -> None:
+        """Replaces the role signatures with the signatures of all signers"""
+        data = self._canonical_bytes(role.signed)
+        role.signatures.clear()
+        for signer in signers:
+            cache_key = (data, signer.key_dict["keyid"])
+            if cache_key not in self._signatures:
+                try:
+                    self._signatures[cache_key] = signer.sign(data)
+                except Exception as e:
+                    raise UnsignedMetadataError(
+                        "Problem signing the metadata"
+                    ) from e
+
+            signature = self._signatures[cache_key]
+            role.signatures[signature.keyid] = signature
+
+
+class MetadataWriter:
+    """Write-behind writer of metadata files.
+
+    ``write`` serializes the metadata and puts it in a bounded queue, the
+    files are written by I/O threads while the caller continues. Each file is
+    written to a temporary file, synced and renamed, so there are no partial
+    files. ``close`` waits for all writes and syncs the directory once.
+    """
+
+    def __init__(
+        self, directory: str, threads: int = 4, queue_size: int = 128
+    ) -> None:
+        self.directory = directory
+        self._serializer = JSONSerializer()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._error: Optional[BaseException] = None
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True)
+            for _ in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _write_file(self, filename: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{filename}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+                # the data is on disk before the rename makes it visible
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            # metadata is public, mkstemp creates it readable only by owner
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, os.path.join(self.directory, filename))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            if self._error is None:
+                try:
+                    self._write_file(*item)
+                except Exception as err:
+                    self._error = err
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def write(self, filename: str, role: Metadata) -> None:
+        """Queues the metadata to be written as filename in the directory.
+        The metadata is serialized before it returns, so it can be changed.
         """
-        Loads latest version of metadata for rolename from metadata_repository
-        dict
+        self._raise_error()
+        self._queue.put((filename, role.to_bytes(self._serializer)))
+
+    def close(self) -> None:
+        """Waits for all writes and syncs the directory. Raises the first
+        write error, if any.
         """
-        if role_name == Timestamp.type:
-            filename = f"{role_name}"
-        else:
-            filenames = [
-                filename
-                for filename in repository_metadata
-                if role_name in filename
-            ]
-            versions = [
-                int(name.split("/")[-1].split(".", 1)[0]) for name in filenames
-            ]
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        self._raise_error()
+        if os.name == "posix":
+            dir_fd = os.open(self.directory, os.O_RDONLY)
             try:
-                version = max(versions)
-            except ValueError:
-                version = 1
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+class Keyring:
+    """Signers and public keys of the roles from the settings.
+
+    Each Signer and Key is built once per key input and the same instances
+    are returned by every call. The keys without the private key (from the
+    key agent) are signed by the key agent.
+    """
+
+    def __init__(self, settings: Dict[str, RoleSettingsInput]) -> None:
+        self._settings = settings
+        self._signers: Dict[str, Signer] = {}
+        self._keys: Dict[str, Key] = {}
+        self._role_keyids: Dict[str, List[str]] = {}
+
+    def _keyids(self, role_name: str) -> List[str]:
+        if role_name not in self._role_keyids:
+            keyids = []
+            for key_input in self._settings[role_name].keys.values():
+                keyid = key_input.key.key["keyid"]
+                if keyid not in self._signers:
+                    self._signers[keyid] = new_signer(key_input.key.key)
+                    self._keys[keyid] = Key.from_securesystemslib_key(
+                        key_input.key.key
+                    )
+                keyids.append(keyid)
+
+            self._role_keyids[role_name] = keyids
+
+        return self._role_keyids[role_name]
 
-            filename = f"{version}.{role_name}"
+    def signers(self, role_name: str) -> List[Signer]:
+        """Returns all Signers for a specific role name"""
+        return [self._signers[keyid] for keyid in self._keyids(role_name)]
 
-        return repository_metadata[filename]
+    def keys(self, role_name: str) -> List[Key]:
+        """Returns all public Keys for a specific role name"""
+        return [self._keys[keyid] for keyid in self._keyids(role_name)]
 
-    def _signers(role_name: str) -> List[Signer]:
+
+class MetadataGenerator:
+    """Generates the development TUF metadata of a repository.
+
+    The generation state (metadata store, signers and keys) belongs to the
+    instance and every ``generate`` starts a new ``metadata`` store, so
+    generators of different repositories can run concurrently from threads
+    or asyncio tasks (i.e. ``asyncio.to_thread``). An instance runs one
+    generation at a time.
+
+    The hash bin roles have the same signed body, it is signed once for all
+    of them by a ``SignatureCache``.
+
+    The ``signed_serializer`` serializes the signed roles to be signed, the
+    default is the ``CanonicalSerializer`` with the fast encoder.
+
+    With save, the metadata files are written in ``metadata_dir`` in
+    background by a ``MetadataWriter``.
+    """
+
+    def __init__(
+        self,
+        settings: Dict[str, RoleSettingsInput],
+        signed_serializer: Optional[SignedSerializer] = None,
+        metadata_dir: str = "metadata",
+    ) -> None:
+        self.settings = settings
+        self.signed_serializer = signed_serializer
+        self.metadata_dir = metadata_dir
+        self.metadata = MetadataStore()
+        self._keyring = Keyring(settings)
+        self._writer: Optional[MetadataWriter] = None
+        self._lock = threading.Lock()
+
+    def initialize(self, save=True) -> MetadataStore:
+        """
+        Creates development TUF top-level role metadata (root, targets,
+        snapshot, timestamp) and the hash bins roles.
+
+        Returns the ``metadata`` store with all the generated metadata.
+        """
+        for filename, role in self.generate(save=save):
+            if filename not in self.metadata:
+                self.metadata.add_role(MetadataStore.role_name(filename), role)
+
+        return self.metadata
+
+    def generate(self, save=True) -> Iterator[Tuple[str, Metadata]]:
+        """
+        Generates the TUF metadata, yielding every (filename, Metadata) as
+        soon as it is final.
+
+        The top-level roles are kept in ``metadata`` to be loaded and
+        updated. The hash bins roles are only yielded, so the memory doesn't
+        grow with the number of hash bins.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Metadata generation already in progress")
+
+        try:
+            self.metadata = MetadataStore()
+            if save:
+                self._writer = MetadataWriter(self.metadata_dir)
+            try:
+                yield from self._generate()
+            finally:
+                if self._writer is not None:
+                    writer, self._writer = self._writer, None
+                    writer.close()
+        finally:
+            self._lock.release()
+
+    def _load(self, role_name: str) -> Metadata:
+        """
+        Loads latest version of metadata for rolename from the metadata store
+
+        It returns a copy, so the loaded version is not changed by updates.
+        """
+        return copy.deepcopy(self.metadata.get_role(role_name))
+
+    def _signers(self, role_name: str) -> List[Signer]:
         """Returns all Signers from the settings for a specific role name"""
-        return [
-            SSlibSigner(key_input.key.key)
-            for key_input in settings[role_name].keys.values()
-        ]
+        return self._keyring.signers(role_name)
 
-    def _sign(role: Metadata, role_name: str) -> None:
-        """Re-signs metadata with role-specific key from global key store.
+    def _sign(self, role: Metadata, role_name: str) -> None:
+        """Re-signs metadata with role-specific key from the keyring.
         The metadata role type is used as default key id. This is only allowed
         for top-level roles.
         """
-        role.signatures.clear()
-        for signer in _signers(role_name):
-            role.sign(signer, append=True)
+        sign_metadata(role, self._signers(role_name), self.signed_serializer)
 
-    def _add_payload(role: Metadata, role_name: str) -> None:
+    def _add_payload(
+        self, role: Metadata, role_name: str, keep: bool = True
+    ) -> Tuple[str, Metadata]:
         """Persists metadata using the configured storage backend.
-        The metadata role type is used as default role name. This is only
-        allowed for top-level roles. All names but 'timestamp' are prefixed
-        with a version number.
+        The metadata role type is used as default role name. All names but
+        'timestamp' are prefixed with a version number. Only metadata with
+        keep is stored in the metadata store to be loaded later.
         """
-        filename = f"{role_name}"
-
-        if role_name != Timestamp.type:
-            filename = f"{role.signed.version}.{filename}"
-
-        repository_metadata[filename] = role
+        filename = MetadataStore.filename(role_name, role.signed.version)
+        if keep:
+            self.metadata.add_role(role_name, role)
+
+        if self._writer is not None:
+            self._writer.write(filename, role)
+
+        return filename, role
+
+    def _hash_bins(
+        self, bin_names: List[str]
+    ) -> Iterator[Tuple[str, Metadata]]:
+        """Creates and signs an empty hash bin role for every name"""
+        signers = self._signers(BINS)
+        signature_cache = SignatureCache(self.signed_serializer)
+        # all the hash bins roles share the same expiration, the signature
+        # is cached for the same signed body
+        bins_expires = datetime.now().replace(microsecond=0) + timedelta(
+            days=self.settings[BINS].expiration
+        )
+        for bin_name in bin_names:
+            bins_hash_role = Metadata(Targets())
+            bins_hash_role.signed.expires = bins_expires
+            signature_cache.sign(bins_hash_role, signers)
 
-        if save:
-            role.to_file(f"metadata/{filename}", JSONSerializer())
+            yield bin_name, bins_hash_role
 
-    def _bump_expiry(role: Metadata, expiry_id: str) -> None:
+    def _bump_expiry(self, role: Metadata, expiry_id: str) -> None:
         """Bumps metadata expiration date by role-specific interval.
         The metadata role type is used as default expiry id. This is only
         allowed for top-level roles.
@@ -140,134 +477,172 @@ def initialize_metadata(
         # https://www.python.org/dev/peps/pep-0458/#producing-consistent-snapshots
         role.signed.expires = datetime.now().replace(
             microsecond=0
-        ) + timedelta(days=settings[expiry_id].expiration)
+        ) + timedelta(days=self.settings[expiry_id].expiration)
 
+    @staticmethod
     def _bump_version(role: Metadata) -> None:
         """Bumps metadata version by 1."""
         role.signed.version += 1
 
-    def _update_timestamp(snapshot_version: int):
+    def _update_timestamp(self, snapshot_version: int) -> Tuple[str, Metadata]:
         """Loads 'timestamp', updates meta info about passed 'snapshot'
         metadata, bumps version and expiration, signs and persists."""
-        timestamp = _load(Timestamp.type)
+        timestamp = self._load(Timestamp.type)
         timestamp.signed.snapshot_meta = MetaFile(version=snapshot_version)
 
-        _bump_version(timestamp)
-        _bump_expiry(timestamp, Timestamp.type)
-        _sign(timestamp, Timestamp.type)
-        _add_payload(timestamp, Timestamp.type)
+        self._bump_version(timestamp)
+        self._bump_expiry(timestamp, Timestamp.type)
+        self._sign(timestamp, Timestamp.type)
+
+        return self._add_payload(timestamp, Timestamp.type)
 
     def _update_snapshot(
-        targets_meta: List[Tuple[str, int]]
-    ) -> Metadata[Snapshot]:
+        self, targets_meta: List[Tuple[str, int]]
+    ) -> Tuple[str, Metadata[Snapshot]]:
         """Loads 'snapshot', updates meta info about passed 'targets'
         metadata, bumps version and expiration, signs and persists. Returns
-        new snapshot version, e.g. to update 'timestamp'."""
-        snapshot = _load(Snapshot.type)
+        new snapshot, e.g. to update 'timestamp'."""
+        snapshot = self._load(Snapshot.type)
 
         for name, version in targets_meta:
             snapshot.signed.meta[f"{name}.json"] = MetaFile(version=version)
 
-        _bump_expiry(snapshot, Snapshot.type)
-        _bump_version(snapshot)
-        _sign(snapshot, Snapshot.type)
-        _add_payload(snapshot, Snapshot.type)
-
-        return snapshot.signed.version
-
-    # Bootstrap default top-level metadata to be updated below if necessary
-    targets = Targets()
-    snapshot = Snapshot()
-    timestamp = Timestamp()
-    root = Root()
-
-    # Populate public key store, and define trusted signing keys and required
-    # signature thresholds for each top-level role in 'root'.
-    for role_name in TOP_LEVEL_ROLE_NAMES:
-        threshold = settings[role_name].threshold
-        signers = _signers(role_name)
-
-        # FIXME: Is this a meaningful check? Should we check more than just
-        # the threshold? And maybe in a different place, e.g. independently of
-        # bootstrapping the metadata, because in production we do not have
-        # access to all top-level role signing keys at the time of
-        # bootstrapping the metadata.
-        assert len(signers) >= threshold, (
-            f"not enough keys ({len(signers)}) for "
-            f"signing threshold '{threshold}'"
-        )
-
-        root.roles[role_name] = Role([], threshold)
-        for signer in signers:
-            root.add_key(
-                Key.from_securesystemslib_key(signer.key_dict), role_name
+        self._bump_expiry(snapshot, Snapshot.type)
+        self._bump_version(snapshot)
+        self._sign(snapshot, Snapshot.type)
+
+        return self._add_payload(snapshot, Snapshot.type)
+
+    def _generate(self) -> Iterator[Tuple[str, Metadata]]:
+        settings = self.settings
+
+        # Bootstrap default top-level metadata to be updated below if
+        # necessary
+        targets = Targets()
+        snapshot = Snapshot()
+        timestamp = Timestamp()
+        root = Root()
+
+        # Populate public key store, and define trusted signing keys and
+        # required signature thresholds for each top-level role in 'root'.
+        for role_name in TOP_LEVEL_ROLE_NAMES:
+            threshold = settings[role_name].threshold
+            signers = self._signers(role_name)
+
+            # FIXME: Is this a meaningful check? Should we check more than
+            # just the threshold? And maybe in a different place, e.g.
+            # independently of bootstrapping the metadata, because in
+            # production we do not have access to all top-level role signing
+            # keys at the time of bootstrapping the metadata.
+            assert len(signers) >= threshold, (
+                f"not enough keys ({len(signers)}) for "
+                f"signing threshold '{threshold}'"
             )
 
-    # Add signature wrapper, bump expiration, and sign and persist
-    for role in [targets, snapshot, timestamp, root]:
-        metadata = Metadata(role)
-        _bump_expiry(metadata, role.type)
-        _sign(metadata, role.type)
-        _add_payload(metadata, role.type)
-
-    # Track names and versions of new and updated targets for 'snapshot'
-    # update
-    targets_meta = []
-
-    # Update top-level 'targets' role, to delegate trust for all target files
-    # to 'bins' role, defining target path patterns, trusted signing keys and
-    # required signature thresholds.
-    targets = _load(Targets.type)
-    targets.signed.delegations = Delegations(keys={}, roles={})
-    targets.signed.delegations.roles[BIN] = DelegatedRole(
-        name=BIN,
-        keyids=[],
-        threshold=settings[BIN].threshold,
-        terminating=False,
-        paths=settings[Targets.type].paths,
-    )
-
-    for signer in _signers(BIN):
-        targets.signed.add_key(
-            Key.from_securesystemslib_key(signer.key_dict), BIN
+            root.roles[role_name] = Role([], threshold)
+            for key in self._keyring.keys(role_name):
+                root.add_key(key, role_name)
+
+        # Add signature wrapper, bump expiration, and sign and persist
+        for role in [targets, snapshot, timestamp, root]:
+            metadata = Metadata(role)
+            self._bump_expiry(metadata, role.type)
+            self._sign(metadata, role.type)
+            filename, metadata = self._add_payload(metadata, role.type)
+            # 'timestamp' is updated below with the same filename
+            if role.type != Timestamp.type:
+                yield filename, metadata
+
+        # Track names and versions of new and updated targets for 'snapshot'
+        # update
+        targets_meta = []
+
+        # Update top-level 'targets' role, to delegate trust for all target
+        # files to 'bins' role, defining target path patterns, trusted
+        # signing keys and required signature thresholds.
+        targets = self._load(Targets.type)
+        targets.signed.delegations = Delegations(keys={}, roles={})
+        targets.signed.delegations.roles[BIN] = DelegatedRole(
+            name=BIN,
+            keyids=[],
+            threshold=settings[BIN].threshold,
+            terminating=False,
+            paths=settings[Targets.type].paths,
         )
 
-    # Bump version and expiration, and sign and persist updated 'targets'.
-    _bump_version(targets)
-    _bump_expiry(targets, Targets.type)
-    _sign(targets, Targets.type)
-    _add_payload(targets, Targets.type)
-
-    targets_meta.append((Targets.type, targets.signed.version))
-
-    succinct_roles = SuccinctRoles(
-        [], 1, settings[BINS].number_hash_prefixes, BINS
-    )
-    # Create new 'bins' role and delegate trust from 'bins' for all target
-    # files to 'bin-n' roles based on file path hash prefixes, a.k.a hash bin
-    # delegation.
-    bin = Metadata(Targets())
-    bin.signed.delegations = Delegations(
-        keys={}, succinct_roles=succinct_roles
-    )
-    for delegated_name in succinct_roles.get_roles():
-        for signer in _signers(BINS):
-            bin.signed.add_key(
-                Key.from_securesystemslib_key(signer.key_dict), delegated_name
+        for key in self._keyring.keys(BIN):
+            targets.signed.add_key(key, BIN)
+
+        # Bump version and expiration, and sign and persist updated 'targets'.
+        self._bump_version(targets)
+        self._bump_expiry(targets, Targets.type)
+        self._sign(targets, Targets.type)
+        yield self._add_payload(targets, Targets.type)
+
+        targets_meta.append((Targets.type, targets.signed.version))
+
+        succinct_roles = SuccinctRoles(
+            [], 1, settings[BINS].number_hash_prefixes, BINS
+        )
+        # Create new 'bins' role and delegate trust from 'bins' for all
+        # target files to 'bin-n' roles based on file path hash prefixes,
+        # a.k.a hash bin delegation.
+        bin = Metadata(Targets())
+        bin.signed.delegations = Delegations(
+            keys={}, succinct_roles=succinct_roles
+        )
+        # The succinct roles share the keys, they are added once for all bins.
+        for key in self._keyring.keys(BINS):
+            bin.signed.add_key(key)
+
+        bin_names = list(succinct_roles.get_roles())
+        for delegated_name, bins_hash_role in self._hash_bins(bin_names):
+            yield self._add_payload(bins_hash_role, delegated_name, keep=False)
+            targets_meta.append(
+                (delegated_name, bins_hash_role.signed.version)
             )
-        bins_hash_role = Metadata(Targets())
-        _bump_expiry(bins_hash_role, BINS)
-        _sign(bins_hash_role, BINS)
-        _add_payload(bins_hash_role, delegated_name)
-        targets_meta.append((delegated_name, bins_hash_role.signed.version))
 
-    # Bump expiration, and sign and persist new 'bins' role.
-    _bump_expiry(bin, BIN)
-    _sign(bin, BIN)
-    _add_payload(bin, BIN)
+        # Bump expiration, and sign and persist new 'bins' role.
+        self._bump_expiry(bin, BIN)
+        self._sign(bin, BIN)
+        yield self._add_payload(bin, BIN)
 
-    targets_meta.append((BIN, bin.signed.version))
+        targets_meta.append((BIN, bin.signed.version))
 
-    _update_timestamp(_update_snapshot(targets_meta))
+        snapshot_filename, snapshot = self._update_snapshot(targets_meta)
+        yield snapshot_filename, snapshot
+        yield self._update_timestamp(snapshot.signed.version)
 
-    return repository_metadata
+
+def initialize_metadata(
+    settings: Dict[str, RoleSettingsInput],
+    save=True,
+    signed_serializer: Optional[SignedSerializer] = None,
+    metadata_dir: str = "metadata",
+) -> MetadataStore:
+    """
+    Creates development TUF top-level role metadata (root, targets, snapshot,
+    timestamp) with a new ``MetadataGenerator``.
+
+    With save, the files are written in ``metadata_dir``. Concurrent runs
+    must use different directories.
+    """
+    generator = MetadataGenerator(settings, signed_serializer, metadata_dir)
+    return generator.initialize(save=save)
+
+
+def generate_metadata(
+    settings: Dict[str, RoleSettingsInput],
+    save=True,
+    signed_serializer: Optional[SignedSerializer] = None,
+    metadata_dir: str = "metadata",
+) -> Iterator[Tuple[str, Metadata]]:
+    """
+    Generates the TUF metadata with a new ``MetadataGenerator``, yielding
+    every (filename, Metadata) as soon as it is final.
+
+    With save, the files are written in ``metadata_dir``. Concurrent runs
+    must use different directories.
+    """
+    generator = MetadataGenerator(settings, signed_serializer, metadata_dir)
+    yield from generator.generate(save=save)
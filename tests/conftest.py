@@ -11,6 +11,8 @@ import pytest  # type: ignore
 from click.testing import CliRunner  # type: ignore
 from dynaconf import Dynaconf
 
+from benchmarks.api_server import StandInAPIServer
+
 
 @pytest.fixture
 def test_context():
@@ -33,3 +35,18 @@ def fake_key():
         error: Optional[str] = None
 
     return FakeKey
+
+
+@pytest.fixture
+def stand_in_server():
+    """Starts local stand-in API servers, stopped at the test teardown."""
+    servers = []
+
+    def _start(**kwargs):
+        server = StandInAPIServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield _start
+    for server in servers:
+        server.stop()
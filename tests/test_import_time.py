@@ -0,0 +1,39 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import os
+
+import pytest
+
+from benchmarks import import_time
+
+# the wall-clock time depends on the machine, it is checked on demand
+CHECK_TIME = os.environ.get("RSTUF_IMPORT_TIME_BUDGET") == "1"
+
+
+@pytest.mark.parametrize("command", list(import_time.BUDGETS))
+def test_import_time_budget(command):
+    times = import_time.measure(command, repeat=3 if CHECK_TIME else 1)
+
+    assert "repository_service_tuf.cli" in times
+    assert import_time.check_budget(command, times, CHECK_TIME) == []
+
+
+def test_check_budget():
+    times = {
+        "repository_service_tuf.cli": 10.0,
+        "tuf": 300.0,
+        "tuf.api.metadata": 200.0,
+        "tufup": 1.0,
+    }
+
+    assert import_time.check_budget("--version", times) == [
+        "imports took 511.0 ms, budget 400 ms",
+        "imports tuf",
+        "imports tuf.api.metadata",
+    ]
+    assert import_time.check_budget("--version", times, False) == [
+        "imports tuf",
+        "imports tuf.api.metadata",
+    ]
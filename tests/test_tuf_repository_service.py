@@ -2,8 +2,12 @@
 #
 # SPDX-License-Identifier: MIT
 
+import pretend
+
+from repository_service_tuf import cli
 from repository_service_tuf.__version__ import version
-from repository_service_tuf.cli import rstuf
+from repository_service_tuf.cli import click, rstuf
+from repository_service_tuf.helpers import api_client
 
 
 class TestRSTUFCLI:
@@ -19,3 +23,68 @@ class TestRSTUFCLI:
 
         assert result.exit_code == 0
         assert result.output == f"rstuf, version {version}\n"
+
+    def test_token_cache(self, client, monkeypatch, tmp_path):
+        fake_configure_token_cache = pretend.call_recorder(lambda c: None)
+        monkeypatch.setattr(
+            api_client, "configure_token_cache", fake_configure_token_cache
+        )
+        config = str(tmp_path / "rstuf.ini")
+
+        result = client.invoke(rstuf, ["-c", config, "admin", "--help"])
+
+        assert result.exit_code == 0
+        (token_cache,) = fake_configure_token_cache.calls[0].args
+        assert token_cache.path == f"{config}.token-cache"
+
+    def test_no_token_cache(self, client, monkeypatch):
+        fake_configure_token_cache = pretend.call_recorder(lambda c: None)
+        monkeypatch.setattr(
+            api_client, "configure_token_cache", fake_configure_token_cache
+        )
+
+        result = client.invoke(rstuf, ["--no-token-cache", "admin", "--help"])
+
+        assert result.exit_code == 0
+        assert fake_configure_token_cache.calls == [pretend.call(None)]
+
+    def test_trace_http(self, client, monkeypatch, tmp_path):
+        fake_configure_tracer = pretend.call_recorder(lambda t: None)
+        monkeypatch.setattr(
+            api_client, "configure_tracer", fake_configure_tracer
+        )
+        trace_file = str(tmp_path / "trace.jsonl")
+
+        result = client.invoke(
+            rstuf, ["--trace-http", trace_file, "admin", "--help"]
+        )
+
+        assert result.exit_code == 0
+        (tracer,) = fake_configure_tracer.calls[0].args
+        assert tracer.path == trace_file
+        # disabled at exit
+        assert fake_configure_tracer.calls[1:] == [pretend.call(None)]
+
+    def test_lazy_group(self, client, monkeypatch):
+        @click.command()
+        def hello():
+            click.echo("hello")
+
+        fake_import_module = pretend.call_recorder(
+            lambda name: pretend.stub(hello=hello)
+        )
+        monkeypatch.setattr(cli.importlib, "import_module", fake_import_module)
+        group = cli.LazyGroup(
+            "test", lazy_commands={"hello": "fake.module:hello"}
+        )
+
+        assert group.list_commands(None) == ["hello"]
+        assert fake_import_module.calls == []
+
+        for _ in range(2):
+            result = client.invoke(group, ["hello"])
+            assert result.exit_code == 0
+            assert result.output == "hello\n"
+
+        assert fake_import_module.calls == [pretend.call("fake.module")]
+        assert group.commands == {"hello": hello}
@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import json
+
+import pretend
+
+from repository_service_tuf.cli.admin import bench
+
+
+class TestBenchGroupCLI:
+    def test_bench(self, client, test_context, stand_in_server, tmp_path):
+        server = stand_in_server()
+        task_id = server.new_task()
+        test_context["settings"].SERVER = server.url
+        test_context["settings"].TOKEN = "test-token"
+        output = tmp_path / "bench.json"
+
+        test_result = client.invoke(
+            bench.bench,
+            [
+                "-e",
+                "token-check",
+                "-e",
+                "token-new",
+                "-e",
+                "task",
+                "-n",
+                "30",
+                "-c",
+                "4",
+                "--task-id",
+                task_id,
+                "-o",
+                str(output),
+            ],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        results = json.loads(output.read_text())
+        assert results["server"] == server.url
+        assert results["concurrency"] == 4
+        assert results["total"]["requests"] == 30
+        assert results["total"]["errors"] == 0
+        assert results["total"]["statuses"] == {"200": 30}
+        assert results["total"]["throughput_rps"] > 0
+        latency = results["total"]["latency_ms"]
+        assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"]
+        assert latency["p99"] <= latency["max"]
+        for endpoint in bench.ENDPOINTS:
+            assert results["endpoints"][endpoint]["requests"] == 10
+
+        # the is_logged request and the load
+        paths = [r["path"] for r in server.requests]
+        assert len(paths) == 31
+        assert paths.count(f"/api/v1/task/?task_id={task_id}") == 10
+        assert paths.count("/api/v1/token/new/") == 10
+        new_token = [r for r in server.requests if r["method"] == "POST"]
+        assert json.loads(new_token[0]["body"]) == {
+            "scopes": ["read:bootstrap"],
+            "expires": 1,
+        }
+        assert "(concurrency 4," in test_result.output
+
+    def test_bench_duration_errors(
+        self, client, test_context, stand_in_server, monkeypatch
+    ):
+        server = stand_in_server(error_rate=1.0)
+        test_context["settings"].SERVER = server.url
+        test_context["settings"].TOKEN = "test-token"
+        monkeypatch.setattr(
+            bench, "is_logged", lambda *a: pretend.stub(state=True)
+        )
+
+        test_result = client.invoke(
+            bench.bench, ["-d", "0.2", "-c", "2"], obj=test_context
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        assert "503×" in test_result.output
+        stats, elapsed = bench.asyncio.run(
+            bench._run_bench(
+                server.url, "test-token", ("token-check",), 1, 2, duration=0.1
+            )
+        )
+        assert elapsed >= 0.1
+        assert stats["token-check"].errors == len(
+            stats["token-check"].latencies
+        )
+        assert stats["token-check"].statuses == {
+            "503": stats["token-check"].errors
+        }
+
+    def test_bench_failed_connection(self, stand_in_server):
+        server = stand_in_server()
+        url = server.url
+        server.stop()
+
+        stats, _ = bench.asyncio.run(
+            bench._run_bench(url, "test-token", ("task",), 3, 1)
+        )
+
+        assert stats["task"].errors == 3
+        assert stats["task"].statuses == {f"Failed to connect to {url}": 3}
+
+    def test_bench_not_logged(self, client, test_context, monkeypatch):
+        test_context["settings"].SERVER = "http://fake-server"
+        test_context["settings"].TOKEN = "test-token"
+        monkeypatch.setattr(
+            bench,
+            "is_logged",
+            pretend.call_recorder(lambda *a: pretend.stub(state=False)),
+        )
+
+        test_result = client.invoke(bench.bench, [], obj=test_context)
+
+        assert test_result.exit_code == 1
+        assert "Not logged" in test_result.output
+        assert bench.is_logged.calls == [
+            pretend.call("http://fake-server", "test-token")
+        ]
+
+    def test_bench_without_login(self, client, test_context):
+        test_result = client.invoke(bench.bench, [], obj=test_context)
+
+        assert test_result.exit_code == 1
+        assert "Not logged" in test_result.output
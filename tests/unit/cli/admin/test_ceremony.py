@@ -2,18 +2,81 @@
 #
 # SPDX-License-Identifier: MIT
 
+import json
+import os
+import threading
+import time
 from unittest.mock import MagicMock
 
 import pretend  # type: ignore
 import pytest
 from click import ClickException
+from rich.console import Console
+from securesystemslib.interface import (
+    generate_and_write_ed25519_keypair,
+    import_ed25519_privatekey_from_file,
+)
 from securesystemslib.keys import generate_ed25519_key
+from tuf.api.exceptions import UnsignedMetadataError
+from tuf.api.metadata import Metadata, Root
 
 from repository_service_tuf.cli.admin import ceremony
 from repository_service_tuf.cli.admin.ceremony import _key_is_duplicated
+from repository_service_tuf.helpers.key_agent import KeyAgentError
 from repository_service_tuf.helpers.tuf import KeyInput, RoleSettingsInput
 
 
+@pytest.fixture(scope="module")
+def spec_keys(tmp_path_factory):
+    """Key files of a ceremony spec, with the password 'pass-{name}'."""
+    keys_dir = tmp_path_factory.mktemp("spec-keys")
+    keys = {}
+    for name in [
+        "root1",
+        "root2",
+        "targets1",
+        "snapshot1",
+        "timestamp1",
+        "bin1",
+        "bins1",
+    ]:
+        filepath = str(keys_dir / f"{name}.key")
+        generate_and_write_ed25519_keypair(f"pass-{name}", filepath=filepath)
+        keys[name] = filepath
+
+    return keys
+
+
+def _spec(spec_keys, **roles):
+    role_keys = {
+        "root": ["root1", "root2"],
+        "targets": ["targets1"],
+        "snapshot": ["snapshot1"],
+        "timestamp": ["timestamp1"],
+        "bin": ["bin1"],
+        "bins": ["bins1"],
+    }
+    spec = {
+        "service": {"targets_base_url": "https://www.example.com/downloads"},
+        "roles": {
+            role: {
+                "keys": [
+                    {
+                        "path": spec_keys[name],
+                        "password": {"value": f"pass-{name}"},
+                    }
+                    for name in names
+                ]
+            }
+            for role, names in role_keys.items()
+        },
+    }
+    for role, role_spec in roles.items():
+        spec["roles"][role].update(role_spec)
+
+    return spec
+
+
 class TestCeremonyGroupCLI:
     def test__key_is_duplicated_different_key(self, fake_key):
         """
@@ -150,6 +213,246 @@ class TestCeremonyGroupCLI:
             )
         )
 
+    def test__load_key_cache(self, monkeypatch, tmp_path):
+        fake_import = pretend.call_recorder(lambda *a: {"k": "v"})
+        monkeypatch.setattr(
+            ceremony, "import_ed25519_privatekey_from_file", fake_import
+        )
+        monkeypatch.setattr(ceremony, "_key_cache", None)
+        key_file = tmp_path / "key"
+        key_file.write_text("encrypted key")
+        ceremony.configure_key_cache({})
+
+        for _ in range(2):
+            result = ceremony._load_key(str(key_file), "fake_pass")
+            assert result == ceremony.KeySchema(key={"k": "v"}, error=None)
+
+        # other password, decrypted again
+        ceremony._load_key(str(key_file), "other_pass")
+
+        assert fake_import.calls == [
+            pretend.call(str(key_file), "fake_pass"),
+            pretend.call(str(key_file), "other_pass"),
+        ]
+        assert "fake_pass" not in str(ceremony._key_cache)
+
+    def test__load_key_cache_disabled(self, monkeypatch, tmp_path):
+        fake_import = pretend.call_recorder(lambda *a: {"k": "v"})
+        monkeypatch.setattr(
+            ceremony, "import_ed25519_privatekey_from_file", fake_import
+        )
+        monkeypatch.setattr(ceremony, "_key_cache", None)
+        key_file = tmp_path / "key"
+        key_file.write_text("encrypted key")
+
+        ceremony._load_key(str(key_file), "fake_pass")
+        ceremony._load_key(str(key_file), "fake_pass")
+
+        assert len(fake_import.calls) == 2
+
+    def test__load_key_agent(self, monkeypatch):
+        fake_agent = pretend.stub(
+            add=pretend.call_recorder(lambda *a, **kw: {"keyid": "k1"})
+        )
+        monkeypatch.setattr(ceremony, "configured_agent", lambda: fake_agent)
+
+        result = ceremony._load_key("fake_file", "fake_pass")
+        ceremony._load_key("fake_file", "fake_pass", online=True)
+
+        assert result == ceremony.KeySchema(key={"keyid": "k1"}, error=None)
+        assert fake_agent.add.calls == [
+            pretend.call("fake_file", "fake_pass", export=False),
+            pretend.call("fake_file", "fake_pass", export=True),
+        ]
+
+    def test__load_key_agent_error(self, monkeypatch):
+        fake_agent = pretend.stub(
+            add=pretend.raiser(ceremony.KeyAgentError("Wrong password."))
+        )
+        monkeypatch.setattr(ceremony, "configured_agent", lambda: fake_agent)
+
+        result = ceremony._load_key("fake_file", "fake_pass")
+
+        assert result == ceremony.KeySchema(
+            key=None, error=":cross_mark: [red]Failed[/]: Wrong password."
+        )
+
+    def _fake_key_prompts(self, monkeypatch, paths, try_again=()):
+        """The operator enters the paths, and answers to 'Try again?'."""
+        paths = iter(paths)
+        try_again = iter(try_again)
+        prompted = []
+
+        def fake_ask(message, **kw):
+            prompted.append(message)
+            return next(paths)
+
+        monkeypatch.setattr(ceremony.prompt.Prompt, "ask", fake_ask)
+        monkeypatch.setattr(
+            ceremony.prompt.Confirm, "ask", lambda *a, **kw: next(try_again)
+        )
+        monkeypatch.setattr(
+            ceremony.click, "prompt", lambda *a, **kw: "strongPass"
+        )
+        return prompted
+
+    def test__configure_keys_prompts_while_verifying(
+        self, monkeypatch, fake_key
+    ):
+        payload = ceremony._new_payload_settings()
+        for role in payload.roles.values():
+            role.keys = {}
+        role = payload.roles["root"]
+        role.num_of_keys = 2
+        second_prompted = threading.Event()
+        prompted = self._fake_key_prompts(monkeypatch, ["key1", "key2"])
+        fake_ask = ceremony.prompt.Prompt.ask
+
+        def fake_ask_second(message, **kw):
+            if "2/2" in message:
+                second_prompted.set()
+
+            return fake_ask(message, **kw)
+
+        monkeypatch.setattr(ceremony.prompt.Prompt, "ask", fake_ask_second)
+
+        def fake__load_key(filepath, password, online=False):
+            # the first key is verified after the second key is entered
+            if filepath == "key1":
+                assert second_prompted.wait(timeout=5)
+
+            return fake_key(key=generate_ed25519_key())
+
+        monkeypatch.setattr(ceremony, "_load_key", fake__load_key)
+
+        ceremony._configure_keys("root", role, payload)
+
+        assert len(prompted) == 2
+        assert [k.filepath for k in role.keys.values()] == ["key1", "key2"]
+        assert list(role.keys) == ["root_1", "root_2"]
+
+    def test__configure_keys_failed_try_again(
+        self, monkeypatch, fake_key, capsys
+    ):
+        payload = ceremony._new_payload_settings()
+        for role in payload.roles.values():
+            role.keys = {}
+        role = payload.roles["root"]
+        role.num_of_keys = 2
+        verified = fake_key(key=generate_ed25519_key())
+        prompted = self._fake_key_prompts(
+            monkeypatch, ["bad", "key2", "key1"], try_again=[True]
+        )
+
+        def fake__load_key(filepath, password, online=False):
+            if filepath == "bad":
+                # fails after the second key is entered
+                while len(prompted) < 2:
+                    time.sleep(0.01)
+
+                return fake_key(error="Failed: Check the password.")
+
+            if filepath == "key1":
+                return verified
+
+            return fake_key(key=generate_ed25519_key())
+
+        monkeypatch.setattr(ceremony, "_load_key", fake__load_key)
+
+        ceremony._configure_keys("root", role, payload)
+
+        assert [m.split(" the")[0] for m in prompted] == [
+            "\nEnter 1/2",
+            "\nEnter 2/2",
+            "\nEnter 1/2",
+        ]
+        assert role.keys["root_1"].filepath == "key1"
+        assert role.keys["root_1"].key == verified
+        assert role.keys["root_2"].filepath == "key2"
+        output = capsys.readouterr().out
+        assert "root key 1/2 (bad):" in output
+        assert "Check the password." in output
+
+    def test__configure_keys_failed_try_again_order(
+        self, monkeypatch, fake_key
+    ):
+        payload = ceremony._new_payload_settings()
+        for role in payload.roles.values():
+            role.keys = {}
+        role = payload.roles["root"]
+        role.num_of_keys = 3
+        keys = {f"key{n}": generate_ed25519_key() for n in range(1, 4)}
+        prompted = self._fake_key_prompts(
+            monkeypatch, ["bad", "key2", "key3", "key1"], try_again=[True]
+        )
+
+        def fake__load_key(filepath, password, online=False):
+            if filepath == "bad":
+                # fails after the next keys are entered
+                while len(prompted) < 3:
+                    time.sleep(0.01)
+
+                return fake_key(error="Failed: Check the password.")
+
+            return fake_key(key=keys[filepath])
+
+        monkeypatch.setattr(ceremony, "_load_key", fake__load_key)
+
+        ceremony._configure_keys("root", role, payload)
+
+        # the first key, entered again, is verified last
+        assert list(role.keys) == ["root_1", "root_2", "root_3"]
+        assert [k.key.key["keyid"] for k in role.keys.values()] == [
+            keys[f"key{n}"]["keyid"] for n in range(1, 4)
+        ]
+
+    def test__configure_keys_failed_not_try_again(self, monkeypatch, fake_key):
+        payload = ceremony._new_payload_settings()
+        for role in payload.roles.values():
+            role.keys = {}
+        role = payload.roles["root"]
+        role.num_of_keys = 1
+        self._fake_key_prompts(monkeypatch, ["bad"], try_again=[False])
+        monkeypatch.setattr(
+            ceremony, "_load_key", lambda *a, **kw: fake_key(error="Failed")
+        )
+
+        with pytest.raises(ClickException) as err:
+            ceremony._configure_keys("root", role, payload)
+
+        assert "Required key not validated." in str(err.value)
+        assert role.keys == {}
+
+    def test__configure_keys_duplicated_across_roles(
+        self, monkeypatch, fake_key, capsys
+    ):
+        payload = ceremony._new_payload_settings()
+        for role in payload.roles.values():
+            role.keys = {}
+            role.num_of_keys = 1
+        # the targets key is the root key file, the operator enters another
+        self._fake_key_prompts(
+            monkeypatch, ["root", "root", "targets"], try_again=[]
+        )
+        monkeypatch.setattr(
+            ceremony,
+            "_load_key",
+            lambda *a, **kw: fake_key(key=generate_ed25519_key()),
+        )
+        root = payload.roles["root"]
+        targets = payload.roles["targets"]
+
+        with ceremony.ThreadPoolExecutor() as executor:
+            verifier = ceremony._KeyVerifier(payload, executor)
+            ceremony._configure_keys("root", root, payload, verifier)
+            ceremony._configure_keys("targets", targets, payload, verifier)
+            verifier.check(wait=True)
+
+        assert verifier.pending == []
+        assert root.keys["root_1"].filepath == "root"
+        assert targets.keys["targets_1"].filepath == "targets"
+        assert "targets key 1/1 (root)" in capsys.readouterr().out
+
     def test__bootstrap(self, monkeypatch):
         mocked_request_server = pretend.stub(
             status_code=202,
@@ -168,6 +471,32 @@ class TestCeremonyGroupCLI:
         assert result == "task_id_123"
         assert mocked_request_server.json.calls == [pretend.call()]
 
+    def test__bootstrap_stand_in_server(self, stand_in_server):
+        server = stand_in_server()
+        payload = {
+            "settings": {},
+            "metadata": {f"1.bins-{n}": {"signed": {}} for n in range(64)},
+        }
+
+        result = ceremony._bootstrap(server.url, {}, payload)
+
+        assert result in server.tasks
+        assert server.payloads == [payload]
+        assert "Content-Encoding" not in server.requests[0]["headers"]
+
+    def test__bootstrap_stand_in_server_compress(self, stand_in_server):
+        server = stand_in_server()
+        payload = {
+            "settings": {},
+            "metadata": {f"1.bins-{n}": {"signed": {}} for n in range(64)},
+        }
+
+        result = ceremony._bootstrap(server.url, {}, payload, compress=True)
+
+        assert result in server.tasks
+        assert server.payloads == [payload]
+        assert server.requests[0]["headers"]["Content-Encoding"] == "gzip"
+
     def test__bootstrap_not_202(self, monkeypatch):
         mocked_request_server = pretend.stub(
             status_code=200,
@@ -210,6 +539,7 @@ class TestCeremonyGroupCLI:
 
     def test__bootstrap_state(self, monkeypatch):
         fake_response_started = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -220,6 +550,7 @@ class TestCeremonyGroupCLI:
             ),
         )
         fake_response_success = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -246,6 +577,7 @@ class TestCeremonyGroupCLI:
 
     def test__bootstrap_state_without_bootstrap_true(self, monkeypatch):
         fake_response_started = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -256,6 +588,7 @@ class TestCeremonyGroupCLI:
             ),
         )
         fake_response_success = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -281,6 +614,7 @@ class TestCeremonyGroupCLI:
 
     def test__bootstrap_state_task_failure(self, monkeypatch):
         fake_response_started = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -292,6 +626,7 @@ class TestCeremonyGroupCLI:
             ),
         )
         fake_response_success = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -319,6 +654,7 @@ class TestCeremonyGroupCLI:
 
     def test__bootstrap_state_not_200(self, monkeypatch):
         fake_response_started = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(
                 lambda: {
@@ -330,6 +666,7 @@ class TestCeremonyGroupCLI:
             ),
         )
         fake_response_success = pretend.stub(
+            headers={},
             status_code=400,
             text="Bad request",
         )
@@ -347,6 +684,7 @@ class TestCeremonyGroupCLI:
 
     def test__bootstrap_state_bootstrap_no_data(self, monkeypatch):
         fake_response = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(lambda: {"data": {}}),
             text=str("{'data': {}}"),
@@ -364,6 +702,7 @@ class TestCeremonyGroupCLI:
 
     def test__bootstrap_state_bootstrap_no_state(self, monkeypatch):
         fake_response = pretend.stub(
+            headers={},
             status_code=200,
             json=pretend.call_recorder(lambda: {"data": {"state": None}}),
             text=str("{'data': {}}"),
@@ -379,6 +718,89 @@ class TestCeremonyGroupCLI:
         assert "No state in data received" in str(err)
         assert fake_response.json.calls == [pretend.call()]
 
+    def test__bootstrap_state_invalid_json(self, monkeypatch):
+        fake_response = pretend.stub(
+            headers={},
+            status_code=200,
+            json=pretend.raiser(ValueError("Expecting value")),
+            text="<html>Bad Gateway</html>",
+        )
+        monkeypatch.setattr(
+            ceremony, "request_server", lambda *a, **kw: fake_response
+        )
+
+        with pytest.raises(ClickException) as err:
+            ceremony._bootstrap_state("task_id_123", "http://fake-server", {})
+
+        assert "Invalid response <html>Bad Gateway</html>" in str(err)
+
+    def test__bootstrap_state_invalid_event(self, stand_in_server):
+        server = stand_in_server(sse=True)
+        task_id = server.new_task()
+        server.task_body = lambda task_id: "not json"
+
+        with pytest.raises(ClickException) as err:
+            ceremony._bootstrap_state(task_id, server.url, {}, timeout=5)
+
+        assert "Invalid response" in str(err)
+
+    def test__bootstrap_state_stand_in_server(self, stand_in_server):
+        server = stand_in_server(state_interval=0.05, long_poll=True)
+        task_id = server.new_task()
+
+        result = ceremony._bootstrap_state(task_id, server.url, {})
+
+        assert result is None
+        assert len(server.task_requests()) == 2
+
+    def test__bootstrap_state_timeout(self, stand_in_server):
+        server = stand_in_server(state_interval=60)
+        task_id = server.new_task()
+
+        with pytest.raises(ClickException) as err:
+            ceremony._bootstrap_state(task_id, server.url, {}, timeout=0.2)
+
+        assert f"Timeout waiting for the task {task_id}" in str(err)
+
+    def test__bootstrap_file_stand_in_server(self, stand_in_server, tmp_path):
+        server = stand_in_server()
+        payload = {
+            "settings": {},
+            "metadata": {f"1.bins-{n}": {"signed": {}} for n in range(64)},
+        }
+        file = tmp_path / "payload.json"
+        file.write_text(json.dumps(payload, indent=2))
+
+        result = ceremony._bootstrap_file(server.url, {}, str(file))
+
+        assert result in server.tasks
+        assert server.payloads == [payload]
+        headers = server.requests[0]["headers"]
+        assert "Content-Encoding" not in headers
+        assert headers["Content-Length"] == str(file.stat().st_size)
+
+    def test__bootstrap_file_compress_not_decoded(
+        self, stand_in_server, tmp_path
+    ):
+        # as the RSTUF API, the compressed body is read as is (400)
+        server = stand_in_server(accept_gzip=False, gzip_status=None)
+        payload = {
+            "settings": {},
+            "metadata": {f"1.bins-{n}": {"signed": {}} for n in range(64)},
+        }
+        file = tmp_path / "payload.json"
+        file.write_text(json.dumps(payload, indent=2))
+
+        result = ceremony._bootstrap_file(
+            server.url, {}, str(file), compress=True
+        )
+
+        assert result in server.tasks
+        assert server.payloads == [payload]
+        assert [
+            r["headers"].get("Content-Encoding") for r in server.requests
+        ] == ["gzip", None]
+
     def test_ceremony(self, client, test_context):
         test_result = client.invoke(ceremony.ceremony, obj=test_context)
         assert test_result.exit_code == 1
@@ -990,3 +1412,443 @@ class TestCeremonyGroupCLI:
 
         assert test_result.exit_code == 1
         assert "Unexpected error, queue connection" in test_result.output
+
+    def test_ceremony_with_flag_bootstrap_upload(
+        self, client, test_context, stand_in_server, tmp_path
+    ):
+        server = stand_in_server(state_interval=0.05)
+        payload = {"settings": {}, "metadata": {"root": {"signed": {}}}}
+        file = tmp_path / "payload.json"
+        file.write_text(json.dumps(payload, indent=2))
+        test_context["settings"].SERVER = server.url
+        test_context["settings"].TOKEN = "test-token"
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--bootstrap", "--upload", "--file", str(file)],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        assert "Ceremony done." in test_result.output
+        assert server.payloads == [payload]
+
+    @pytest.mark.parametrize(
+        "setting, args, encoding",
+        [
+            (None, [], None),
+            (None, ["--compress"], "gzip"),
+            (True, [], "gzip"),
+            (True, ["--no-compress"], None),
+        ],
+    )
+    def test_ceremony_with_flag_bootstrap_upload_compress(
+        self,
+        client,
+        test_context,
+        stand_in_server,
+        tmp_path,
+        setting,
+        args,
+        encoding,
+    ):
+        server = stand_in_server(state_interval=0.05)
+        payload = {
+            "settings": {},
+            "metadata": {f"1.bins-{n}": {"signed": {}} for n in range(64)},
+        }
+        file = tmp_path / "payload.json"
+        file.write_text(json.dumps(payload, indent=2))
+        test_context["settings"].SERVER = server.url
+        test_context["settings"].TOKEN = "test-token"
+        if setting is not None:
+            test_context["settings"].HTTP_COMPRESS = setting
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--bootstrap", "--upload", "--file", str(file), *args],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        assert server.payloads == [payload]
+        (bootstrap_request,) = [
+            r for r in server.requests if r["method"] == "POST"
+        ]
+        assert bootstrap_request["headers"].get("Content-Encoding") == (
+            encoding
+        )
+
+    def test_ceremony_with_flag_bootstrap_upload_invalid_payload(
+        self, client, test_context, monkeypatch, tmp_path
+    ):
+        file = tmp_path / "payload.json"
+        file.write_text('{"settings": {}}')
+        test_context["settings"].SERVER = "fake-server"
+        monkeypatch.setattr(ceremony, "_check_server", lambda s: {})
+        monkeypatch.setattr(
+            ceremony,
+            "request_server",
+            lambda *a, **kw: pretend.stub(
+                status_code=200, json=lambda: {"bootstrap": False}
+            ),
+        )
+        fake__bootstrap_file = pretend.call_recorder(lambda *a: None)
+        monkeypatch.setattr(ceremony, "_bootstrap_file", fake__bootstrap_file)
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--bootstrap", "--upload", "--file", str(file)],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 1
+        assert "Invalid payload file" in test_result.output
+        assert "missing metadata" in test_result.output
+        assert fake__bootstrap_file.calls == []
+
+    def test_ceremony_with_flag_bootstrap_upload_resumable(
+        self, client, test_context, stand_in_server, tmp_path
+    ):
+        server = stand_in_server(
+            state_interval=0.05, upload_faults={1: "drop"}
+        )
+        payload = {"settings": {}, "metadata": {"root": {"signed": {}}}}
+        file = tmp_path / "payload.json"
+        file.write_text(json.dumps(payload, indent=2))
+        test_context["settings"].SERVER = server.url
+        test_context["settings"].TOKEN = "test-token"
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--bootstrap", "--upload", "--resumable", "--file", str(file)],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        assert "Ceremony done." in test_result.output
+        assert server.payloads == [payload]
+        assert len(server.uploads) == 1
+        assert not (tmp_path / "payload.json.upload").exists()
+
+    def test_ceremony_with_flag_bootstrap_upload_resumable_not_supported(
+        self, client, test_context, stand_in_server, tmp_path
+    ):
+        server = stand_in_server(state_interval=0.05, resumable=False)
+        payload = {"settings": {}, "metadata": {"root": {"signed": {}}}}
+        file = tmp_path / "payload.json"
+        file.write_text(json.dumps(payload, indent=2))
+        test_context["settings"].SERVER = server.url
+        test_context["settings"].TOKEN = "test-token"
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--bootstrap", "--upload", "--resumable", "--file", str(file)],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        assert "Ceremony done." in test_result.output
+        assert server.payloads == [payload]
+        assert server.uploads == {}
+
+    def test_ceremony_with_flag_resumable_without_upload(
+        self, client, test_context
+    ):
+        test_result = client.invoke(
+            ceremony.ceremony, ["--bootstrap", "--resumable"], obj=test_context
+        )
+
+        assert test_result.exit_code == 1
+        assert "Requires '-u/--upload' option." in test_result.output
+
+    def test_ceremony_spec(
+        self, client, test_context, monkeypatch, spec_keys, tmp_path
+    ):
+        monkeypatch.setattr(
+            ceremony,
+            "import_ed25519_privatekey_from_file",
+            import_ed25519_privatekey_from_file,
+        )
+        monkeypatch.setenv("ROOT2_PASSWORD", "pass-root2")
+        (tmp_path / "targets1.pass").write_text("pass-targets1\n")
+        spec = _spec(
+            spec_keys,
+            root={"expiration": 30, "threshold": 2},
+            targets={"paths": ["*/*"]},
+            bins={"number_hash_prefixes": 4},
+        )
+        spec["roles"]["root"]["keys"][1]["password"] = {
+            "env": "ROOT2_PASSWORD"
+        }
+        spec["roles"]["targets"]["keys"][0]["password"] = {
+            "file": str(tmp_path / "targets1.pass")
+        }
+        spec_file = tmp_path / "spec.json"
+        spec_file.write_text(json.dumps(spec))
+        payload_file = tmp_path / "payload.json"
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--spec", str(spec_file), "-f", str(payload_file)],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        assert "Loading 7 keys from the spec" in test_result.output
+        payload = json.loads(payload_file.read_text())
+        settings = payload["settings"]
+        assert settings["service"] == {
+            "targets_base_url": "https://www.example.com/downloads/"
+        }
+        root = settings["roles"]["root"]
+        assert root["expiration"] == 30
+        assert root["threshold"] == 2
+        assert root["num_of_keys"] == 2
+        assert root["keys"] == {}
+        assert settings["roles"]["targets"]["paths"] == ["*/*"]
+        assert settings["roles"]["bins"]["number_hash_prefixes"] == 4
+        # the online keys are in the payload
+        (timestamp_key,) = settings["roles"]["timestamp"]["keys"].values()
+        assert timestamp_key["filepath"] == spec_keys["timestamp1"]
+        assert timestamp_key["key"]["key"]["keyval"]["private"]
+        assert {"1.root", "1.targets", "1.bin"} <= set(payload["metadata"])
+        assert len(payload["metadata"]["1.root"]["signatures"]) == 2
+
+    def test_ceremony_spec_jobs(
+        self, client, test_context, monkeypatch, spec_keys, tmp_path
+    ):
+        monkeypatch.setattr(
+            ceremony,
+            "import_ed25519_privatekey_from_file",
+            import_ed25519_privatekey_from_file,
+        )
+        load_keys = ceremony._load_keys
+        fake_load_keys = pretend.call_recorder(
+            lambda keys, max_workers: load_keys(keys, max_workers)
+        )
+        monkeypatch.setattr(ceremony, "_load_keys", fake_load_keys)
+        monkeypatch.setenv("ROOT2_PASSWORD", "pass-root2")
+        (tmp_path / "targets1.pass").write_text("pass-targets1\n")
+        spec = _spec(spec_keys)
+        spec["roles"]["root"]["keys"][1]["password"] = {
+            "env": "ROOT2_PASSWORD"
+        }
+        spec["roles"]["targets"]["keys"][0]["password"] = {
+            "file": str(tmp_path / "targets1.pass")
+        }
+        spec_file = tmp_path / "spec.json"
+        spec_file.write_text(json.dumps(spec))
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--spec", str(spec_file), "-f", str(tmp_path / "p.json"), "-j2"],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 0, test_result.output
+        ((_, max_workers),) = [call.args for call in fake_load_keys.calls]
+        assert max_workers == 2
+
+    def test_ceremony_spec_signing_error(
+        self, client, test_context, monkeypatch, spec_keys, tmp_path
+    ):
+        monkeypatch.setattr(
+            ceremony,
+            "import_ed25519_privatekey_from_file",
+            import_ed25519_privatekey_from_file,
+        )
+
+        def fake_generate_metadata(*args, **kwargs):
+            yield "1.root", Metadata(Root())
+            # i.e. the key agent was locked before signing
+            try:
+                raise KeyAgentError("Key abc not in the agent")
+            except KeyAgentError as err:
+                raise UnsignedMetadataError(
+                    "Problem signing the metadata"
+                ) from err
+
+        monkeypatch.setattr(
+            ceremony, "generate_metadata", fake_generate_metadata
+        )
+        monkeypatch.setenv("ROOT2_PASSWORD", "pass-root2")
+        (tmp_path / "targets1.pass").write_text("pass-targets1\n")
+        spec = _spec(spec_keys)
+        spec["roles"]["root"]["keys"][1]["password"] = {
+            "env": "ROOT2_PASSWORD"
+        }
+        spec["roles"]["targets"]["keys"][0]["password"] = {
+            "file": str(tmp_path / "targets1.pass")
+        }
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "spec.json").write_text(json.dumps(spec))
+        (tmp_path / "payload.json").write_text("old")
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--spec", "spec.json", "-f", "payload.json"],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 1, test_result.output
+        assert "Failed to sign the metadata: Key abc not in" in (
+            test_result.output
+        )
+        assert "check it is running" in test_result.output
+        assert (tmp_path / "payload.json").read_text() == "old"
+        assert sorted(os.listdir(tmp_path)) == [
+            "payload.json",
+            "spec.json",
+            "targets1.pass",
+        ]
+
+    @pytest.mark.parametrize(
+        "spec, error",
+        [
+            ({}, "missing 'roles'"),
+            ({"roles": {"other": {}}}, "unknown roles other"),
+            ({"roles": {}}, "missing 'service.targets_base_url'"),
+            (
+                {"service": {"targets_base_url": "http://x"}, "roles": {}},
+                "missing role root",
+            ),
+        ],
+    )
+    def test_ceremony_spec_invalid(
+        self, client, test_context, monkeypatch, tmp_path, spec, error
+    ):
+        # a short path, the error is not truncated
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "spec.json").write_text(json.dumps(spec))
+
+        test_result = client.invoke(
+            ceremony.ceremony, ["--spec", "spec.json"], obj=test_context
+        )
+
+        assert test_result.exit_code == 1
+        assert f"Invalid spec file spec.json: {error}" in test_result.output
+
+    @pytest.mark.parametrize(
+        "role_spec, error",
+        [
+            ({"threshold": 3}, "threshold of root must be from 1 to"),
+            ({"keys": []}, "missing keys of root"),
+            ({"keys": [{"password": {"value": "x"}}]}, "missing key path"),
+            (
+                {"keys": [{"path": "k", "password": "x"}]},
+                "root key k password must be one of",
+            ),
+            (
+                {"keys": [{"path": "k", "password": {"env": "NOT_SET"}}]},
+                "root key k environment variable NOT_SET is not set",
+            ),
+            (
+                {"keys": [{"path": "k", "password": {"file": "missing"}}]},
+                "root key k cannot read missing",
+            ),
+        ],
+    )
+    def test__read_spec_invalid(
+        self, monkeypatch, spec_keys, tmp_path, role_spec, error
+    ):
+        monkeypatch.delenv("NOT_SET", raising=False)
+        spec_file = tmp_path / "spec.json"
+        spec_file.write_text(json.dumps(_spec(spec_keys, root=role_spec)))
+
+        with pytest.raises(ValueError) as err:
+            ceremony._read_spec(
+                str(spec_file), ceremony._new_payload_settings()
+            )
+
+        assert error in str(err.value)
+
+    def test_ceremony_spec_key_errors(
+        self, client, test_context, monkeypatch, spec_keys, tmp_path
+    ):
+        monkeypatch.setattr(
+            ceremony,
+            "import_ed25519_privatekey_from_file",
+            import_ed25519_privatekey_from_file,
+        )
+        spec = _spec(spec_keys)
+        spec["roles"]["root"]["keys"][1]["password"] = {"value": "wrong"}
+        # the same key in two roles
+        spec["roles"]["bins"]["keys"] = spec["roles"]["snapshot"]["keys"]
+        spec_file = tmp_path / "spec.json"
+        spec_file.write_text(json.dumps(spec))
+        # the key errors with the long key paths are not wrapped
+        monkeypatch.setattr(ceremony, "console", Console(width=400))
+
+        test_result = client.invoke(
+            ceremony.ceremony, ["--spec", str(spec_file)], obj=test_context
+        )
+
+        assert test_result.exit_code == 1
+        output = test_result.output
+        assert f"root key {spec_keys['root2']}" in output
+        assert "Check the password." in output
+        assert "Key is duplicated." in output
+        assert "Required key not validated." in output
+
+    def test_ceremony_spec_with_upload(self, client, test_context, tmp_path):
+        spec_file = tmp_path / "spec.json"
+        spec_file.write_text("{}")
+
+        test_result = client.invoke(
+            ceremony.ceremony,
+            ["--bootstrap", "--upload", "--spec", str(spec_file)],
+            obj=test_context,
+        )
+
+        assert test_result.exit_code == 1
+        assert "doesn't work with '-u/--upload'" in test_result.output
+
+    def test__load_keys_cache(self, monkeypatch, spec_keys):
+        monkeypatch.setattr(
+            ceremony,
+            "import_ed25519_privatekey_from_file",
+            import_ed25519_privatekey_from_file,
+        )
+        monkeypatch.delenv("RSTUF_KEY_AGENT_SOCK", raising=False)
+        monkeypatch.setattr(ceremony, "_key_cache", None)
+        ceremony.configure_key_cache({})
+        keys = [
+            (spec_keys["root1"], "pass-root1", False),
+            (spec_keys["root2"], "pass-root2", False),
+        ]
+
+        loaded = ceremony._load_keys(keys, max_workers=2)
+
+        # the keys decrypted by the workers are in the cache
+        assert len(ceremony._key_cache) == 2
+        monkeypatch.setattr(
+            ceremony,
+            "ProcessPoolExecutor",
+            pretend.raiser(AssertionError("decrypted again")),
+        )
+        cached = ceremony._load_keys(
+            [*keys, (spec_keys["bin1"], "pass-bin1", True)], max_workers=2
+        )
+        assert cached[:2] == loaded
+        assert cached[2].key["keyval"]["private"]
+        assert len(ceremony._key_cache) == 3
+
+    def test__load_keys_one_worker(self, monkeypatch):
+        fake__load_key = pretend.call_recorder(
+            lambda *a: ceremony.KeySchema(key={"keyid": a[0]})
+        )
+        monkeypatch.setattr(ceremony, "_load_key", fake__load_key)
+
+        result = ceremony._load_keys(
+            [("k1", "p1", False), ("k2", "p2", True)], max_workers=1
+        )
+
+        assert result == [
+            ceremony.KeySchema(key={"keyid": "k1"}),
+            ceremony.KeySchema(key={"keyid": "k2"}),
+        ]
+        assert fake__load_key.calls == [
+            pretend.call("k1", "p1", False),
+            pretend.call("k2", "p2", True),
+        ]
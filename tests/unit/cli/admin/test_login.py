@@ -7,6 +7,12 @@ import pytest
 
 from repository_service_tuf.cli.admin import login
 
+# the tests below replace them in the module
+LOGIN_ATTRIBUTES = {
+    name: getattr(login, name)
+    for name in ("_login", "loaders", "request_server", "is_logged")
+}
+
 
 class TestLoginGroupCLI:
     def test__login(self):
@@ -375,3 +381,28 @@ class TestLoginGroupCLI:
                 test_context["config"], test_context["settings"].to_dict()
             )
         ]
+
+    def test_login_stand_in_server(
+        self, client, test_context, monkeypatch, stand_in_server, tmp_path
+    ):
+        for name, value in LOGIN_ATTRIBUTES.items():
+            monkeypatch.setattr(login, name, value)
+        test_context["config"] = str(tmp_path / "rstuf.ini")
+        server = stand_in_server()
+        args = ["-s", server.url, "-u", "admin", "-e", "1"]
+
+        test_result = client.invoke(
+            login.login, args + ["-p", "wrong"], obj=test_context
+        )
+
+        assert test_result.exit_code == 1
+        assert "Incorrect username or password" in test_result.output
+
+        test_result = client.invoke(
+            login.login, args + ["-p", "secret"], obj=test_context
+        )
+
+        assert test_result.exit_code == 0
+        assert "Login successful." in test_result.output
+        assert test_context["settings"].SERVER == server.url
+        assert len(test_context["settings"].TOKEN) == 32
@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+
+import pretend
+import pytest
+from securesystemslib.interface import generate_and_write_ed25519_keypair
+
+from repository_service_tuf.cli import key_agent
+from repository_service_tuf.helpers.key_agent import KeyAgent
+
+PASSWORD = "strongPass"
+
+
+@pytest.fixture
+def agent():
+    # the Unix socket paths are limited to ~100 characters
+    directory = tempfile.mkdtemp()
+    agent = KeyAgent(
+        os.path.join(directory, "agent.sock"), poll_interval=0.01
+    ).start()
+    yield agent
+    agent.stop()
+    shutil.rmtree(directory)
+
+
+class TestKeyAgentCLI:
+    def test_add_list_lock(self, client, agent, tmp_path):
+        key_file = str(tmp_path / "key")
+        generate_and_write_ed25519_keypair(PASSWORD, filepath=key_file)
+        socket_option = ["-s", agent.socket_path]
+
+        result = client.invoke(
+            key_agent.add, [*socket_option, key_file], input=f"{PASSWORD}\n"
+        )
+
+        assert result.exit_code == 0, result.output
+        (keyid,) = agent._keys
+        assert f"Key {keyid} added." in result.output
+
+        result = client.invoke(key_agent.list_keys, socket_option)
+
+        assert result.exit_code == 0
+        assert keyid[:8] in result.output
+
+        result = client.invoke(key_agent.lock, socket_option)
+
+        assert result.exit_code == 0
+        assert "Key agent locked" in result.output
+        assert agent._keys == {}
+
+    def test_add_wrong_password(self, client, agent, tmp_path):
+        key_file = str(tmp_path / "key")
+        generate_and_write_ed25519_keypair(PASSWORD, filepath=key_file)
+
+        result = client.invoke(
+            key_agent.add,
+            ["-s", agent.socket_path, key_file],
+            input="wrong\n",
+        )
+
+        assert result.exit_code == 1
+        assert "Check the password." in result.output
+
+    def test_not_running(self, client, monkeypatch, tmp_path):
+        monkeypatch.setenv(
+            key_agent.KEY_AGENT_SOCK_ENV, str(tmp_path / "missing.sock")
+        )
+
+        for command in (key_agent.list_keys, key_agent.lock):
+            result = client.invoke(command, [])
+
+            assert result.exit_code == 1
+            assert "Failed to connect to the key agent" in result.output
+
+    def test_start(self, client, monkeypatch, tmp_path):
+        socket_path = str(tmp_path / "agent.sock")
+        fake_agent = pretend.stub(
+            start=lambda: fake_agent,
+            wait=pretend.raiser(KeyboardInterrupt()),
+            stop=pretend.call_recorder(lambda: None),
+        )
+        fake_key_agent = pretend.call_recorder(lambda *a, **kw: fake_agent)
+        monkeypatch.setattr(key_agent, "KeyAgent", fake_key_agent)
+        monkeypatch.setattr(key_agent.signal, "signal", lambda *a: None)
+
+        result = client.invoke(
+            key_agent.start, ["-s", socket_path, "--ttl", "60"]
+        )
+
+        assert result.exit_code == 0, result.output
+        assert (
+            f"RSTUF_KEY_AGENT_SOCK={socket_path}; export RSTUF_KEY_AGENT_SOCK"
+        ) in result.output
+        assert "Key agent stopped." in result.output
+        assert fake_key_agent.calls == [pretend.call(socket_path, ttl=60)]
+        assert fake_agent.stop.calls == [pretend.call()]
+
+    def test_start_already_running(self, client, agent):
+        result = client.invoke(key_agent.start, ["-s", agent.socket_path])
+
+        assert result.exit_code == 1
+        assert "Key agent already running" in result.output
+
+    def test_start_stale_socket(self, client, monkeypatch, tmp_path):
+        socket_path = tmp_path / "agent.sock"
+        socket_path.write_text("")
+        fake_agent = pretend.stub(
+            start=lambda: fake_agent,
+            wait=lambda: None,
+            stop=lambda: None,
+        )
+        monkeypatch.setattr(key_agent, "KeyAgent", lambda *a, **kw: fake_agent)
+        monkeypatch.setattr(key_agent.signal, "signal", lambda *a: None)
+
+        result = client.invoke(key_agent.start, ["-s", str(socket_path)])
+
+        assert result.exit_code == 0, result.output
+        assert not socket_path.exists()
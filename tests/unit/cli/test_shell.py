@@ -0,0 +1,140 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import pretend
+from dynaconf import loaders
+
+from repository_service_tuf.cli import rstuf, shell
+from repository_service_tuf.cli.admin import ceremony
+from repository_service_tuf.helpers import api_client
+
+
+class TestShell:
+    def test_shell(self, client, monkeypatch, stand_in_server, tmp_path):
+        server = stand_in_server()
+        config = str(tmp_path / "rstuf.ini")
+        loaders.write(config, {"SERVER": server.url, "TOKEN": "test-token"})
+        fake_configure_session = pretend.call_recorder(
+            api_client.configure_session
+        )
+        monkeypatch.setattr(
+            api_client, "configure_session", fake_configure_session
+        )
+        commands = [
+            "",
+            "rstuf admin token inspect fake-token",
+            "admin token inspect fake-token",
+            "admin token inspect 'unterminated",
+            "admin token unknown",
+            "help admin",
+            "shell",
+            "exit",
+            "admin token inspect not-run",
+        ]
+
+        result = client.invoke(
+            rstuf, ["-c", config, "shell"], input="\n".join(commands)
+        )
+
+        assert result.exit_code == 0, result.output
+        assert '"expired": false' in result.output
+        assert "Invalid command: No closing quotation" in result.output
+        assert "No such command 'unknown'" in result.output
+        assert "Administrative Commands" in result.output
+        assert "Already in the shell." in result.output
+        # the settings and the HTTP session of the shell are reused
+        assert len(fake_configure_session.calls) == 1
+        # the logged token is checked once, then it is in the token cache
+        paths = [r["path"] for r in server.requests]
+        assert paths == [
+            "/api/v1/token/?token=test-token",
+            "/api/v1/token/?token=fake-token",
+            "/api/v1/token/?token=fake-token",
+        ]
+
+    def test_shell_no_token_cache(self, client, stand_in_server, tmp_path):
+        server = stand_in_server()
+        config = str(tmp_path / "rstuf.ini")
+        loaders.write(config, {"SERVER": server.url, "TOKEN": "test-token"})
+        commands = [
+            "admin token inspect fake-token",
+            "admin token inspect fake-token",
+            "exit",
+        ]
+
+        result = client.invoke(
+            rstuf,
+            ["-c", config, "--no-token-cache", "shell"],
+            input="\n".join(commands),
+        )
+
+        assert result.exit_code == 0, result.output
+        # every command checks the tokens with the server
+        paths = [r["path"] for r in server.requests]
+        assert paths == [
+            "/api/v1/token/?token=test-token",
+            "/api/v1/token/?token=fake-token",
+            "/api/v1/token/?token=test-token",
+            "/api/v1/token/?token=fake-token",
+        ]
+        assert not (tmp_path / "rstuf.ini.token-cache").exists()
+
+    def test_shell_end_of_input(self, client, tmp_path):
+        config = str(tmp_path / "rstuf.ini")
+
+        result = client.invoke(rstuf, ["-c", config, "shell"], input="")
+
+        assert result.exit_code == 0
+        assert "Repository Service for TUF shell." in result.output
+
+    def test_shell_keep_keys(self, client, monkeypatch, tmp_path):
+        config = str(tmp_path / "rstuf.ini")
+        key_caches = []
+        monkeypatch.setattr(ceremony, "configure_key_cache", key_caches.append)
+
+        result = client.invoke(
+            rstuf, ["-c", config, "shell", "--keep-keys"], input="exit\n"
+        )
+
+        assert result.exit_code == 0
+        assert key_caches == [{}, None]
+
+    def test__run_command_abort(self, monkeypatch):
+        monkeypatch.setattr(
+            shell.rstuf, "main", pretend.raiser(shell.click.Abort())
+        )
+        fake_print = pretend.call_recorder(lambda *a: None)
+        monkeypatch.setattr(shell.console, "print", fake_print)
+
+        shell._run_command(["admin"], {"config": "rstuf.ini"})
+
+        assert fake_print.calls == [pretend.call("Aborted!")]
+
+    def test__run_command_rstuf_options(self, monkeypatch):
+        fake_main = pretend.call_recorder(lambda *a, **kw: None)
+        monkeypatch.setattr(shell.rstuf, "main", fake_main)
+        fake_print = pretend.call_recorder(lambda *a: None)
+        monkeypatch.setattr(shell.console, "print", fake_print)
+        obj = {"config": "rstuf.ini"}
+
+        shell._run_command(["-c", "other.ini", "admin"], obj)
+        shell._run_command(["rstuf", "--config=other.ini", "admin"], obj)
+        shell._run_command(["--no-token-cache", "admin"], obj)
+        shell._run_command(["--help"], obj)
+
+        assert fake_print.calls == [
+            pretend.call(
+                f"The option '{option}' can't be changed in the shell, "
+                "start a new shell with it."
+            )
+            for option in ("-c", "--config=other.ini", "--no-token-cache")
+        ]
+        assert fake_main.calls == [
+            pretend.call(
+                ["-c", "rstuf.ini", "--help"],
+                prog_name="rstuf",
+                standalone_mode=False,
+                obj=obj,
+            )
+        ]
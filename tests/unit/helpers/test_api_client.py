@@ -2,10 +2,62 @@
 #
 # SPDX-License-Identifier: MIT
 
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
 import pretend
 import pytest
+import requests
+from dynaconf import Dynaconf
+
+from repository_service_tuf.cli import click
+from repository_service_tuf.helpers import api_client
+from repository_service_tuf.helpers.api_client import (
+    ChunkedUpload,
+    Login,
+    Methods,
+    SessionSettings,
+    TaskResponse,
+    TaskWaiter,
+    TokenCache,
+    UploadStats,
+    configure_session,
+    configure_token_cache,
+    get_session,
+    is_logged,
+    request_server,
+    upload_payload,
+    upload_payload_file,
+)
+
+
+@pytest.fixture(autouse=True)
+def default_session():
+    configure_session(SessionSettings())
+    configure_token_cache(None)
+    api_client._identity_servers.clear()
+    yield
+    configure_session(SessionSettings())
+    configure_token_cache(None)
+    api_client._identity_servers.clear()
+
+
+def _expiration(**delta):
+    return (datetime.now(timezone.utc) + timedelta(**delta)).isoformat()
+
 
-from repository_service_tuf.helpers.api_client import Methods, request_server
+@pytest.fixture
+def token_server(monkeypatch):
+    data = {"expired": False, "expiration": _expiration(hours=1)}
+    fake_response = pretend.stub(status_code=200, json=lambda: {"data": data})
+    fake_request_server = pretend.call_recorder(lambda *a, **kw: fake_response)
+    monkeypatch.setattr(api_client, "request_server", fake_request_server)
+
+    return pretend.stub(
+        request_server=fake_request_server, response=fake_response, data=data
+    )
 
 
 class TestAPICLient:
@@ -15,18 +67,21 @@ class TestAPICLient:
             status_code=200,
             json=pretend.call_recorder(lambda: {"key": "value"}),
         )
-        fake_requests = pretend.stub(
+        fake_session = pretend.stub(
             get=pretend.call_recorder(lambda *a, **kw: fake_response)
         )
-        monkeypatch.setattr(
-            "repository_service_tuf.helpers.api_client.requests", fake_requests
-        )
+        monkeypatch.setattr(api_client, "get_session", lambda: fake_session)
 
         request_server("http://server", "url", Methods.get)
 
-        assert fake_requests.get.calls == [
+        assert fake_session.get.calls == [
             pretend.call(
-                "http://server/url", json=None, data=None, headers=None
+                "http://server/url",
+                json=None,
+                data=None,
+                headers=None,
+                timeout=(5.0, 30.0),
+                stream=False,
             )
         ]
 
@@ -35,18 +90,21 @@ class TestAPICLient:
             status_code=200,
             json=pretend.call_recorder(lambda: {"key": "value"}),
         )
-        fake_requests = pretend.stub(
+        fake_session = pretend.stub(
             post=pretend.call_recorder(lambda *a, **kw: fake_response)
         )
-        monkeypatch.setattr(
-            "repository_service_tuf.helpers.api_client.requests", fake_requests
-        )
+        monkeypatch.setattr(api_client, "get_session", lambda: fake_session)
 
         request_server("http://server", "url", Methods.post, {"k": "v"})
 
-        assert fake_requests.post.calls == [
+        assert fake_session.post.calls == [
             pretend.call(
-                "http://server/url", json={"k": "v"}, data=None, headers=None
+                "http://server/url",
+                json={"k": "v"},
+                data=None,
+                headers=None,
+                timeout=(5.0, 30.0),
+                stream=False,
             )
         ]
 
@@ -56,3 +114,881 @@ class TestAPICLient:
             request_server("http://server", "url", "Invalid", {"k": "v"})
 
         assert "Internal Error. Invalid HTTP/S Method." in str(err.value)
+
+    def test_request_server_connection_error(self, monkeypatch):
+        def _raise(*a, **kw):
+            raise requests.exceptions.ConnectionError()
+
+        fake_session = pretend.stub(get=_raise)
+        monkeypatch.setattr(api_client, "get_session", lambda: fake_session)
+
+        with pytest.raises(click.ClickException) as err:
+            request_server("http://server", "url", Methods.get)
+
+        assert "Failed to connect to http://server" in str(err.value)
+
+    def test_request_server_timeout(self, monkeypatch):
+        def _raise(*a, **kw):
+            raise requests.exceptions.ReadTimeout()
+
+        fake_session = pretend.stub(get=_raise)
+        monkeypatch.setattr(api_client, "get_session", lambda: fake_session)
+
+        with pytest.raises(click.ClickException) as err:
+            request_server("http://server", "url", Methods.get)
+
+        assert "Timeout connecting to http://server" in str(err.value)
+
+    def test_get_session(self):
+        session = get_session()
+
+        assert get_session() is session
+        adapter = session.get_adapter("https://server")
+        assert adapter._pool_maxsize == 10
+        assert adapter.max_retries.total == 3
+        assert adapter.max_retries.backoff_factor == 0.5
+        assert adapter.max_retries.status_forcelist == (502, 503, 504)
+        assert "GET" in adapter.max_retries.allowed_methods
+        assert "POST" not in adapter.max_retries.allowed_methods
+
+    def test_configure_session(self):
+        session = get_session()
+        session.close = pretend.call_recorder(lambda: None)
+
+        configure_session(SessionSettings(retries=0, pool_maxsize=2))
+        new_session = get_session()
+
+        assert session.close.calls == [pretend.call()]
+        assert new_session is not session
+        adapter = new_session.get_adapter("http://server")
+        assert adapter._pool_maxsize == 2
+        assert adapter.max_retries.total == 0
+
+    def test_session_settings_from_settings(self, tmp_path):
+        config = tmp_path / "test_settings.ini"
+        config.write_text(
+            "HTTP_CONNECT_TIMEOUT = 1\n"
+            "HTTP_READ_TIMEOUT = 2.5\n"
+            "HTTP_RETRIES = 5\n"
+        )
+
+        result = SessionSettings.from_settings(
+            Dynaconf(settings_files=[str(config)])
+        )
+
+        assert result == SessionSettings(
+            connect_timeout=1.0, read_timeout=2.5, retries=5
+        )
+        assert result.timeout == (1.0, 2.5)
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [("true", True), ("1", True), ("false", False), ("off", False)],
+    )
+    def test_session_settings_compress(self, tmp_path, value, expected):
+        config = tmp_path / "test_settings.ini"
+        config.write_text(f"HTTP_COMPRESS = '{value}'\n")
+
+        result = SessionSettings.from_settings(
+            Dynaconf(settings_files=[str(config)])
+        )
+
+        assert result.compress is expected
+        assert SessionSettings().compress is False
+
+    def test_is_logged(self, token_server):
+        result = is_logged("http://server", "token")
+
+        assert result == Login(state=True, data=token_server.data)
+        assert token_server.request_server.calls == [
+            pretend.call(
+                "http://server",
+                "api/v1/token/?token=token",
+                Methods.get,
+                headers={"Authorization": "Bearer token"},
+            )
+        ]
+
+    def test_is_logged_token_cache(self, token_server, tmp_path):
+        configure_token_cache(TokenCache(str(tmp_path / "cache")))
+
+        first = is_logged("http://server", "token")
+        second = is_logged("http://server", "token")
+        other = is_logged("http://other-server", "token")
+
+        assert first == second == other
+        assert len(token_server.request_server.calls) == 2
+        assert "token" not in (tmp_path / "cache").read_text()
+
+    def test_is_logged_token_cache_unauthorized(self, token_server, tmp_path):
+        cache = TokenCache(str(tmp_path / "cache"))
+        configure_token_cache(cache)
+        token_server.response.status_code = 401
+
+        assert is_logged("http://server", "token") == Login(state=False)
+        assert is_logged("http://server", "token") == Login(state=False)
+        assert cache.get("http://server", "token") is None
+        assert len(token_server.request_server.calls) == 2
+
+    def test_token_cache(self, tmp_path):
+        cache = TokenCache(str(tmp_path / "cache"))
+        data = {"expired": False, "expiration": _expiration(hours=1)}
+
+        assert cache.get("http://server", "token") is None
+        cache.set("http://server", "token", data)
+
+        assert cache.get("http://server", "token") == data
+        assert cache.get("http://server", "other") is None
+        assert (
+            TokenCache(str(tmp_path / "cache")).get("http://server", "token")
+            == data
+        )
+
+        cache.invalidate("http://server", "token")
+        assert cache.get("http://server", "token") is None
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"expired": False},
+            {"expired": False, "expiration": "invalid"},
+            {"expired": False, "expiration": None},
+            {"expired": False, "expiration": _expiration(seconds=30)},
+            {"expired": False, "expiration": _expiration(hours=-1)},
+        ],
+    )
+    def test_token_cache_not_cached(self, tmp_path, data):
+        cache = TokenCache(str(tmp_path / "cache"))
+
+        cache.set("http://server", "token", data)
+
+        assert cache.get("http://server", "token") is None
+
+    def test_token_cache_naive_expiration_is_utc(self, tmp_path):
+        cache = TokenCache(str(tmp_path / "cache"), max_age=86400)
+        expiration = datetime.utcnow() + timedelta(hours=2)
+
+        cache.set(
+            "http://server",
+            "token",
+            {"expired": False, "expiration": expiration.isoformat()},
+        )
+
+        entry = json.loads((tmp_path / "cache").read_text())
+        (valid_until,) = [e["valid_until"] for e in entry.values()]
+        assert valid_until == pytest.approx(
+            expiration.replace(tzinfo=timezone.utc).timestamp() - 60
+        )
+
+    def test_token_cache_max_age(self, tmp_path, monkeypatch):
+        cache = TokenCache(str(tmp_path / "cache"), max_age=10)
+        data = {"expired": False, "expiration": _expiration(hours=1)}
+        cache.set("http://server", "token", data)
+        now = time.time()
+
+        monkeypatch.setattr(api_client.time, "time", lambda: now + 9)
+        assert cache.get("http://server", "token") == data
+        monkeypatch.setattr(api_client.time, "time", lambda: now + 11)
+        assert cache.get("http://server", "token") is None
+
+    def test_token_cache_invalid_file(self, tmp_path):
+        (tmp_path / "cache").write_text("[invalid")
+        cache = TokenCache(str(tmp_path / "cache"))
+        data = {"expired": False, "expiration": _expiration(hours=1)}
+
+        assert cache.get("http://server", "token") is None
+        cache.set("http://server", "token", data)
+        assert cache.get("http://server", "token") == data
+
+    def test_token_cache_unwritable(self, tmp_path):
+        cache = TokenCache(str(tmp_path / "missing" / "cache"))
+        data = {"expired": False, "expiration": _expiration(hours=1)}
+
+        cache.set("http://server", "token", data)
+
+        assert cache.get("http://server", "token") is None
+
+
+def _post_task(server):
+    response = request_server(
+        server.url, "api/v1/bootstrap/", Methods.post, {}
+    )
+    return response.json()["data"]["task_id"]
+
+
+def _wait_states(waiter, task_id):
+    states = []
+    for task_response in waiter.wait(task_id):
+        assert task_response.status_code == 200
+        states.append(task_response.state)
+        if task_response.state == "SUCCESS":
+            break
+
+    return states
+
+
+class TestTaskWaiter:
+    def test_wait_poll(self, stand_in_server):
+        server = stand_in_server(state_interval=0.1)
+        task_id = _post_task(server)
+        sleep = pretend.call_recorder(time.sleep)
+        waiter = TaskWaiter(server.url, initial_delay=0.02, sleep=sleep)
+
+        start = time.monotonic()
+        states = _wait_states(waiter, task_id)
+        elapsed = time.monotonic() - start
+
+        assert states[0] == "PENDING"
+        assert states[-1] == "SUCCESS"
+        assert "STARTED" in states
+        # finished shortly after the task, not after a fixed poll interval
+        assert elapsed < 0.2 + 0.15
+        assert len(server.task_requests()) == len(states)
+        assert len(sleep.calls) == len(states) - 1
+        headers = server.task_requests()[0]["headers"]
+        assert headers["Prefer"] == "wait=20"
+        assert "text/event-stream" in headers["Accept"]
+
+    def test_wait_long_poll(self, stand_in_server):
+        server = stand_in_server(state_interval=0.1, long_poll=True)
+        task_id = _post_task(server)
+        sleep = pretend.call_recorder(lambda delay: None)
+        waiter = TaskWaiter(server.url, sleep=sleep)
+
+        states = _wait_states(waiter, task_id)
+
+        # every response waits for the next state
+        assert states == ["STARTED", "SUCCESS"]
+        assert len(server.task_requests()) == 2
+        assert sleep.calls == []
+
+    @pytest.mark.parametrize(
+        "read_timeout, prefer",
+        [(30, "wait=20"), (10, "wait=9"), (5.5, "wait=4"), (1, None)],
+    )
+    def test_wait_long_poll_read_timeout(self, read_timeout, prefer):
+        fake_request = pretend.call_recorder(
+            lambda *a, **kw: pretend.stub(
+                status_code=200,
+                headers={},
+                json=lambda: {"data": {"state": "SUCCESS"}},
+            )
+        )
+        configure_session(SessionSettings(read_timeout=read_timeout))
+        waiter = TaskWaiter("http://server", request=fake_request)
+
+        next(waiter.wait("123"))
+
+        headers = fake_request.calls[0].kwargs["headers"]
+        assert headers.get("Prefer") == prefer
+        waiter = TaskWaiter(
+            "http://server", read_timeout=3, request=fake_request
+        )
+        next(waiter.wait("123"))
+        assert fake_request.calls[1].kwargs["headers"]["Prefer"] == "wait=2"
+
+    def test_wait_server_sent_events(self, stand_in_server):
+        server = stand_in_server(state_interval=0.05, sse=True)
+        task_id = _post_task(server)
+        sleep = pretend.call_recorder(lambda delay: None)
+        waiter = TaskWaiter(server.url, sleep=sleep)
+
+        states = _wait_states(waiter, task_id)
+
+        assert states == ["PENDING", "STARTED", "SUCCESS"]
+        assert len(server.task_requests()) == 1
+        assert sleep.calls == []
+
+    def test_wait_retry_after(self, stand_in_server):
+        server = stand_in_server(
+            state_interval=0.01,
+            retry_after=0.05,
+            busy_responses=1,
+        )
+        task_id = _post_task(server)
+        sleep = pretend.call_recorder(time.sleep)
+        waiter = TaskWaiter(server.url, initial_delay=1, sleep=sleep)
+
+        states = _wait_states(waiter, task_id)
+
+        assert states[-1] == "SUCCESS"
+        # the busy response (429) is retried by the session
+        assert len(server.task_requests()) == len(states) + 1
+        assert len(sleep.calls) == len(states) - 1
+        for call in sleep.calls:
+            assert call.args[0] == pytest.approx(0.05, abs=0.01)
+
+    def test_wait_timeout(self, stand_in_server):
+        server = stand_in_server(state_interval=60)
+        task_id = _post_task(server)
+        waiter = TaskWaiter(server.url, timeout=0.3, initial_delay=0.05)
+
+        start = time.monotonic()
+        with pytest.raises(click.ClickException) as err:
+            _wait_states(waiter, task_id)
+
+        assert time.monotonic() - start < 0.6
+        assert f"Timeout waiting for the task {task_id}" in str(err.value)
+
+    def test_wait_timeout_long_poll(self, stand_in_server):
+        server = stand_in_server(state_interval=60, long_poll=True)
+        task_id = _post_task(server)
+        waiter = TaskWaiter(server.url, timeout=1.5)
+
+        start = time.monotonic()
+        with pytest.raises(click.ClickException):
+            _wait_states(waiter, task_id)
+
+        assert time.monotonic() - start < 2
+        requests = server.task_requests()
+        assert requests[0]["headers"]["Prefer"] == "wait=1"
+        assert "Prefer" not in requests[-1]["headers"]
+
+    def test_wait_not_200(self, stand_in_server):
+        server = stand_in_server()
+        waiter = TaskWaiter(server.url)
+
+        task_response = next(waiter.wait("invalid"))
+
+        assert task_response.status_code == 404
+        assert task_response.body is None
+        assert "Task not found" in task_response.text
+
+    def test_wait_backoff(self, monkeypatch):
+        responses = [
+            {"data": {"state": state}}
+            for state in ["PENDING"] * 5 + ["STARTED"] * 2
+        ]
+        fake_request = pretend.call_recorder(
+            lambda *a, **kw: pretend.stub(
+                status_code=200,
+                headers={},
+                json=lambda body=responses.pop(0): body,
+            )
+        )
+        sleep = pretend.call_recorder(lambda delay: None)
+        monkeypatch.setattr(api_client.random, "uniform", lambda a, b: a)
+        waiter = TaskWaiter(
+            "http://server",
+            initial_delay=1,
+            max_delay=3,
+            multiplier=2,
+            jitter=0.5,
+            request=fake_request,
+            sleep=sleep,
+        )
+
+        states = []
+        for task_response in waiter.wait("123"):
+            states.append(task_response.state)
+            if len(states) == 7:
+                break
+
+        assert states == ["PENDING"] * 5 + ["STARTED"] * 2
+        # delay * (1 - jitter), reset when the state changes
+        assert [c.args[0] for c in sleep.calls] == [
+            0.5,
+            1.0,
+            1.5,
+            1.5,
+            1.5,
+            0.5,
+        ]
+
+    def test_wait_busy(self):
+        busy_response = pretend.stub(
+            status_code=503,
+            headers={"Retry-After": "2"},
+            close=pretend.call_recorder(lambda: None),
+        )
+        success_response = pretend.stub(
+            status_code=200,
+            headers={},
+            json=lambda: {"data": {"state": "SUCCESS"}},
+        )
+        responses = [busy_response, success_response]
+        fake_request = pretend.call_recorder(lambda *a, **kw: responses.pop(0))
+        sleep = pretend.call_recorder(lambda delay: None)
+        waiter = TaskWaiter("http://server", request=fake_request, sleep=sleep)
+
+        task_response = next(waiter.wait("123"))
+
+        assert task_response.state == "SUCCESS"
+        assert busy_response.close.calls == [pretend.call()]
+        assert sleep.calls == [pretend.call(2.0)]
+        assert fake_request.calls[0] == pretend.call(
+            "http://server",
+            "api/v1/task/?task_id=123",
+            Methods.get,
+            headers={
+                "Accept": "text/event-stream, application/json",
+                "Prefer": "wait=20",
+            },
+            stream=True,
+        )
+
+    def test_task_response(self):
+        response = TaskResponse(200, {"data": {"state": "STARTED"}}, "text")
+
+        assert response.state == "STARTED"
+        assert response.text == "text"
+        assert TaskResponse(200, {"data": None}).state is None
+        assert TaskResponse(500).text == ""
+
+
+def _bootstrap_body():
+    payload = {
+        "settings": {"service": {"targets_base_url": "http://server/"}},
+        "metadata": {
+            f"1.bins-{n:x}": {"signed": {"_type": "targets", "version": 1}}
+            for n in range(256)
+        },
+    }
+    return payload, json.dumps(payload).encode()
+
+
+class TestUploadPayload:
+    def test_upload_payload_gzip(self, stand_in_server):
+        server = stand_in_server()
+        payload, body = _bootstrap_body()
+
+        response, stats = upload_payload(
+            server.url,
+            "api/v1/bootstrap/",
+            body,
+            headers={"k": "v"},
+            compress=True,
+        )
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert stats.content_encoding == "gzip"
+        assert stats.payload_bytes == len(body)
+        assert stats.sent_bytes < len(body) / 10
+        assert stats.saved_bytes == len(body) - stats.sent_bytes
+        headers = server.requests[0]["headers"]
+        assert headers["Content-Encoding"] == "gzip"
+        assert headers["Content-Type"] == "application/json"
+        assert headers["k"] == "v"
+        assert int(headers["Content-Length"]) == stats.sent_bytes
+
+    @pytest.mark.parametrize("gzip_status", [415, 422, None])
+    def test_upload_payload_gzip_rejected(self, stand_in_server, gzip_status):
+        # None: the body isn't decoded, as the RSTUF API (400)
+        server = stand_in_server(accept_gzip=False, gzip_status=gzip_status)
+        payload, body = _bootstrap_body()
+
+        response, stats = upload_payload(
+            server.url, "api/v1/bootstrap/", body, compress=True
+        )
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert stats == UploadStats(len(body), len(body), "identity")
+        assert [
+            r["headers"].get("Content-Encoding") for r in server.requests
+        ] == [
+            "gzip",
+            None,
+        ]
+
+        # the next uploads to the server are not compressed
+        upload_payload(server.url, "api/v1/bootstrap/", body, compress=True)
+        assert len(server.requests) == 3
+        assert "Content-Encoding" not in server.requests[2]["headers"]
+
+    def test_upload_payload_no_compress(self, stand_in_server):
+        server = stand_in_server()
+        payload, body = _bootstrap_body()
+
+        _, stats = upload_payload(server.url, "api/v1/bootstrap/", body)
+
+        assert server.payloads == [payload]
+        assert stats.saved_bytes == 0
+        assert "Content-Encoding" not in server.requests[0]["headers"]
+
+    def test_upload_payload_not_compressible(self, stand_in_server):
+        server = stand_in_server()
+
+        _, stats = upload_payload(
+            server.url, "api/v1/bootstrap/", b"{}", compress=True
+        )
+
+        assert server.payloads == [{}]
+        assert stats == UploadStats(2, 2, "identity")
+
+
+class TestUploadPayloadFile:
+    def test_upload_payload_file_gzip(self, stand_in_server, tmp_path):
+        server = stand_in_server()
+        payload, body = _bootstrap_body()
+        path = tmp_path / "payload.json"
+        path.write_bytes(body)
+
+        response, stats = upload_payload_file(
+            server.url,
+            "api/v1/bootstrap/",
+            str(path),
+            headers={"k": "v"},
+            compress=True,
+            chunk_size=1024,
+        )
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert stats.content_encoding == "gzip"
+        assert stats.payload_bytes == len(body)
+        assert stats.sent_bytes < len(body) / 10
+        headers = server.requests[0]["headers"]
+        assert headers["Content-Encoding"] == "gzip"
+        assert headers["Content-Type"] == "application/json"
+        assert headers["Transfer-Encoding"] == "chunked"
+        assert headers["k"] == "v"
+        assert len(server.requests[0]["body"]) == stats.sent_bytes
+
+    @pytest.mark.parametrize("gzip_status", [415, 422, None])
+    def test_upload_payload_file_gzip_rejected(
+        self, stand_in_server, tmp_path, gzip_status
+    ):
+        server = stand_in_server(accept_gzip=False, gzip_status=gzip_status)
+        payload, body = _bootstrap_body()
+        path = tmp_path / "payload.json"
+        path.write_bytes(body)
+
+        response, stats = upload_payload_file(
+            server.url, "api/v1/bootstrap/", str(path), compress=True
+        )
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert stats == UploadStats(len(body), len(body), "identity")
+        assert "Content-Encoding" not in server.requests[1]["headers"]
+        assert api_client._identity_servers == {server.url}
+
+    def test_upload_payload_file_no_compress(self, stand_in_server, tmp_path):
+        server = stand_in_server()
+        payload, body = _bootstrap_body()
+        path = tmp_path / "payload.json"
+        path.write_bytes(body)
+
+        _, stats = upload_payload_file(
+            server.url, "api/v1/bootstrap/", str(path)
+        )
+
+        assert server.payloads == [payload]
+        assert stats == UploadStats(len(body), len(body), "identity")
+        headers = server.requests[0]["headers"]
+        assert "Content-Encoding" not in headers
+        assert headers["Content-Length"] == str(len(body))
+
+
+def _chunk_offsets(server):
+    return [
+        int(r["headers"]["Upload-Offset"])
+        for r in server.requests
+        if "Upload-Offset" in r["headers"]
+    ]
+
+
+class TestChunkedUpload:
+    def _uploader(self, server, tmp_path, body, **kwargs):
+        path = tmp_path / "payload.json"
+        path.write_bytes(body)
+        sleep = pretend.call_recorder(lambda s: None)
+        kwargs.setdefault("state_path", str(tmp_path / "payload.json.upload"))
+        uploader = ChunkedUpload(
+            server.url, str(path), chunk_size=2048, sleep=sleep, **kwargs
+        )
+        return uploader, sleep
+
+    def test_upload(self, stand_in_server, tmp_path):
+        server = stand_in_server()
+        payload, body = _bootstrap_body()
+        uploader, sleep = self._uploader(
+            server, tmp_path, body, headers={"k": "v"}
+        )
+
+        response, stats = uploader.upload()
+
+        assert response.status_code == 202
+        assert response.json()["data"]["task_id"] in server.tasks
+        assert server.payloads == [payload]
+        assert stats == UploadStats(len(body), len(body))
+        assert _chunk_offsets(server) == list(range(0, len(body), 2048))
+        assert all(r["headers"]["k"] == "v" for r in server.requests)
+        assert sleep.calls == []
+        assert not (tmp_path / "payload.json.upload").exists()
+
+    def test_upload_faults(self, stand_in_server, tmp_path):
+        server = stand_in_server(
+            upload_faults={2: "drop", 3: "lost", 5: "error", 6: "corrupt"}
+        )
+        payload, body = _bootstrap_body()
+        uploader, sleep = self._uploader(server, tmp_path, body)
+
+        response, stats = uploader.upload()
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        # the lost chunk is acknowledged by the offset and not sent again
+        assert _chunk_offsets(server) == [
+            0,
+            2048,
+            2048,
+            4096,
+            6144,
+            6144,
+            6144,
+        ] + list(range(8192, len(body), 2048))
+        assert stats.sent_bytes == len(body) + 3 * 2048
+        # the failures in a row are reset by an acknowledged chunk
+        assert sleep.calls == [
+            pretend.call(0.5),
+            pretend.call(1.0),
+            pretend.call(0.5),
+            pretend.call(1.0),
+        ]
+
+    def test_upload_retries_exhausted(self, stand_in_server, tmp_path):
+        server = stand_in_server(
+            upload_faults={n: "error" for n in range(2, 10)}
+        )
+        _, body = _bootstrap_body()
+        uploader, sleep = self._uploader(server, tmp_path, body, retries=2)
+
+        with pytest.raises(click.ClickException) as err:
+            uploader.upload()
+
+        assert "Upload failed after 2 retries: Error 503" in str(err)
+        assert len(sleep.calls) == 2
+        assert server.payloads == []
+        assert (tmp_path / "payload.json.upload").exists()
+
+    def test_upload_resumed(self, stand_in_server, tmp_path):
+        server = stand_in_server(upload_faults={4: "drop"})
+        payload, body = _bootstrap_body()
+        uploader, _ = self._uploader(server, tmp_path, body, retries=0)
+        with pytest.raises(click.ClickException):
+            uploader.upload()
+
+        uploader, _ = self._uploader(server, tmp_path, body)
+        response, stats = uploader.upload()
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert len(server.uploads) == 1
+        assert _chunk_offsets(server)[3:5] == [6144, 6144]
+        assert stats.sent_bytes == len(body) - 6144
+
+    def test_upload_state_other_payload(self, stand_in_server, tmp_path):
+        server = stand_in_server(upload_faults={2: "drop"})
+        payload, body = _bootstrap_body()
+        uploader, _ = self._uploader(server, tmp_path, b"{}" * 2048)
+        with pytest.raises(click.ClickException):
+            ChunkedUpload(
+                server.url,
+                uploader.path,
+                chunk_size=2048,
+                retries=0,
+                state_path=uploader.state_path,
+            ).upload()
+
+        uploader, _ = self._uploader(server, tmp_path, body)
+        uploader.upload()
+
+        assert server.payloads == [payload]
+        assert len(server.uploads) == 2
+
+    def test_upload_not_found(self, stand_in_server, tmp_path):
+        server = stand_in_server()
+        payload, body = _bootstrap_body()
+        state_path = tmp_path / "payload.json.upload"
+        state_path.write_text(
+            json.dumps(
+                {
+                    "upload_id": "unknown",
+                    "upload": {
+                        "server": server.url,
+                        "size": len(body),
+                        "sha256": hashlib.sha256(body).hexdigest(),
+                    },
+                }
+            )
+        )
+        uploader, _ = self._uploader(server, tmp_path, body)
+
+        response, _ = uploader.upload()
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert server.requests[0]["path"] == "/api/v1/bootstrap/upload/unknown"
+
+    def test_upload_complete_lost(self, stand_in_server, tmp_path):
+        server = stand_in_server(complete_fault="lost")
+        payload, body = _bootstrap_body()
+        uploader, sleep = self._uploader(server, tmp_path, body)
+
+        response, _ = uploader.upload()
+
+        assert response.status_code == 202
+        assert response.json()["data"]["task_id"] in server.tasks
+        # completed again with the same upload, bootstrapped once
+        assert server.payloads == [payload]
+        assert len(server.uploads) == 1
+        assert len(server.tasks) == 1
+        assert sleep.calls == [pretend.call(0.5)]
+        assert not (tmp_path / "payload.json.upload").exists()
+
+    def test_upload_complete_lost_resumed(self, stand_in_server, tmp_path):
+        server = stand_in_server(complete_fault="lost")
+        payload, body = _bootstrap_body()
+        uploader, _ = self._uploader(server, tmp_path, body, retries=0)
+        with pytest.raises(click.ClickException):
+            uploader.upload()
+
+        state = json.loads((tmp_path / "payload.json.upload").read_text())
+        assert state["completing"] is True
+
+        uploader, _ = self._uploader(server, tmp_path, body)
+        response, stats = uploader.upload()
+
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert len(server.uploads) == 1
+        assert stats.sent_bytes == 0
+
+    def test_upload_complete_lost_forgotten(self, stand_in_server, tmp_path):
+        server = stand_in_server(complete_fault="forget")
+        payload, body = _bootstrap_body()
+        uploader, _ = self._uploader(server, tmp_path, body)
+
+        with pytest.raises(click.ClickException) as err:
+            uploader.upload()
+
+        assert "was completed but the response was lost" in str(err)
+        # not created again, it would bootstrap twice
+        assert server.payloads == [payload]
+        assert server.uploads == {}
+        assert (tmp_path / "payload.json.upload").exists()
+
+    def test_upload_not_supported(self, stand_in_server, tmp_path):
+        server = stand_in_server(resumable=False)
+        payload, body = _bootstrap_body()
+        uploader, sleep = self._uploader(server, tmp_path, body)
+
+        response, stats = uploader.upload()
+
+        # posted at once
+        assert response.status_code == 202
+        assert server.payloads == [payload]
+        assert stats == UploadStats(len(body), len(body))
+        assert server.requests[-1]["path"] == "/api/v1/bootstrap/"
+        assert sleep.calls == []
+        assert not (tmp_path / "payload.json.upload").exists()
+
+    @staticmethod
+    def _fake_request(responses):
+        """Answers the requests with the responses, by method and path."""
+
+        def request(server, url, method, **kwargs):
+            key = (method.value, url.rstrip("/").rsplit("/", 1)[-1])
+            request.calls.append(key)
+            status_code, body = responses[key]
+            try:
+                data = json.loads(body)
+                json_ = pretend.call_recorder(lambda: data)
+            except ValueError:
+                json_ = pretend.raiser(ValueError("not JSON"))
+
+            return pretend.stub(status_code=status_code, json=json_, text=body)
+
+        request.calls = []
+        return request
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            "<html>Bad Gateway</html>",
+            '["upload"]',
+            '{"data": {"offset": 0}}',
+            '{"data": {"upload_id": 1, "offset": 0}}',
+        ],
+    )
+    def test_upload_invalid_create_response(self, tmp_path, body):
+        _, payload_body = _bootstrap_body()
+        request = self._fake_request(
+            {
+                ("post", "upload"): (201, body),
+                ("post", "bootstrap"): (202, '{"data": {"task_id": "t"}}'),
+            }
+        )
+        uploader, _ = self._uploader(
+            pretend.stub(url="http://server"),
+            tmp_path,
+            payload_body,
+            request=request,
+        )
+
+        response, _ = uploader.upload()
+
+        # not an upload, posted at once
+        assert response.status_code == 202
+        assert request.calls == [
+            ("post", "upload"),
+            ("post", "bootstrap"),
+        ]
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            "<html>Bad Gateway</html>",
+            '{"detail": "no data"}',
+            '{"data": {}}',
+            '{"data": {"offset": "2048"}}',
+        ],
+    )
+    def test_upload_invalid_chunk_response(self, tmp_path, body):
+        _, payload_body = _bootstrap_body()
+        request = self._fake_request(
+            {
+                ("post", "upload"): (
+                    201,
+                    '{"data": {"upload_id": "u1", "offset": 0}}',
+                ),
+                ("post", "u1"): (200, body),
+            }
+        )
+        uploader, sleep = self._uploader(
+            pretend.stub(url="http://server"),
+            tmp_path,
+            payload_body,
+            request=request,
+        )
+
+        with pytest.raises(click.ClickException) as err:
+            uploader.upload()
+
+        assert f"Invalid response 200 {body}" in str(err.value)
+        assert request.calls == [("post", "upload"), ("post", "u1")]
+        assert sleep.calls == []
+
+    def test_upload_invalid_offset_response(self, tmp_path):
+        payload, payload_body = _bootstrap_body()
+        request = self._fake_request(
+            {("get", "u1"): (200, "<html>Login</html>")}
+        )
+        uploader, _ = self._uploader(
+            pretend.stub(url="http://server"),
+            tmp_path,
+            payload_body,
+            request=request,
+        )
+        uploader._save_state(
+            "u1", len(payload_body), hashlib.sha256(payload_body).hexdigest()
+        )
+
+        with pytest.raises(click.ClickException) as err:
+            uploader.upload()
+
+        assert "Invalid response 200 <html>Login</html>" in str(err.value)
+        assert request.calls == [("get", "u1")]
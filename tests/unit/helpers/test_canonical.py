@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+from datetime import datetime
+
+import pytest
+from securesystemslib.exceptions import FormatError
+from securesystemslib.keys import generate_ed25519_key
+from tuf.api.metadata import (
+    DelegatedRole,
+    Delegations,
+    Key,
+    MetaFile,
+    Role,
+    Root,
+    Snapshot,
+    SuccinctRoles,
+    TargetFile,
+    Targets,
+    Timestamp,
+)
+from tuf.api.serialization import SerializationError
+
+from repository_service_tuf.helpers import canonical
+from repository_service_tuf.helpers.canonical import (
+    CanonicalSerializer,
+    encode_canonical_json,
+    encode_canonical_orjson,
+    encode_canonical_reference,
+)
+
+EXPIRES = datetime(2030, 1, 1, 10, 30)
+
+
+@pytest.fixture(params=["json", "orjson"])
+def encoder(request):
+    if request.param == "orjson":
+        if canonical.orjson is None:
+            pytest.skip("orjson is not installed")
+
+        return encode_canonical_orjson
+
+    return encode_canonical_json
+
+
+def _key():
+    return Key.from_securesystemslib_key(generate_ed25519_key())
+
+
+def _root():
+    root = Root(expires=EXPIRES, consistent_snapshot=True)
+    for role_name in ["root", "targets", "snapshot", "timestamp"]:
+        root.roles[role_name] = Role([], 1)
+        root.add_key(_key(), role_name)
+
+    return root
+
+
+def _targets():
+    targets = Targets(version=2, expires=EXPIRES)
+    targets.targets["dir/file ü.tar.gz"] = TargetFile(
+        1024,
+        {"sha256": "ab" * 32, "sha512": "cd" * 64},
+        "dir/file ü.tar.gz",
+        unrecognized_fields={"custom": {"list": [1, None, True, False]}},
+    )
+    targets.delegations = Delegations(keys={}, roles={})
+    targets.delegations.roles["bin"] = DelegatedRole(
+        "bin", [], 2, False, paths=["*", "*/*"]
+    )
+    targets.add_key(_key(), "bin")
+
+    return targets
+
+
+def _bin():
+    bin = Targets(expires=EXPIRES)
+    bin.delegations = Delegations(
+        keys={}, succinct_roles=SuccinctRoles([], 1, 8, "bins")
+    )
+    bin.add_key(_key())
+
+    return bin
+
+
+def _snapshot():
+    snapshot = Snapshot(version=3, expires=EXPIRES)
+    snapshot.meta["bins-0.json"] = MetaFile(version=1)
+    snapshot.meta["bin.json"] = MetaFile(
+        version=2, length=10, hashes={"sha256": "ef" * 32}
+    )
+
+    return snapshot
+
+
+def _timestamp():
+    return Timestamp(
+        version=4, expires=EXPIRES, snapshot_meta=MetaFile(version=3)
+    )
+
+
+class TestCanonicalHelper:
+    @pytest.mark.parametrize(
+        "signed", [_root(), _targets(), _bin(), _snapshot(), _timestamp()]
+    )
+    def test_conformance_roles(self, encoder, signed):
+        assert CanonicalSerializer(encoder).serialize(
+            signed
+        ) == CanonicalSerializer(encode_canonical_reference).serialize(signed)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {},
+            [],
+            {"b": 1, "a": [2, 3], "c": {"e": None, "d": True}},
+            {"unicode": "ü ñ 中文 \u2028 \x7f"},
+            {"quote": 'say "hi"'},
+            {"backslash": "C:\\dir"},
+            {"control": "line\nbreak\ttab"},
+            {"ab": 1, "a": 2, "B": 3, "": 4, "é": 5},
+            {"numbers": [0, -1, 10**20]},
+            {"string": "1.5e10"},
+        ],
+    )
+    def test_conformance_data(self, encoder, data):
+        assert encoder(data) == encode_canonical_reference(data)
+
+    @pytest.mark.parametrize("data", [{"float": 1.5}, [1e20], {"a": [0.0]}])
+    def test_float(self, encoder, data):
+        with pytest.raises(FormatError):
+            encoder(data)
+
+    def test_canonical_serializer_error(self):
+        targets = Targets(expires=EXPIRES, unrecognized_fields={"f": 1.5})
+
+        with pytest.raises(SerializationError):
+            CanonicalSerializer().serialize(targets)
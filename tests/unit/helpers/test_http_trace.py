@@ -0,0 +1,160 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import io
+import json
+
+import pytest
+from rich.console import Console
+
+from repository_service_tuf.cli import click
+from repository_service_tuf.helpers import http_trace
+from repository_service_tuf.helpers.api_client import (
+    Methods,
+    SessionSettings,
+    configure_session,
+    configure_tracer,
+    request_server,
+    upload_payload_file,
+)
+from repository_service_tuf.helpers.http_trace import (
+    HTTPTracer,
+    RequestTrace,
+    current_trace,
+)
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = HTTPTracer(str(tmp_path / "trace.jsonl"))
+    configure_tracer(tracer)
+    yield tracer
+    configure_tracer(None)
+    configure_session(SessionSettings())
+    tracer.close()
+
+
+def _lines(tracer):
+    tracer.close()
+    with open(tracer.path) as trace_file:
+        return [json.loads(line) for line in trace_file]
+
+
+class TestHTTPTracer:
+    def test_request_server(self, tracer, stand_in_server):
+        server = stand_in_server()
+
+        for _ in range(2):
+            response = request_server(
+                server.url, "api/v1/bootstrap/", Methods.get
+            )
+
+        first, second = _lines(tracer)
+        assert first["method"] == "GET"
+        assert first["url"] == f"{server.url}/api/v1/bootstrap/"
+        assert first["status"] == 200
+        assert first["error"] is None
+        assert first["dns"] >= 0 and first["connect"] > 0
+        assert first["tls"] is None
+        assert 0 < first["ttfb"] <= first["total"]
+        assert first["request_bytes"] > 0
+        assert first["response_bytes"] == len(response.content)
+        assert first["retries"] == 0
+        # the connection is kept alive
+        assert second["dns"] is None and second["connect"] is None
+        assert second["ttfb"] > 0
+        assert current_trace() is None
+
+    def test_request_server_no_connection_trace(
+        self, monkeypatch, tmp_path, stand_in_server
+    ):
+        monkeypatch.setattr(http_trace, "TRACE_CONNECTIONS", False)
+        server = stand_in_server()
+        tracer = HTTPTracer(str(tmp_path / "trace.jsonl"))
+        configure_tracer(tracer)
+        try:
+            response = request_server(
+                server.url, "api/v1/bootstrap/", Methods.get
+            )
+        finally:
+            configure_tracer(None)
+
+        (line,) = _lines(tracer)
+        assert line["status"] == 200
+        assert line["total"] > 0
+        assert line["response_bytes"] == len(response.content)
+        assert line["dns"] is None and line["connect"] is None
+        assert line["ttfb"] is None
+
+    def test_request_server_file_body(self, tracer, stand_in_server, tmp_path):
+        server = stand_in_server()
+        path = tmp_path / "payload.json"
+        path.write_text(json.dumps({"settings": {}, "metadata": {}}))
+
+        upload_payload_file(
+            server.url, "api/v1/bootstrap/", str(path), compress=False
+        )
+
+        (line,) = _lines(tracer)
+        assert line["method"] == "POST"
+        assert line["status"] == 202
+        # the headers and the file body
+        size = path.stat().st_size
+        assert size + 100 < line["request_bytes"] < size + 1024
+
+    def test_request_server_retries(self, tracer, stand_in_server):
+        server = stand_in_server(busy_responses=1)
+        task_id = server.new_task()
+
+        response = request_server(
+            server.url, f"api/v1/task/?task_id={task_id}", Methods.get
+        )
+
+        assert response.status_code == 200
+        (line,) = _lines(tracer)
+        assert line["status"] == 200
+        assert line["retries"] == 1
+
+    def test_request_server_failed(self, tracer, stand_in_server):
+        configure_session(SessionSettings(backoff_factor=0))
+        server = stand_in_server()
+        url = server.url
+        server.stop()
+
+        with pytest.raises(click.ClickException):
+            request_server(url, "api/v1/bootstrap/", Methods.get)
+
+        (line,) = _lines(tracer)
+        assert line["status"] is None
+        assert line["error"] == f"Failed to connect to {url}"
+        assert line["retries"] == 3
+
+    def test_summary(self, tmp_path):
+        tracer = HTTPTracer(str(tmp_path / "trace.jsonl"))
+        for status, total in [(200, 10.0), (200, 30.0), (404, 20.0)]:
+            trace = RequestTrace("GET", "http://server/api/v1/bootstrap/")
+            trace.total = total
+            trace.ttfb = total / 2
+            trace.status = status
+            tracer.traces.append(trace)
+
+        trace = RequestTrace("POST", "http://server/api/v1/bootstrap/")
+        trace.error = "Failed to connect to http://server"
+        tracer.traces.append(trace)
+        output = io.StringIO()
+
+        Console(file=output, width=200).print(tracer.summary())
+
+        rows = output.getvalue().splitlines()
+        (get,) = [row for row in rows if "GET /api/v1/bootstrap/" in row]
+        assert [cell.strip() for cell in get.split("│")[2:9]] == [
+            "3",
+            "200×2 404×1",
+            "0",
+            "-",
+            "10.0",
+            "20.0",
+            "30.0",
+        ]
+        assert "Failed to connect to http://server×1" in output.getvalue()
@@ -0,0 +1,201 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+
+import pretend
+import pytest
+from securesystemslib.interface import (
+    generate_and_write_ed25519_keypair,
+    import_ed25519_privatekey_from_file,
+)
+from securesystemslib.keys import verify_signature
+from securesystemslib.signer import SSlibSigner
+from tuf.api.metadata import Key, Metadata, Targets
+
+from repository_service_tuf.helpers.key_agent import (
+    KEY_AGENT_SOCK_ENV,
+    AgentSigner,
+    KeyAgent,
+    KeyAgentClient,
+    KeyAgentError,
+    new_signer,
+)
+from repository_service_tuf.helpers.tuf import Keyring, sign_metadata
+
+PASSWORD = "strongPass"
+
+
+@pytest.fixture
+def agent_dir():
+    # the Unix socket paths are limited to ~100 characters
+    directory = tempfile.mkdtemp()
+    yield directory
+    shutil.rmtree(directory)
+
+
+@pytest.fixture(scope="module")
+def key_file(tmp_path_factory):
+    filepath = str(tmp_path_factory.mktemp("keys") / "key")
+    generate_and_write_ed25519_keypair(PASSWORD, filepath=filepath)
+    return filepath
+
+
+@pytest.fixture
+def agent(agent_dir):
+    load_key = pretend.call_recorder(import_ed25519_privatekey_from_file)
+    agent = KeyAgent(
+        os.path.join(agent_dir, "agent.sock"),
+        load_key=load_key,
+        poll_interval=0.01,
+    )
+    agent.start()
+    yield agent
+    agent.stop()
+
+
+class TestKeyAgent:
+    def test_add(self, agent, key_file):
+        client = KeyAgentClient(agent.socket_path)
+
+        key = client.add(key_file, PASSWORD)
+        exported = client.add(key_file, PASSWORD, export=True)
+
+        assert key["keyval"]["private"] == ""
+        assert exported["keyval"]["private"] != ""
+        assert key["keyid"] == exported["keyid"]
+        assert key["keyval"]["public"] == exported["keyval"]["public"]
+        # the key file is decrypted once
+        assert len(agent._load_key.calls) == 1
+        (held,) = client.list()
+        assert held["keyid"] == key["keyid"]
+        assert held["path"] == key_file
+        assert 3590 < held["expires_in"] <= 3600
+        assert oct(os.stat(agent.socket_path).st_mode & 0o777) == "0o600"
+
+    def test_add_errors(self, agent, key_file):
+        client = KeyAgentClient(agent.socket_path)
+
+        with pytest.raises(KeyAgentError) as err:
+            client.add(key_file, "wrong password")
+        assert "Check the password." in str(err.value)
+
+        with pytest.raises(KeyAgentError) as err:
+            client.add(f"{key_file}-missing", PASSWORD)
+        assert "Cannot read" in str(err.value)
+
+        assert client.list() == []
+
+    def test_sign_and_lock(self, agent, key_file):
+        client = KeyAgentClient(agent.socket_path)
+        key = client.add(key_file, PASSWORD)
+
+        signature = client.sign(key["keyid"], b"data")
+
+        assert signature.keyid == key["keyid"]
+        assert verify_signature(key, signature.to_dict(), b"data")
+
+        client.lock()
+
+        assert client.list() == []
+        with pytest.raises(KeyAgentError) as err:
+            client.sign(key["keyid"], b"data")
+        assert str(err.value) == f"Key {key['keyid']} not in the agent"
+
+    def test_ttl(self, key_file):
+        now = [0.0]
+        agent = KeyAgent("unused.sock", ttl=10, clock=lambda: now[0])
+        response = agent.handle(
+            {"command": "add", "path": key_file, "password": PASSWORD}
+        )
+        keyid = response["data"]["keyid"]
+        agent.handle(
+            {
+                "command": "add",
+                "path": key_file,
+                "password": PASSWORD,
+                "ttl": 20,
+            }
+        )
+
+        now[0] = 15.0
+        assert agent.handle({"command": "list"})["data"] == [
+            {"keyid": keyid, "path": key_file, "expires_in": 5}
+        ]
+
+        now[0] = 20.0
+        assert agent.handle({"command": "list"}) == {"data": []}
+        assert agent._added == {}
+
+    def test_invalid_requests(self, agent):
+        assert agent.handle({"command": "unknown"}) == {
+            "detail": "Invalid command unknown"
+        }
+        assert agent.handle({"command": "sign"}) == {
+            "detail": "Invalid request: 'keyid'"
+        }
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(agent.socket_path)
+            sock_file = sock.makefile()
+            for line in (b"not json\n", b"[]\n"):
+                sock.sendall(line)
+                assert json.loads(sock_file.readline()) == {
+                    "detail": "Invalid JSON request"
+                }
+
+    def test_stop(self, agent):
+        agent.stop()
+
+        assert not os.path.exists(agent.socket_path)
+        with pytest.raises(KeyAgentError) as err:
+            KeyAgentClient(agent.socket_path).list()
+        assert "Failed to connect to the key agent" in str(err.value)
+
+
+class TestNewSigner:
+    def test_new_signer_private_key(self, key_file):
+        key = import_ed25519_privatekey_from_file(key_file, PASSWORD)
+
+        assert isinstance(new_signer(key), SSlibSigner)
+
+    def test_new_signer_agent(self, agent, key_file, monkeypatch):
+        monkeypatch.setenv(KEY_AGENT_SOCK_ENV, agent.socket_path)
+        key = KeyAgentClient(agent.socket_path).add(key_file, PASSWORD)
+
+        signer = new_signer(key)
+
+        assert isinstance(signer, AgentSigner)
+        assert signer.agent.socket_path == agent.socket_path
+        role = Metadata(Targets())
+        sign_metadata(role, [signer])
+        Key.from_securesystemslib_key(key).verify_signature(role)
+
+    def test_new_signer_without_agent(self, monkeypatch):
+        monkeypatch.delenv(KEY_AGENT_SOCK_ENV, raising=False)
+        key = {"keyid": "k1", "keyval": {"public": "p", "private": ""}}
+
+        with pytest.raises(KeyAgentError) as err:
+            new_signer(key)
+
+        assert "without private key and no key agent" in str(err.value)
+
+    def test_keyring_agent_keys(self, agent, key_file, monkeypatch):
+        monkeypatch.setenv(KEY_AGENT_SOCK_ENV, agent.socket_path)
+        key = KeyAgentClient(agent.socket_path).add(key_file, PASSWORD)
+        settings = {
+            "root": pretend.stub(
+                keys={"root_1": pretend.stub(key=pretend.stub(key=key))}
+            )
+        }
+
+        keyring = Keyring(settings)
+
+        (signer,) = keyring.signers("root")
+        assert isinstance(signer, AgentSigner)
+        (public_key,) = keyring.keys("root")
+        assert public_key.keyid == key["keyid"]
@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import io
+import json
+import os
+
+import pytest
+from tuf.api.metadata import Metadata, Targets, Timestamp
+
+from repository_service_tuf.helpers.payload import (
+    validate_payload,
+    write_payload,
+    write_payload_file,
+)
+
+
+class TestPayloadHelper:
+    def test_write_payload(self):
+        settings = {
+            "service": {"targets_base_url": "http://example.com/"},
+            "roles": {"root": {"keys": {}, "paths": None}},
+        }
+        metadata = [
+            ("1.bins-0", Metadata(Targets())),
+            ("timestamp", Metadata(Timestamp())),
+        ]
+        file = io.StringIO()
+
+        write_payload(file, settings, iter(metadata))
+
+        assert file.getvalue() == json.dumps(
+            {
+                "settings": settings,
+                "metadata": {name: role.to_dict() for name, role in metadata},
+            },
+            indent=2,
+        )
+
+    def test_write_payload_no_metadata(self):
+        file = io.StringIO()
+
+        write_payload(file, {}, [])
+
+        assert file.getvalue() == json.dumps(
+            {"settings": {}, "metadata": {}}, indent=2
+        )
+
+    def test_write_payload_file(self, tmp_path):
+        path = tmp_path / "payload.json"
+        path.write_text("old")
+        metadata = [("timestamp", Metadata(Timestamp()))]
+
+        write_payload_file(str(path), {}, iter(metadata))
+
+        assert json.loads(path.read_text()) == {
+            "settings": {},
+            "metadata": {"timestamp": Metadata(Timestamp()).to_dict()},
+        }
+        assert os.listdir(tmp_path) == ["payload.json"]
+
+    def test_write_payload_file_error(self, tmp_path):
+        path = tmp_path / "payload.json"
+        path.write_text("old")
+
+        def _metadata():
+            yield "timestamp", Metadata(Timestamp())
+            raise ValueError("failed")
+
+        with pytest.raises(ValueError):
+            write_payload_file(str(path), {}, _metadata())
+
+        # no partial payload file
+        assert path.read_text() == "old"
+        assert os.listdir(tmp_path) == ["payload.json"]
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+    def test_validate_payload(self, chunk_size):
+        payload = {
+            "settings": {"k": 'a "{[]}"\\', "l": [1, {"m": None}, []]},
+            "metadata": {"root": {"signed": {"n": "\\"}}},
+        }
+
+        for data in [json.dumps(payload), json.dumps(payload, indent=2)]:
+            validate_payload(io.BytesIO(data.encode()), chunk_size)
+
+    @pytest.mark.parametrize(
+        "data, error",
+        [
+            (b"", "incomplete JSON object"),
+            (b"[]", "the payload must be one JSON object"),
+            (b'x{"settings": {}}', "the payload must be one JSON object"),
+            (b'{"settings": {}} {}', "the payload must be one JSON object"),
+            (b'{"settings": {}} x', "the payload must be one JSON object"),
+            (b'{"settings": {"k": [}}', "unexpected }"),
+            (b'{"settings": {"k": 1}', "incomplete JSON object"),
+            (b'{"settings": "k}', "unterminated string"),
+            (b'{"settings": {}}', "missing metadata"),
+            (b'{"k": {"settings": 1, "metadata": 1}}', "missing settings"),
+        ],
+    )
+    def test_validate_payload_invalid(self, data, error):
+        for chunk_size in [1, 3, 1024]:
+            with pytest.raises(ValueError) as err:
+                validate_payload(io.BytesIO(data), chunk_size)
+
+            assert error in str(err.value)
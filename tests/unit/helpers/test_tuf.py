@@ -0,0 +1,424 @@
+# SPDX-FileCopyrightText: 2022 VMware Inc
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pretend
+import pytest
+from securesystemslib.keys import generate_ed25519_key
+from securesystemslib.signer import SSlibSigner
+from tuf.api.exceptions import UnsignedMetadataError
+from tuf.api.metadata import Metadata, Root, Targets, Timestamp
+from tuf.api.serialization.json import JSONSerializer
+
+from repository_service_tuf.helpers import tuf
+from repository_service_tuf.helpers.canonical import (
+    CanonicalSerializer,
+    encode_canonical_reference,
+)
+from repository_service_tuf.helpers.key_agent import KeyAgentError
+from repository_service_tuf.helpers.tuf import (
+    KeyInput,
+    KeySchema,
+    MetadataGenerator,
+    RoleSettingsInput,
+    generate_metadata,
+    initialize_metadata,
+)
+
+
+@pytest.fixture
+def roles_settings():
+    settings = {}
+    for role_name in [
+        "root",
+        "targets",
+        "snapshot",
+        "timestamp",
+        "bin",
+        "bins",
+    ]:
+        settings[role_name] = RoleSettingsInput(
+            keys={
+                f"{role_name}_1": KeyInput(
+                    filepath=f"{role_name}_1.key",
+                    password="strongPass",
+                    key=KeySchema(key=generate_ed25519_key()),
+                )
+            },
+            paths=["*", "*/*"] if role_name == "targets" else None,
+            number_hash_prefixes=4 if role_name == "bins" else None,
+        )
+
+    return settings
+
+
+@pytest.fixture
+def fixed_now(monkeypatch):
+    fake_datetime = pretend.stub(
+        now=lambda: datetime(2022, 10, 31, 12, 0, 0, 123)
+    )
+    monkeypatch.setattr(tuf, "datetime", fake_datetime)
+
+
+def _serialize(metadata):
+    return {
+        filename: role.to_bytes(JSONSerializer())
+        for filename, role in metadata.items()
+    }
+
+
+class TestTUFHelper:
+    def test_initialize_metadata(self, roles_settings, fixed_now):
+        result = initialize_metadata(roles_settings, save=False)
+
+        assert "1.root" in result
+        assert "timestamp" in result
+        assert "2.snapshot" in result
+        assert "1.bin" in result
+        for bin_n in [f"1.bins-{i:x}" for i in range(16)]:
+            assert bin_n in result
+            assert len(result[bin_n].signatures) == 1
+
+    def test_generate_metadata(self, roles_settings, fixed_now):
+        generator = MetadataGenerator(roles_settings)
+        result = list(generator.generate(save=False))
+        filenames = [filename for filename, _ in result]
+
+        assert len(filenames) == len(set(filenames))
+        assert filenames[:4] == [
+            "1.targets",
+            "1.snapshot",
+            "1.root",
+            "2.targets",
+        ]
+        assert filenames[-3:] == ["1.bin", "2.snapshot", "timestamp"]
+        for filename, role in result:
+            if filename != "timestamp":
+                assert filename.startswith(f"{role.signed.version}.")
+
+        # the hash bins are not kept in memory
+        assert "1.bins-0" not in generator.metadata
+
+    def test_generate_metadata_bins_signed_once(
+        self, roles_settings, monkeypatch
+    ):
+        signed = []
+        new_signer = tuf.new_signer
+
+        def fake_new_signer(key):
+            signer = new_signer(key)
+            return pretend.stub(
+                key_dict=signer.key_dict,
+                sign=lambda data: signed.append(key["keyid"])
+                or signer.sign(data),
+            )
+
+        monkeypatch.setattr(tuf, "new_signer", fake_new_signer)
+        bins_key = roles_settings["bins"].keys["bins_1"].key.key
+
+        metadata = dict(generate_metadata(roles_settings, save=False))
+
+        assert len([name for name in metadata if "bins-" in name]) == 16
+        assert signed.count(bins_key["keyid"]) == 1
+
+    def test_generate_metadata_bin_delegation(self, roles_settings):
+        metadata = dict(generate_metadata(roles_settings, save=False))
+        bins_key = roles_settings["bins"].keys["bins_1"].key.key
+        delegations = metadata["1.bin"].signed.delegations
+
+        assert list(delegations.keys) == [bins_key["keyid"]]
+        assert delegations.succinct_roles.keyids == [bins_key["keyid"]]
+
+    def test_generate_metadata_save(
+        self, roles_settings, tmp_path, monkeypatch
+    ):
+        monkeypatch.chdir(tmp_path)
+        os.makedirs("metadata")
+
+        result = list(generate_metadata(roles_settings, save=True))
+
+        assert sorted(os.listdir("metadata")) == sorted(
+            filename for filename, _ in result
+        )
+        for filename, role in result:
+            assert Metadata.from_file(f"metadata/{filename}") == role
+
+    def test_initialize_metadata_dir_concurrent(
+        self, roles_settings, tmp_path, fixed_now
+    ):
+        other_settings = copy.deepcopy(roles_settings)
+        other_settings["bins"].number_hash_prefixes = 3
+        settings = [roles_settings, other_settings]
+        for n in range(len(settings)):
+            os.makedirs(tmp_path / str(n))
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(
+                executor.map(
+                    lambda n: initialize_metadata(
+                        settings[n], metadata_dir=str(tmp_path / str(n))
+                    ),
+                    range(len(settings)),
+                )
+            )
+
+        for n, result in enumerate(results):
+            serial = _serialize(result)
+            assert sorted(os.listdir(tmp_path / str(n))) == sorted(serial)
+            for filename, data in serial.items():
+                assert (tmp_path / str(n) / filename).read_bytes() == data
+
+    def test_metadata_generator_new_store(self, roles_settings, fixed_now):
+        generator = MetadataGenerator(roles_settings)
+        first = generator.initialize(save=False)
+        first_serialized = _serialize(first)
+
+        second = generator.initialize(save=False)
+
+        assert second is not first
+        assert _serialize(first) == first_serialized
+        assert _serialize(second) == first_serialized
+
+    def test_metadata_generator_in_progress(self, roles_settings):
+        generator = MetadataGenerator(roles_settings)
+        running = generator.generate(save=False)
+        next(running)
+
+        with pytest.raises(RuntimeError) as err:
+            next(generator.generate(save=False))
+
+        assert "already in progress" in str(err)
+        running.close()
+        assert len(list(generator.generate(save=False))) > 0
+
+    def test_metadata_generator_concurrent_threads(
+        self, roles_settings, fixed_now
+    ):
+        other_settings = copy.deepcopy(roles_settings)
+        other_settings["bins"].number_hash_prefixes = 3
+        settings = [roles_settings, other_settings]
+        serial = [
+            _serialize(initialize_metadata(s, save=False)) for s in settings
+        ]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(
+                    lambda s: _serialize(initialize_metadata(s, save=False)),
+                    settings * 4,
+                )
+            )
+
+        assert results == serial * 4
+        assert serial[0] != serial[1]
+
+    def test_metadata_generator_concurrent_asyncio(
+        self, roles_settings, tmp_path, fixed_now
+    ):
+        async def _initialize(n):
+            generator = MetadataGenerator(
+                roles_settings, metadata_dir=str(tmp_path / str(n))
+            )
+            return _serialize(
+                await asyncio.to_thread(generator.initialize, save=True)
+            )
+
+        async def _main():
+            return await asyncio.gather(*[_initialize(n) for n in range(4)])
+
+        for n in range(4):
+            os.makedirs(tmp_path / str(n))
+        serial = _serialize(initialize_metadata(roles_settings, save=False))
+
+        results = asyncio.run(_main())
+
+        assert results == [serial] * 4
+        for n in range(4):
+            assert sorted(os.listdir(tmp_path / str(n))) == sorted(serial)
+
+    def test_metadata_writer(self, tmp_path):
+        writer = tuf.MetadataWriter(str(tmp_path), threads=2, queue_size=2)
+        roles = {
+            f"{i}.bins-0": Metadata(Targets(version=i)) for i in range(1, 9)
+        }
+        for filename, role in roles.items():
+            writer.write(filename, role)
+            # changes after write are not written
+            role.signed.version += 100
+
+        writer.close()
+
+        assert sorted(os.listdir(tmp_path)) == sorted(roles)
+        for filename in roles:
+            role = Metadata.from_file(str(tmp_path / filename))
+            assert f"{role.signed.version}.bins-0" == filename
+
+    def test_metadata_writer_fsync(self, tmp_path, monkeypatch):
+        calls = []
+        real_fsync, real_replace = os.fsync, os.replace
+
+        def fake_fsync(fd):
+            calls.append(("fsync", os.fstat(fd).st_size))
+            real_fsync(fd)
+
+        def fake_replace(src, dst):
+            calls.append(("replace", os.path.basename(dst)))
+            real_replace(src, dst)
+
+        monkeypatch.setattr(tuf.os, "fsync", fake_fsync)
+        monkeypatch.setattr(tuf.os, "replace", fake_replace)
+        writer = tuf.MetadataWriter(str(tmp_path), threads=1)
+        root = Metadata(Root())
+        writer.write("1.root", root)
+        writer.write("2.root", root)
+
+        writer.close()
+
+        size = len(root.to_bytes(tuf.JSONSerializer()))
+        # each file is synced before it is renamed, then the directory
+        assert calls[:4] == [
+            ("fsync", size),
+            ("replace", "1.root"),
+            ("fsync", size),
+            ("replace", "2.root"),
+        ]
+        if os.name == "posix":
+            assert len(calls) == 5
+
+    def test_metadata_writer_error(self, tmp_path):
+        writer = tuf.MetadataWriter(str(tmp_path / "missing"), threads=1)
+        writer.write("1.root", Metadata(Root()))
+
+        with pytest.raises(FileNotFoundError):
+            writer.close()
+
+    def test_keyring(self, roles_settings):
+        keyring = tuf.Keyring(roles_settings)
+        root_key = roles_settings["root"].keys["root_1"].key.key
+
+        signers = keyring.signers("root")
+        keys = keyring.keys("root")
+
+        assert [signer.key_dict for signer in signers] == [root_key]
+        assert [key.keyid for key in keys] == [root_key["keyid"]]
+        assert keyring.signers("root")[0] is signers[0]
+        assert keyring.keys("root")[0] is keys[0]
+
+    def test_sign_metadata(self):
+        signers = [SSlibSigner(generate_ed25519_key()) for _ in range(3)]
+        for signed in [Root(), Targets(), Timestamp()]:
+            expected = Metadata(signed)
+            for signer in signers:
+                expected.sign(signer, append=True)
+            role = Metadata(signed, signatures={"old": None})
+
+            tuf.sign_metadata(role, signers)
+
+            assert role.signatures == expected.signatures
+            assert role.to_bytes(JSONSerializer()) == expected.to_bytes(
+                JSONSerializer()
+            )
+
+    def test_sign_metadata_serializes_once(self):
+        signers = [SSlibSigner(generate_ed25519_key()) for _ in range(3)]
+        fake_serializer = pretend.stub(
+            serialize=pretend.call_recorder(lambda signed: b"data")
+        )
+        role = Metadata(Targets())
+
+        tuf.sign_metadata(role, signers, fake_serializer)
+
+        assert fake_serializer.serialize.calls == [pretend.call(role.signed)]
+        assert len(role.signatures) == 3
+
+    def test_sign_metadata_error(self):
+        fake_signer = pretend.stub(sign=pretend.raiser(ValueError("error")))
+
+        with pytest.raises(UnsignedMetadataError):
+            tuf.sign_metadata(Metadata(Targets()), [fake_signer])
+
+    def test_signature_cache(self):
+        signer = SSlibSigner(generate_ed25519_key())
+        fake_signer = pretend.stub(
+            key_dict=signer.key_dict,
+            sign=pretend.call_recorder(lambda data: signer.sign(data)),
+        )
+        signature_cache = tuf.SignatureCache()
+
+        roles = [Metadata(Targets(expires=datetime(2030, 1, 1)))]
+        roles.append(Metadata(Targets(expires=datetime(2030, 1, 1))))
+        roles.append(Metadata(Targets(expires=datetime(2031, 1, 1))))
+        for role in roles:
+            signature_cache.sign(role, [fake_signer])
+
+        assert len(fake_signer.sign.calls) == 2
+        assert roles[0].signatures == roles[1].signatures
+        assert roles[0].signatures != roles[2].signatures
+        for role in roles:
+            expected = Metadata(role.signed)
+            expected.sign(signer)
+            assert role.signatures == expected.signatures
+
+    def test_signature_cache_error(self):
+        error = KeyAgentError("Key abc not in the agent")
+        fake_signer = pretend.stub(
+            key_dict={"keyid": "abc"}, sign=pretend.raiser(error)
+        )
+
+        with pytest.raises(UnsignedMetadataError) as err:
+            tuf.SignatureCache().sign(Metadata(Targets()), [fake_signer])
+
+        assert err.value.__cause__ is error
+
+    def test_metadata_store(self):
+        store = tuf.MetadataStore()
+        bin_role = Metadata(Targets())
+        bins_role = Metadata(Targets(version=3))
+        timestamp_v1 = Metadata(Timestamp())
+        timestamp_v2 = Metadata(Timestamp(version=2))
+
+        assert store.add_role("bins-0", bins_role) == "3.bins-0"
+        assert store.add_role("bin", bin_role) == "1.bin"
+        assert store.add_role("timestamp", timestamp_v1) == "timestamp"
+        assert store.add_role("timestamp", timestamp_v2) == "timestamp"
+
+        assert store.get_role("bin") is bin_role
+        assert store.latest_version("bin") == 1
+        assert store.get_role("bins-0", 3) is bins_role
+        assert store.get_role("timestamp") is timestamp_v2
+        assert store.versions("timestamp") == [1, 2]
+        assert list(store) == ["3.bins-0", "1.bin", "timestamp"]
+        assert store["timestamp"] is timestamp_v2
+        assert len(store) == 3
+
+        with pytest.raises(KeyError):
+            store.get_role("targets")
+
+        with pytest.raises(KeyError):
+            store.get_role("bin", 2)
+
+        store.clear()
+        assert len(store) == 0
+        assert store.versions("bin") == []
+
+    def test_initialize_metadata_reference_serializer(
+        self, roles_settings, fixed_now
+    ):
+        fast = _serialize(initialize_metadata(roles_settings, save=False))
+        reference = _serialize(
+            initialize_metadata(
+                roles_settings,
+                save=False,
+                signed_serializer=CanonicalSerializer(
+                    encode_canonical_reference
+                ),
+            )
+        )
+
+        assert fast == reference